@@ -5,7 +5,7 @@ Manages application configuration from environment variables.
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 from pathlib import Path
 
@@ -25,7 +25,35 @@ class Settings(BaseSettings):
     
     # File Upload
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
-    ALLOWED_EXTENSIONS: str = "json,csv,xls,xlsx"
+    ALLOWED_EXTENSIONS: str = "json,csv,xls,xlsx,parquet,feather,arrow"
+    ALLOWED_COMPRESSIONS: str = "gz,zip,bz2,zst"
+    MAX_DECOMPRESSED_SIZE: int = 524288000  # 500MB per decompressed file
+    
+    # Upload Deduplication (identical uploads reuse the parsed data)
+    UPLOAD_DEDUP_ENABLED: bool = True
+    EXCEL_SNAPSHOTS_ENABLED: bool = True
+    SNAPSHOT_DIR: str = "data/snapshots"
+    
+    # Dataset Store (in-memory datasets shared by concurrent requests)
+    DATASET_STORE_STRIPES: int = 64
+    
+    # CSV Ingestion
+    CSV_ENGINE: str = "auto"
+    CSV_SNIFF_BYTES: int = 65536
+    CSV_BLOCK_SIZE: int = 1048576  # 1MB
+    CSV_ARROW_STRINGS: bool = False
+    
+    # Type Inference (semantic column types at upload)
+    TYPE_INFERENCE_SAMPLE_ROWS: int = 1000
+    TYPE_INFERENCE_MIN_MATCH: float = 0.9
+    
+    # Ingestion Dtypes (memory-efficient text columns)
+    INGEST_ARROW_STRINGS: bool = False
+    INGEST_CATEGORY_MAX_RATIO: float = 0.0  # 0 disables categoricals
+    
+    # Excel Ingestion
+    EXCEL_HEADER_SCAN_ROWS: int = 20
+    EXCEL_SHEET_WORKERS: int = 4
     UPLOAD_DIR: str = "uploads"
     EXPORT_DIR: str = "exports"
     
@@ -37,10 +65,70 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = ""
     DB_NAME: str = "gokendali_dev"
     
+    # Worker Pool (blocking work off the event loop)
+    WORKER_THREADS: int = 8
+    OPERATION_CONCURRENCY: str = "normalize=2,analyze=4,export=2,upload=4,database=4,import=2"
+    
+    # Long-running Operations (cancellation is checked between chunks)
+    NORMALIZE_CHUNK_ROWS: int = 50000
+    EXPORT_CHUNK_ROWS: int = 50000
+    EXCEL_MAX_ROWS_PER_SHEET: int = 1048575  # data rows; the header takes one more
+    DISCONNECT_POLL_INTERVAL: float = 0.5
+    
+    # Out-of-core Datasets (large uploads stay on disk as Parquet row groups)
+    OUT_OF_CORE_THRESHOLD_BYTES: int = 0  # 0 disables
+    OUT_OF_CORE_CHUNK_ROWS: int = 250000
+    OUT_OF_CORE_DIR: str = "data/datasets"
+    
+    # Export Cache (identical exports reuse the existing file)
+    EXPORT_CACHE_ENABLED: bool = True
+    EXPORT_CACHE_MAX_BYTES: int = 1073741824  # 1GB
+    EXPORT_CACHE_DB_PATH: str = "data/export_cache.db"
+    
+    # Export Downloads (ETag, Range and pre-compressed .gz variants)
+    EXPORT_PRECOMPRESS_GZIP: bool = False
+    EXPORT_PRECOMPRESS_LEVEL: int = 6
+    
+    # Columnar Formats (Parquet / Arrow IPC, requires pyarrow)
+    PARQUET_COMPRESSION: str = "snappy"
+    PARQUET_ROW_GROUP_SIZE: int = 100000
+    ARROW_COMPRESSION: str = "lz4"
+    
+    # Job Scheduler
+    JOB_QUEUE_DB_PATH: str = "data/job_queue.db"
+    JOB_MAX_RUNNING: int = 4
+    JOB_INTERACTIVE_RESERVED: int = 1
+    JOB_INTERACTIVE_MAX_ROWS: int = 50000
+    
+    # Pendampingan Import Jobs
+    JOB_DIR: str = "jobs"
+    IMPORT_BATCH_SIZE: int = 10
+    IMPORT_EVENT_WINDOW_MS: int = 250
+    IMPORT_EVENT_RECENT_LOGS: int = 50
+    JSON_STREAM_CHUNK_SIZE: int = 65536
+    # Largest single record of a streamed JSON array; a malformed value is
+    # rejected once this much has been buffered (0 = unlimited)
+    JSON_STREAM_MAX_RECORD_BYTES: int = 16 * 1024 * 1024
+    FAILURE_DB_PATH: str = "data/import_failures.db"
+    
+    # Storage Cleanup (TTLs in seconds; 0 disables)
+    GC_INTERVAL_SECONDS: int = 900  # 0 disables the background collector
+    DATASET_TTL_SECONDS: int = 86400
+    DATASET_MEMORY_MAX_BYTES: int = 0
+    UPLOAD_TTL_SECONDS: int = 86400
+    UPLOAD_DIR_MAX_BYTES: int = 0
+    EXPORT_TTL_SECONDS: int = 86400
+    SNAPSHOT_TTL_SECONDS: int = 604800
+    IMPORT_JOB_TTL_SECONDS: int = 604800
+    
     # Logging
     LOG_DIR: str = "logs"
     LOG_FILE_MAX_BYTES: int = 10485760
     LOG_FILE_BACKUP_COUNT: int = 5
+    LOG_QUEUE_ENABLED: bool = True
+    LOG_JSON_FORMAT: bool = False
+    LOG_RATE_LIMIT_BURST: int = 20  # 0 disables rate limiting
+    LOG_RATE_LIMIT_INTERVAL: float = 10.0
     
     # Normalization Defaults
     DEFAULT_TEXT_CASE: str = "title"
@@ -56,6 +144,21 @@ class Settings(BaseSettings):
         """Get list of allowed file extensions"""
         return self.ALLOWED_EXTENSIONS.split(",")
     
+    @property
+    def allowed_compressions_list(self) -> List[str]:
+        """Get list of allowed compression suffixes"""
+        return [c for c in self.ALLOWED_COMPRESSIONS.split(",") if c]
+    
+    @property
+    def operation_limits(self) -> Dict[str, int]:
+        """Get per-operation concurrency limits"""
+        limits = {}
+        for item in self.OPERATION_CONCURRENCY.split(","):
+            if "=" in item:
+                name, limit = item.split("=", 1)
+                limits[name.strip()] = int(limit)
+        return limits
+    
     @property
     def database_url(self) -> str:
         """Get database URL for SQLAlchemy"""
@@ -70,6 +173,7 @@ class Settings(BaseSettings):
             self.UPLOAD_DIR,
             self.EXPORT_DIR,
             self.LOG_DIR,
+            self.JOB_DIR,
             "data"
         ]
         for directory in directories:
@@ -13,9 +13,12 @@ from pathlib import Path
 
 from app.config import settings
 from app.utils.logger import app_logger
+from app.utils.executor import shutdown_executor
+from app.services.job_scheduler import job_scheduler
+from app.services.storage_collector import storage_collector
 
 # Import routers
-from app.routes import upload, database, analysis, normalization, export
+from app.routes import upload, database, analysis, normalization, export, jobs, storage
 
 
 # Create FastAPI app
@@ -48,6 +51,8 @@ app.include_router(database.router)
 app.include_router(analysis.router)
 app.include_router(normalization.router)
 app.include_router(export.router)
+app.include_router(jobs.router)
+app.include_router(storage.router)
 from app.routes import pendampingan
 app.include_router(pendampingan.router)
 
@@ -150,12 +155,17 @@ async def startup_event():
     app_logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     app_logger.info(f"Debug mode: {settings.DEBUG}")
     app_logger.info(f"Allowed file extensions: {settings.allowed_extensions_list}")
+    job_scheduler.start()
+    storage_collector.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown"""
     app_logger.info(f"Shutting down {settings.APP_NAME}")
+    storage_collector.stop()
+    job_scheduler.stop()
+    shutdown_executor()
 
 
 # ============================================================================
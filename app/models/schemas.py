@@ -28,6 +28,26 @@ class DatabaseConnectionSchema(BaseModel):
 # UPLOAD SCHEMAS
 # ============================================================================
 
+class CsvDialect(BaseModel):
+    """How an uploaded CSV file was read"""
+    encoding: str
+    delimiter: str
+    quotechar: str
+    header_row: int  # 1-based line number of the header
+
+
+class UploadedDataset(BaseModel):
+    """One dataset created by an upload"""
+    file_id: str
+    filename: str
+    rows: int
+    columns: List[str]
+    csv_dialect: Optional[CsvDialect] = None
+    column_types: Dict[str, str] = Field(default_factory=dict)  # column -> semantic type (nik, phone, year, ...)
+    reused: bool = False  # parsed data reused from an identical earlier upload
+    out_of_core: bool = False  # stored on disk and processed in chunks (large uploads)
+
+
 class UploadResponse(BaseModel):
     """Response after file upload"""
     success: bool
@@ -36,6 +56,11 @@ class UploadResponse(BaseModel):
     filename: str
     rows: int
     columns: List[str]
+    csv_dialect: Optional[CsvDialect] = None
+    column_types: Dict[str, str] = Field(default_factory=dict)
+    # Every dataset created (a zip archive creates one per file); the
+    # fields above describe the first
+    datasets: List[UploadedDataset] = []
 
 
 # ============================================================================
@@ -54,6 +79,7 @@ class ColumnIssue(BaseModel):
     has_special_characters: int
     invalid_emails: int = 0  # Only for email columns
     invalid_sk_numbers: int = 0  # Only for SK columns
+    semantic_type: Optional[str] = None  # Type inferred at upload (nik, phone, sk_number, ...)
     sample_values: List[Any] = Field(default_factory=list)
 
 
@@ -110,6 +136,7 @@ class NormalizationRequest(BaseModel):
     """Request to normalize data"""
     file_id: str
     columns_config: List[ColumnNormalizationConfig]
+    time_budget_seconds: Optional[float] = Field(default=None, gt=0)
 
 
 class NormalizationStatistics(BaseModel):
@@ -126,6 +153,8 @@ class NormalizationResponse(BaseModel):
     message: str
     normalized_file_id: str
     statistics: List[NormalizationStatistics]
+    partial: bool = False
+    cancel_reason: Optional[str] = None
 
 
 # ============================================================================
@@ -146,8 +175,11 @@ class PreviewComparison(BaseModel):
 class ExportToFileRequest(BaseModel):
     """Request to export data to file"""
     file_id: str
-    format: Literal["csv", "excel", "json"]
+    format: Literal["csv", "excel", "json", "ndjson", "parquet", "feather"]
     filename: Optional[str] = None
+    compact: bool = False  # JSON without indentation
+    compression: Optional[str] = None  # Parquet/Arrow codec (default from settings)
+    row_group_size: Optional[int] = Field(default=None, gt=0)  # Parquet rows per row group
 
 
 class ExportToDatabaseRequest(BaseModel):
@@ -166,6 +198,78 @@ class ExportResponse(BaseModel):
     download_url: Optional[str] = None
 
 
+# ============================================================================
+# JOB SCHEMAS
+# ============================================================================
+
+class NormalizationJobRequest(NormalizationRequest):
+    """Request to queue a normalization job"""
+    priority: Optional[Literal["interactive", "bulk"]] = None
+
+
+class ExportJobRequest(ExportToFileRequest):
+    """Request to queue an export job"""
+    priority: Optional[Literal["interactive", "bulk"]] = None
+
+
+class JobStatusResponse(BaseModel):
+    """Status of a scheduled job"""
+    job_id: str
+    kind: str
+    lane: str
+    user_id: str
+    status: str
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    queue_position: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+# ============================================================================
+# STORAGE SCHEMAS
+# ============================================================================
+
+class StorageAreaReport(BaseModel):
+    """What one storage area reclaimed"""
+    removed: int
+    bytes: int
+    file_ids: Optional[List[str]] = None
+
+
+class StorageCollectResponse(BaseModel):
+    """Report of a storage collection run"""
+    datasets: StorageAreaReport
+    uploads: StorageAreaReport
+    exports: StorageAreaReport
+    snapshots: StorageAreaReport
+    import_jobs: Optional[StorageAreaReport] = None
+    bytes_reclaimed: int
+    duration_seconds: float
+
+
+class LineageNode(BaseModel):
+    """Origin and use of a stored dataset"""
+    file_id: str
+    kind: Literal["upload", "stored", "derived"]
+    parent_id: Optional[str] = None
+    base_id: Optional[str] = None
+    upload_path: Optional[str] = None
+    filename: Optional[str] = None
+    exports: List[str] = []
+    created_at: float
+    last_access: float
+    size: Optional[int] = None
+
+
+class LineageResponse(BaseModel):
+    """Lineage of a dataset"""
+    dataset: LineageNode
+    ancestors: List[LineageNode]
+    children: List[str]
+
+
 # ============================================================================
 # ERROR RESPONSE
 # ============================================================================
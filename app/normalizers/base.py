@@ -6,6 +6,7 @@ Abstract base class for all normalizers.
 
 from abc import ABC, abstractmethod
 from typing import Any, Dict
+import numpy as np
 import pandas as pd
 
 
@@ -43,14 +44,36 @@ class BaseNormalizer(ABC):
         """
         Normalize a pandas Series (column)
         
+        Category columns are normalized once per category and stay
+        categorical; string columns keep their string dtype.
+        
         Args:
             series: Pandas Series to normalize
         
         Returns:
             Normalized Series
         """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return self._normalize_categorical(series)
+        if isinstance(series.dtype, pd.StringDtype):
+            # Missing values are pd.NA, which normalize() cannot compare
+            values = series.astype(object).where(series.notna(), None)
+            return values.apply(self.normalize).astype(series.dtype)
         return series.apply(self.normalize)
     
+    def _normalize_categorical(self, series: pd.Series) -> pd.Series:
+        """Normalize the categories of a category column and remap its codes"""
+        normalized = [self.normalize(value) for value in series.cat.categories]
+        # Different categories may normalize to the same value ("a " and "a")
+        new_codes, categories = pd.factorize(pd.Series(normalized, dtype=object), use_na_sentinel=True)
+        codes = series.cat.codes.to_numpy()
+        codes = np.where(codes >= 0, new_codes[codes], -1)
+        return pd.Series(
+            pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object)),
+            index=series.index,
+            name=series.name
+        )
+    
     def get_rule(self, key: str, default: Any = None) -> Any:
         """
         Get a rule value
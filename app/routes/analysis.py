@@ -8,6 +8,8 @@ from fastapi import APIRouter, HTTPException
 from app.models.schemas import DataAnalysisResponse
 from app.services.upload_handler import UploadHandler
 from app.services.data_analyzer import DataAnalyzer
+from app.services.chunked_datasets import iter_frames
+from app.utils.executor import run_blocking
 from app.utils.logger import app_logger
 
 
@@ -26,11 +28,31 @@ async def analyze_data(file_id: str):
         Data analysis response with issues and preview
     """
     try:
+        # Chunked (out-of-core) datasets are analyzed chunk by chunk
+        chunked = UploadHandler.get_chunked(file_id)
+        if chunked is not None:
+            column_issues = await run_blocking(
+                "analyze", DataAnalyzer.analyze_chunks, iter_frames(chunked), UploadHandler.get_column_types(file_id)
+            )
+            preview_df = await run_blocking("analyze", chunked.head, 10)
+            
+            app_logger.info(f"Analysis completed for file_id: {file_id} (out of core)")
+            
+            return DataAnalysisResponse(
+                file_id=file_id,
+                total_rows=len(chunked),
+                total_columns=len(chunked.columns),
+                column_issues=column_issues,
+                preview_data=DataAnalyzer.get_preview_data(preview_df, limit=10)
+            )
+        
         # Get data
-        df = UploadHandler.get_data(file_id)
+        df = await run_blocking("analyze", UploadHandler.get_data, file_id)
         
         # Analyze columns
-        column_issues = DataAnalyzer.analyze_dataframe(df)
+        column_issues = await run_blocking(
+            "analyze", DataAnalyzer.analyze_dataframe, df, UploadHandler.get_column_types(file_id)
+        )
         
         # Get preview data
         preview_data = DataAnalyzer.get_preview_data(df, limit=10)
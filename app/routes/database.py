@@ -8,6 +8,7 @@ from fastapi import APIRouter, HTTPException
 from app.models.schemas import DatabaseConnectionSchema, UploadResponse
 from app.services.database_connector import DatabaseConnector
 from app.services.upload_handler import UploadHandler
+from app.utils.executor import run_blocking
 from app.utils.logger import app_logger
 
 
@@ -30,14 +31,14 @@ async def connect_database(config: DatabaseConnectionSchema):
         connection_string = DatabaseConnector.build_connection_string(config)
         
         # Test connection
-        DatabaseConnector.test_connection(connection_string)
+        await run_blocking("database", DatabaseConnector.test_connection, connection_string)
         
         # Read table
-        df = DatabaseConnector.read_table(connection_string, config.table)
+        df = await run_blocking("database", DatabaseConnector.read_table, connection_string, config.table)
         
         # Generate file ID and store data
         file_id = UploadHandler.generate_file_id()
-        UploadHandler.store_data(file_id, df)
+        await run_blocking("database", UploadHandler.store_data, file_id, df)
         
         app_logger.info(
             f"Database connected successfully: {config.db_type}://{config.host}/{config.database}.{config.table}"
@@ -72,7 +73,7 @@ async def test_connection(config: DatabaseConnectionSchema):
     """
     try:
         connection_string = DatabaseConnector.build_connection_string(config)
-        DatabaseConnector.test_connection(connection_string)
+        await run_blocking("database", DatabaseConnector.test_connection, connection_string)
         
         return {
             "success": True,
@@ -5,13 +5,17 @@ API endpoints for exporting data.
 """
 
 import os
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from app.models.schemas import ExportToFileRequest, ExportToDatabaseRequest, ExportResponse
 from app.services.upload_handler import UploadHandler
 from app.services.export_service import ExportService
 from app.services.database_connector import DatabaseConnector
 from app.config import settings
+from app.utils.cancellation import CancellationToken, OperationCancelled
+from app.utils.executor import iterate_in_worker, run_blocking, run_cancellable
+from app.utils.file_download import PRECOMPRESSED_SUFFIX, file_download_response
 from app.utils.logger import app_logger
 
 
@@ -19,9 +23,12 @@ router = APIRouter(prefix="/api/export", tags=["Export"])
 
 
 @router.post("/file", response_model=ExportResponse)
-async def export_to_file(request: ExportToFileRequest):
+async def export_to_file(request: ExportToFileRequest, http_request: Request):
     """
-    Export data to file (CSV, Excel, or JSON)
+    Export data to file (CSV, Excel, JSON, NDJSON, Parquet, or Arrow/Feather)
+    
+    The export stops (and its partial file is removed) when the client
+    disconnects.
     
     Args:
         request: Export request with file_id and format
@@ -30,20 +37,23 @@ async def export_to_file(request: ExportToFileRequest):
         Export response with download URL
     """
     try:
-        # Get data
-        df = UploadHandler.get_data(request.file_id)
-        
-        # Export based on format
-        if request.format == 'csv':
-            file_path = ExportService.export_to_csv(df, request.filename)
-        elif request.format == 'excel':
-            file_path = ExportService.export_to_excel(df, request.filename)
-        elif request.format == 'json':
-            file_path = ExportService.export_to_json(df, request.filename)
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported format: {request.format}")
+        # Export based on format (identical earlier exports are reused)
+        cancel_token = CancellationToken()
+        file_path, download_name = await run_cancellable(
+            "export",
+            http_request,
+            cancel_token,
+            ExportService.export_stored,
+            request.file_id,
+            request.format,
+            request.filename,
+            cancel_token,
+            request.compact,
+            request.compression,
+            request.row_group_size
+        )
         
-        download_url = ExportService.get_download_url(file_path)
+        download_url = ExportService.get_download_url(file_path, download_name)
         
         return ExportResponse(
             success=True,
@@ -54,11 +64,77 @@ async def export_to_file(request: ExportToFileRequest):
     
     except HTTPException:
         raise
+    except OperationCancelled as e:
+        app_logger.info(f"Export of {request.file_id} cancelled: {e.reason}")
+        raise HTTPException(status_code=499, detail=str(e))
     except Exception as e:
         app_logger.error(f"Error exporting to file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.api_route("/stream/{file_id}", methods=["GET", "HEAD"])
+async def stream_export(
+    file_id: str,
+    request: Request,
+    format: Literal["csv", "json", "ndjson"] = "csv",
+    filename: Optional[str] = None,
+    gzip: bool = False
+):
+    """
+    Stream data as a CSV, JSON or NDJSON download
+    
+    Rows are encoded and sent chunk by chunk as they are produced; nothing
+    is written to the export directory. The stream stops when the client
+    disconnects. JSON is streamed compact (no indentation). If the same
+    content was already exported to this format, the cached export file is
+    sent instead (with range and ETag support). A HEAD request
+    only checks that the dataset can be exported (404/409 otherwise), so a
+    client can verify the download before starting it.
+    
+    Args:
+        file_id: File ID to export
+        format: Output format
+        filename: Optional download filename
+        gzip: Gzip the output (downloads with a .gz suffix)
+    
+    Returns:
+        Streaming response
+    """
+    extension, media_type = ExportService.STREAM_FORMATS[format]
+    if filename:
+        filename = os.path.basename(filename).replace('"', '')
+    filename = ExportService.get_export_filename(filename or None, extension)
+    
+    # An earlier export of the same content is sent as a file (streamed JSON
+    # is compact); gzip downloads need its pre-compressed variant
+    cached_path = await run_blocking("export", ExportService.cached_export, file_id, format, True)
+    if cached_path is not None and gzip:
+        cached_path += PRECOMPRESSED_SUFFIX
+    if cached_path is not None and os.path.isfile(cached_path):
+        if gzip:
+            return file_download_response(request, cached_path, filename + '.gz', 'application/gzip')
+        return file_download_response(request, cached_path, filename, media_type)
+    
+    df = await run_blocking("export", UploadHandler.get_source, file_id)
+    
+    if gzip:
+        filename += '.gz'
+        media_type = 'application/gzip'
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    
+    if request.method == "HEAD":
+        return Response(media_type=media_type, headers=headers)
+    
+    app_logger.info(f"Streaming {format.upper()} export: {file_id} ({len(df)} rows) as {filename}")
+    
+    cancel_token = CancellationToken()
+    return StreamingResponse(
+        iterate_in_worker("export", ExportService.stream_export(df, format, gzip, cancel_token), cancel_token),
+        media_type=media_type,
+        headers=headers
+    )
+
+
 @router.post("/database", response_model=ExportResponse)
 async def export_to_database(request: ExportToDatabaseRequest):
     """
@@ -72,13 +148,15 @@ async def export_to_database(request: ExportToDatabaseRequest):
     """
     try:
         # Get data
-        df = UploadHandler.get_data(request.file_id)
+        df = await run_blocking("database", UploadHandler.get_source, request.file_id)
         
         # Build connection string
         connection_string = DatabaseConnector.build_connection_string(request.connection)
         
         # Write to database
-        rows_written = DatabaseConnector.write_table(
+        rows_written = await run_blocking(
+            "database",
+            DatabaseConnector.write_table,
             df,
             connection_string,
             request.table_name,
@@ -97,28 +175,24 @@ async def export_to_database(request: ExportToDatabaseRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/download/{filename}")
-async def download_file(filename: str):
+@router.api_route("/download/{filename}", methods=["GET", "HEAD"])
+async def download_file(filename: str, request: Request, name: Optional[str] = None):
     """
     Download exported file
     
+    Supports ETag / If-None-Match, byte ranges for resuming interrupted
+    downloads, and pre-compressed ".gz" variants (see file_download).
+    
     Args:
         filename: Filename to download
+        name: Optional filename to save as (cached exports are stored
+            under content-addressed names)
     
     Returns:
         File response
     """
-    # Resolve absolute path
     file_path = os.path.abspath(os.path.join(settings.EXPORT_DIR, filename))
     
-    app_logger.info(f"Download request for: {filename}")
-    app_logger.info(f"Resolved file path: {file_path}")
-    app_logger.info(f"File exists: {os.path.exists(file_path)}")
-    
-    if not os.path.exists(file_path):
-        app_logger.error(f"File not found: {file_path}")
-        raise HTTPException(status_code=404, detail=f"File not found: {filename}")
-    
     # Determine media type based on extension
     media_type = 'application/octet-stream'
     if filename.endswith('.xlsx'):
@@ -127,14 +201,15 @@ async def download_file(filename: str):
         media_type = 'text/csv'
     elif filename.endswith('.json'):
         media_type = 'application/json'
+    elif filename.endswith('.ndjson'):
+        media_type = 'application/x-ndjson'
+    elif filename.endswith('.parquet'):
+        media_type = 'application/vnd.apache.parquet'
+    elif filename.endswith(('.feather', '.arrow')):
+        media_type = 'application/vnd.apache.arrow.file'
     
-    app_logger.info(f"Sending file: {filename} ({os.path.getsize(file_path)} bytes)")
+    download_name = os.path.basename(name).replace('"', '') if name else filename
     
-    return FileResponse(
-        path=file_path,
-        filename=filename,
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
-    )
+    response = file_download_response(request, file_path, download_name, media_type)
+    app_logger.debug(f"Download {filename}: {response.status_code}")
+    return response
@@ -0,0 +1,189 @@
+"""
+Job Routes
+==========
+API endpoints for queued (background) normalization and export jobs.
+"""
+
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Request
+from app.config import settings
+from app.models.schemas import (
+    ColumnNormalizationConfig,
+    ExportJobRequest,
+    JobStatusResponse,
+    NormalizationJobRequest
+)
+from app.services.dataset_lineage import DERIVED, dataset_lineage
+from app.services.export_service import ExportService
+from app.services.job_scheduler import job_scheduler, get_user_id
+from app.services.normalization_engine import NormalizationEngine
+from app.services.upload_handler import UploadHandler
+from app.utils.cancellation import JOB_CANCELLED, CancellationToken, OperationCancelled
+from app.utils.logger import app_logger
+
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+
+# ============================================================================
+# JOB HANDLERS (run on the scheduler's worker pool)
+# ============================================================================
+
+def run_normalization_job(job_id: str, payload: Dict[str, Any], cancel_token: CancellationToken) -> Dict[str, Any]:
+    """Normalize a dataset and store the result under a new file ID"""
+    columns_config = [ColumnNormalizationConfig(**config) for config in payload['columns_config']]
+    
+    chunked = UploadHandler.get_chunked(payload['file_id'])
+    if chunked is not None:
+        # No partial result out of core: a cancelled job stores nothing
+        normalized_file_id = UploadHandler.generate_file_id()
+        _, statistics = NormalizationEngine.normalize_chunked(
+            chunked, normalized_file_id, columns_config, cancel_token
+        )
+        dataset_lineage.record(normalized_file_id, DERIVED, parent_id=payload['file_id'])
+        app_logger.info(f"Normalization job {job_id}: {payload['file_id']} -> {normalized_file_id} (out of core)")
+        return {
+            'normalized_file_id': normalized_file_id,
+            'statistics': [stats.model_dump() for stats in statistics],
+            'partial': False,
+            'cancel_reason': None
+        }
+    
+    df = UploadHandler.get_source(payload['file_id'])
+    change_masks = {}
+    normalized_df, statistics = NormalizationEngine.normalize_dataframe(
+        df, columns_config, cancel_token, change_masks
+    )
+    if cancel_token.reason == JOB_CANCELLED:
+        raise OperationCancelled(cancel_token.reason)
+    
+    # Stored as the changed columns on top of the original
+    normalized_file_id = UploadHandler.generate_file_id()
+    UploadHandler.store_delta(
+        normalized_file_id,
+        payload['file_id'],
+        normalized_df,
+        change_masks,
+        UploadHandler.get_column_types(payload['file_id'])
+    )
+    
+    app_logger.info(f"Normalization job {job_id}: {payload['file_id']} -> {normalized_file_id}")
+    return {
+        'normalized_file_id': normalized_file_id,
+        'statistics': [stats.model_dump() for stats in statistics],
+        'partial': cancel_token.cancelled,
+        'cancel_reason': cancel_token.reason
+    }
+
+
+def run_export_job(job_id: str, payload: Dict[str, Any], cancel_token: CancellationToken) -> Dict[str, Any]:
+    """Export a dataset to a file (reusing an identical cached export)"""
+    file_path, download_name = ExportService.export_stored(
+        payload['file_id'],
+        payload['format'],
+        payload.get('filename'),
+        cancel_token=cancel_token,
+        compact=payload.get('compact', False),
+        compression=payload.get('compression'),
+        row_group_size=payload.get('row_group_size')
+    )
+    return {
+        'file_path': file_path,
+        'download_url': ExportService.get_download_url(file_path, download_name)
+    }
+
+
+def check_dataset_after_restart(payload: Dict[str, Any]) -> Optional[str]:
+    """In-memory datasets do not survive a restart; jobs queued for them cannot run"""
+    if UploadHandler.has_dataset(payload['file_id']):
+        return None
+    return f"Dataset {payload['file_id']} was lost when the server restarted; upload it again and resubmit the job"
+
+
+job_scheduler.register('normalize', run_normalization_job, on_recover=check_dataset_after_restart)
+job_scheduler.register('export', run_export_job, on_recover=check_dataset_after_restart)
+
+
+def _choose_lane(priority: Optional[str], file_id: str) -> str:
+    """Use requested priority, else interactive for small datasets"""
+    if priority:
+        return priority
+    rows = UploadHandler.get_row_count(file_id)
+    return 'interactive' if rows <= settings.JOB_INTERACTIVE_MAX_ROWS else 'bulk'
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+@router.post("/normalize", response_model=JobStatusResponse)
+async def submit_normalization_job(request: NormalizationJobRequest, http_request: Request):
+    """
+    Queue a normalization job
+    
+    Args:
+        request: Normalization request with optional priority lane
+    
+    Returns:
+        Job status (poll /api/jobs/{job_id} for the result)
+    """
+    lane = _choose_lane(request.priority, request.file_id)
+    payload = request.model_dump(include={'file_id', 'columns_config', 'time_budget_seconds'})
+    return job_scheduler.submit('normalize', payload, get_user_id(http_request), lane=lane)
+
+
+@router.post("/export", response_model=JobStatusResponse)
+async def submit_export_job(request: ExportJobRequest, http_request: Request):
+    """
+    Queue an export job
+    
+    Args:
+        request: Export request with optional priority lane
+    
+    Returns:
+        Job status (poll /api/jobs/{job_id} for the download URL)
+    """
+    lane = _choose_lane(request.priority, request.file_id)
+    payload = request.model_dump(
+        include={'file_id', 'format', 'filename', 'compact', 'compression', 'row_group_size'}
+    )
+    return job_scheduler.submit('export', payload, get_user_id(http_request), lane=lane)
+
+
+@router.get("/", response_model=List[JobStatusResponse])
+async def list_jobs(http_request: Request, status: Optional[str] = None, mine: bool = True, limit: int = 50):
+    """
+    List recent jobs
+    
+    Args:
+        status: Optional status filter (queued, running, completed, failed, cancelled)
+        mine: Only jobs submitted by the calling user
+        limit: Maximum number of jobs
+    """
+    user_id = get_user_id(http_request) if mine else None
+    return job_scheduler.list_jobs(user_id=user_id, status=status, limit=max(1, min(limit, 500)))
+
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    Get job status and, once finished, its result
+    
+    Args:
+        job_id: Job ID
+    """
+    return job_scheduler.get(job_id)
+
+
+@router.post("/{job_id}/cancel", response_model=JobStatusResponse)
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job
+    
+    Args:
+        job_id: Job ID
+    
+    Returns:
+        Job status (a running job becomes "cancelled" once it stops)
+    """
+    return job_scheduler.cancel(job_id)
@@ -4,11 +4,15 @@ Normalization Routes
 API endpoints for data normalization operations.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app.models.schemas import NormalizationRequest, NormalizationResponse, PreviewComparison
 from app.services.upload_handler import UploadHandler
 from app.services.normalization_engine import NormalizationEngine
 from app.services.data_analyzer import DataAnalyzer
+from app.services.chunked_datasets import ChunkedDataset, iter_frames
+from app.services.dataset_lineage import DERIVED, dataset_lineage
+from app.utils.cancellation import CLIENT_DISCONNECTED, CancellationToken, OperationCancelled
+from app.utils.executor import run_blocking, run_cancellable
 from app.utils.logger import app_logger
 
 
@@ -16,10 +20,18 @@ router = APIRouter(prefix="/api/normalize", tags=["Normalization"])
 
 
 @router.post("/", response_model=NormalizationResponse)
-async def normalize_data(request: NormalizationRequest):
+async def normalize_data(request: NormalizationRequest, http_request: Request):
     """
     Normalize data based on column configurations
     
+    Normalization stops early when the client disconnects. When the optional
+    time budget runs out, the columns finished so far are stored and
+    returned with partial=True.
+    
+    Chunked (out-of-core) datasets are normalized chunk by chunk into a new
+    chunked dataset. They have no partial result: when the time budget runs
+    out nothing is stored and the request fails with 408.
+    
     Args:
         request: Normalization request with file_id and column configs
     
@@ -27,23 +39,59 @@ async def normalize_data(request: NormalizationRequest):
         Normalization response with new file_id and statistics
     """
     try:
-        # Get original data
-        original_df = UploadHandler.get_data(request.file_id)
+        cancel_token = CancellationToken(request.time_budget_seconds)
+        
+        chunked = UploadHandler.get_chunked(request.file_id)
+        if chunked is not None:
+            return await _normalize_chunked(request, chunked, http_request, cancel_token)
+        
+        # Get original data (not copied: normalization never modifies it)
+        original_df = await run_blocking("normalize", UploadHandler.get_source, request.file_id)
         
         # Normalize data
-        normalized_df, statistics = NormalizationEngine.normalize_dataframe(
+        change_masks = {}
+        normalized_df, statistics = await run_cancellable(
+            "normalize",
+            http_request,
+            cancel_token,
+            NormalizationEngine.normalize_dataframe,
             original_df,
-            request.columns_config
+            request.columns_config,
+            cancel_token,
+            change_masks
         )
         
-        # Generate new file ID for normalized data
+        if cancel_token.reason == CLIENT_DISCONNECTED:
+            app_logger.info(f"Normalization of {request.file_id} abandoned by client")
+            raise HTTPException(status_code=499, detail="Client closed request")
+        
+        # Generate new file ID for normalized data, stored as the changed
+        # columns on top of the original
         normalized_file_id = UploadHandler.generate_file_id()
-        UploadHandler.store_data(normalized_file_id, normalized_df)
+        await run_blocking(
+            "normalize",
+            UploadHandler.store_delta,
+            normalized_file_id,
+            request.file_id,
+            normalized_df,
+            change_masks,
+            UploadHandler.get_column_types(request.file_id)
+        )
         
         app_logger.info(
             f"Normalization completed: {request.file_id} -> {normalized_file_id}"
         )
         
+        if cancel_token.cancelled:
+            return NormalizationResponse(
+                success=True,
+                message=f"Data partially normalized ({len(statistics)} column(s) finished before the time budget ran out)",
+                normalized_file_id=normalized_file_id,
+                statistics=statistics,
+                partial=True,
+                cancel_reason=cancel_token.reason
+            )
+        
         return NormalizationResponse(
             success=True,
             message="Data normalized successfully",
@@ -58,6 +106,48 @@ async def normalize_data(request: NormalizationRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _normalize_chunked(
+    request: NormalizationRequest,
+    dataset: ChunkedDataset,
+    http_request: Request,
+    cancel_token: CancellationToken
+) -> NormalizationResponse:
+    """Normalize a chunked dataset into a new chunked dataset"""
+    normalized_file_id = UploadHandler.generate_file_id()
+    try:
+        _, statistics = await run_cancellable(
+            "normalize",
+            http_request,
+            cancel_token,
+            NormalizationEngine.normalize_chunked,
+            dataset,
+            normalized_file_id,
+            request.columns_config,
+            cancel_token
+        )
+    except OperationCancelled as e:
+        if e.reason == CLIENT_DISCONNECTED:
+            app_logger.info(f"Normalization of {request.file_id} abandoned by client")
+            raise HTTPException(status_code=499, detail="Client closed request")
+        app_logger.info(f"Normalization of {request.file_id} stopped: {e.reason}")
+        raise HTTPException(
+            status_code=408,
+            detail="Time budget ran out before the dataset was normalized (large datasets have no partial result)"
+        )
+    
+    dataset_lineage.record(normalized_file_id, DERIVED, parent_id=request.file_id)
+    app_logger.info(
+        f"Normalization completed: {request.file_id} -> {normalized_file_id} (out of core)"
+    )
+    
+    return NormalizationResponse(
+        success=True,
+        message="Data normalized successfully",
+        normalized_file_id=normalized_file_id,
+        statistics=statistics
+    )
+
+
 @router.get("/preview/{original_file_id}/{normalized_file_id}", response_model=PreviewComparison)
 async def preview_normalization(original_file_id: str, normalized_file_id: str, limit: int = 10):
     """
@@ -72,24 +162,34 @@ async def preview_normalization(original_file_id: str, normalized_file_id: str,
         Preview comparison with original and normalized data
     """
     try:
-        # Get both datasets
-        original_df = UploadHandler.get_data(original_file_id)
-        normalized_df = UploadHandler.get_data(normalized_file_id)
+        # Get both datasets (chunked datasets are compared chunk by chunk)
+        original = UploadHandler.get_source(original_file_id)
+        normalized = UploadHandler.get_source(normalized_file_id)
         
-        # Get preview data
-        original_preview = DataAnalyzer.get_preview_data(original_df, limit)
-        normalized_preview = DataAnalyzer.get_preview_data(normalized_df, limit)
+        # Get preview data (reading the head of a chunked dataset is blocking)
+        original_head = await run_blocking("analyze", original.head, limit)
+        normalized_head = await run_blocking("analyze", normalized.head, limit)
+        original_preview = DataAnalyzer.get_preview_data(original_head, limit)
+        normalized_preview = DataAnalyzer.get_preview_data(normalized_head, limit)
         
-        # Calculate statistics for all columns
-        statistics = []
-        for column in original_df.columns:
-            if column in normalized_df.columns:
-                stats = NormalizationEngine._calculate_statistics(
-                    column,
-                    original_df[column],
-                    normalized_df[column]
-                )
-                statistics.append(stats)
+        # Calculate statistics for all columns (recorded when the normalized
+        # dataset was stored as a delta of the original)
+        change_masks = UploadHandler.get_change_masks(normalized_file_id, original_file_id)
+        if change_masks is not None:
+            statistics = NormalizationEngine.compare_with_masks(original.columns, change_masks, len(original))
+        elif isinstance(original, ChunkedDataset) or isinstance(normalized, ChunkedDataset):
+            statistics = await run_blocking(
+                "analyze",
+                NormalizationEngine.compare_chunks,
+                zip(iter_frames(original), iter_frames(normalized))
+            )
+        else:
+            statistics = await run_blocking(
+                "analyze",
+                NormalizationEngine.compare_dataframes,
+                original,
+                normalized
+            )
         
         return PreviewComparison(
             original_data=original_preview,
@@ -1,7 +1,16 @@
 from fastapi import APIRouter, Request, UploadFile, File, Form
 from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from typing import Optional
 from app.services.pendampingan_service import PendampinganService
+from app.services.import_job_manager import ImportJobManager
+from app.services.job_scheduler import job_scheduler, get_user_id
+from app.services.storage_collector import storage_collector
+from app.config import settings
+from app.utils.cancellation import CancellationToken
+from app.utils.executor import iterate_in_worker, run_blocking
+import asyncio
+import io
 import shutil
 import os
 
@@ -12,6 +21,11 @@ router = APIRouter(
 
 templates = Jinja2Templates(directory="templates")
 service = PendampinganService()
+job_manager = ImportJobManager(service, job_scheduler)
+storage_collector.register('import_jobs', job_manager.expire, lambda: settings.IMPORT_JOB_TTL_SECONDS)
+
+# Seconds between polls of a job's event buffer while streaming
+JOB_STREAM_POLL_INTERVAL = 0.5
 
 @router.get("/", response_class=HTMLResponse)
 async def pendampingan_page(request: Request):
@@ -22,27 +36,123 @@ async def pendampingan_page(request: Request):
     )
 
 @router.post("/import")
-async def import_pendampingan(file: UploadFile = File(...)):
-    """Import Pendampingan Data handle as SSE"""
-    content = await file.read()
+async def import_pendampingan(file: UploadFile = File(...), time_budget_seconds: Optional[float] = Form(None)):
+    """
+    Import Pendampingan Data handle as SSE
+    
+    The import runs in the worker pool and stops after the current batch when
+    the client disconnects or the optional time budget runs out.
+    """
+    # FastAPI closes the form's files as soon as this handler returns, but the
+    # import streams from the spooled upload while the response is sent.
+    # Detach the underlying file and close it when the stream ends.
+    source = file.file
+    file.file = io.BytesIO()
+    cancel_token = CancellationToken(time_budget_seconds)
+    
+    def event_stream():
+        try:
+            yield from service.process_import(source, file.size, cancel_token=cancel_token)
+        finally:
+            source.close()
     
     return StreamingResponse(
-        service.process_import(content),
+        iterate_in_worker("import", event_stream(), cancel_token),
         media_type="text/event-stream"
     )
 
-from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse
+@router.post("/jobs")
+async def create_import_job(request: Request, file: UploadFile = File(...)):
+    """Queue Pendampingan import as a background job"""
+    job = await run_blocking("upload", job_manager.submit, file, get_user_id(request))
+    job_id = job['job_id']
+    return {
+        **job,
+        'status_url': f"/pendampingan/jobs/{job_id}",
+        'stream_url': f"/pendampingan/jobs/{job_id}/stream",
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str):
+    """Get import job status"""
+    return job_manager.get_status(job_id)
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_import_job(job_id: str):
+    """Cancel import job (rows already committed are kept)"""
+    return job_manager.cancel(job_id)
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_import_job(job_id: str, request: Request, after: int = 0):
+    """
+    Stream import job events as SSE.
+    
+    Clients can (re)attach at any time; pass the last seen event id as
+    `after` or via the Last-Event-ID header to continue where they left off.
+    """
+    status = job_manager.get_status(job_id)
+    try:
+        last_seen = int(request.headers.get('last-event-id', after))
+    except ValueError:
+        last_seen = after
+    
+    async def event_stream():
+        nonlocal last_seen
+        snapshot = {key: status[key] for key in ('status', 'progress', 'stats', 'failed_report_url') if status.get(key) is not None}
+        if not last_seen and status.get('recent_logs'):
+            snapshot['logs'] = status['recent_logs']
+        yield service.format_sse(snapshot)
+        
+        while True:
+            events, finished = job_manager.get_events(job_id, last_seen)
+            for seq, event in events:
+                last_seen = seq
+                yield f"id: {seq}\n" + service.format_sse(event)
+            if finished:
+                break
+            await asyncio.sleep(JOB_STREAM_POLL_INTERVAL)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+from fastapi.responses import HTMLResponse, StreamingResponse
+from mimetypes import guess_type
 import os
-from app.config import settings
+from app.utils.file_download import file_download_response
 
 # ... (rest of imports)
 
-@router.get("/exports/{filename}")
-async def download_export(filename: str):
+@router.api_route("/exports/{filename}", methods=["GET", "HEAD"])
+async def download_export(filename: str, request: Request):
+    """Download an exported file (ETag, byte ranges and pre-compressed .gz supported)"""
     file_path = os.path.join(settings.EXPORT_DIR, filename)
-    if os.path.exists(file_path):
-        return FileResponse(file_path, filename=filename)
-    return {"error": "File not found"}
+    return file_download_response(request, file_path, filename, guess_type(filename)[0] or 'application/octet-stream')
+
+@router.get("/failures/{job_id}")
+async def list_import_failures(job_id: str, reason: Optional[str] = None, offset: int = 0, limit: int = 100):
+    """Page through failed rows of an import, optionally filtered by reason"""
+    limit = max(1, min(limit, 1000))
+    return service.failure_store.list_failures(job_id, reason=reason, offset=max(0, offset), limit=limit)
+
+@router.get("/failures/{job_id}/summary")
+async def summarize_import_failures(job_id: str):
+    """Count failed rows of an import per reason"""
+    return service.failure_store.summary(job_id)
+
+@router.get("/failures/{job_id}/export")
+async def export_import_failures(job_id: str, reason: Optional[str] = None, records_only: bool = False):
+    """
+    Download failed rows as JSON.
+    
+    With records_only=true the file contains just the original records and
+    can be fixed and uploaded again through /pendampingan/import.
+    """
+    suffix = '_records' if records_only else ''
+    filename = f"failed_import_{job_id}{suffix}.json"
+    return StreamingResponse(
+        service.failure_store.iter_export(job_id, reason=reason, records_only=records_only),
+        media_type="application/json",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @router.post("/validate")
 async def validate_pendampingan(
@@ -52,5 +162,5 @@ async def validate_pendampingan(
 ):
     """Validate Pendampingan Data"""
     content = await file.read()
-    result = service.validate_data(content, fix=fix, dry_run=dry_run)
+    result = await run_blocking("database", service.validate_data, content, fix=fix, dry_run=dry_run)
     return result
@@ -0,0 +1,46 @@
+"""
+Storage Routes
+==============
+API endpoints for dataset lineage and storage collection.
+"""
+
+from fastapi import APIRouter, HTTPException
+from app.models.schemas import LineageResponse, StorageCollectResponse
+from app.services.dataset_lineage import dataset_lineage
+from app.services.storage_collector import storage_collector
+from app.utils.executor import run_blocking
+
+
+router = APIRouter(prefix="/api/storage", tags=["Storage"])
+
+
+@router.post("/collect", response_model=StorageCollectResponse)
+async def collect_storage():
+    """
+    Run the storage collector now
+
+    Returns:
+        Report of the removed datasets and files, and the bytes reclaimed
+    """
+    return await run_blocking("storage", storage_collector.collect)
+
+
+@router.get("/lineage/{file_id}", response_model=LineageResponse)
+async def get_lineage(file_id: str):
+    """
+    Get where a dataset came from and what was derived from it
+
+    Args:
+        file_id: File ID
+
+    Returns:
+        The dataset's node, its ancestors (nearest first) and its children
+    """
+    node = dataset_lineage.get(file_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"File ID not found: {file_id}")
+    return {
+        'dataset': node,
+        'ancestors': dataset_lineage.ancestors(file_id),
+        'children': dataset_lineage.children(file_id),
+    }
@@ -4,8 +4,9 @@ Upload Routes
 API endpoints for file upload operations.
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.models.schemas import UploadResponse, ErrorResponse
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from app.models.schemas import UploadResponse, UploadedDataset, ErrorResponse
 from app.services.upload_handler import UploadHandler
 from app.utils.logger import app_logger
 
@@ -14,26 +15,62 @@ router = APIRouter(prefix="/api/upload", tags=["Upload"])
 
 
 @router.post("/file", response_model=UploadResponse)
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    file: UploadFile = File(...),
+    columns: Optional[str] = Form(None),
+    sheets: Optional[str] = Form(None),
+    header_row: Optional[int] = Form(None, ge=1)
+):
     """
-    Upload a file (JSON, CSV, or Excel)
+    Upload a file (JSON, CSV, Excel, Parquet, or Arrow/Feather)
+    
+    Files may be compressed (.gz, .bz2, .zst). A .zip archive creates one
+    dataset per supported file inside it, and an Excel workbook one dataset
+    per selected sheet.
     
     Args:
         file: Uploaded file
+        columns: Optional comma-separated list of columns to load
+        sheets: Optional comma-separated Excel sheet names or 0-based
+            indexes, or "*" for all sheets (default: first sheet)
+        header_row: Optional Excel row number of the header (default:
+            detected, skipping title rows above the table)
     
     Returns:
         Upload response with file ID and basic info
     """
     try:
-        file_id, df, filename = await UploadHandler.handle_file_upload(file)
+        column_list = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+        sheet_list = [s.strip() for s in sheets.split(',') if s.strip()] if sheets else None
+        uploaded = await UploadHandler.handle_file_upload(file, column_list, sheet_list, header_row)
+        datasets = [
+            UploadedDataset(
+                file_id=file_id,
+                filename=filename,
+                rows=len(df),
+                columns=df.columns.tolist(),
+                csv_dialect=details.get('csv_dialect'),
+                column_types=details.get('column_types', {}),
+                reused=details.get('reused', False),
+                out_of_core=details.get('out_of_core', False)
+            )
+            for file_id, df, filename, details in uploaded
+        ]
+        first = datasets[0]
         
         return UploadResponse(
             success=True,
-            message="File uploaded successfully",
-            file_id=file_id,
-            filename=filename,
-            rows=len(df),
-            columns=df.columns.tolist()
+            message=(
+                "File uploaded successfully" if len(datasets) == 1
+                else f"File uploaded successfully ({len(datasets)} datasets)"
+            ),
+            file_id=first.file_id,
+            filename=first.filename,
+            rows=first.rows,
+            columns=first.columns,
+            csv_dialect=first.csv_dialect,
+            column_types=first.column_types,
+            datasets=datasets
         )
     
     except HTTPException:
@@ -0,0 +1,262 @@
+"""
+Chunked Datasets
+================
+Out-of-core storage for datasets larger than memory.
+
+Uploads of at least settings.OUT_OF_CORE_THRESHOLD_BYTES are not loaded
+into the in-memory store. They are converted chunk by chunk into a Parquet
+file under settings.OUT_OF_CORE_DIR, one row group per
+settings.OUT_OF_CORE_CHUNK_ROWS rows. Analysis, normalization and export
+then read the file one chunk at a time, so memory depends on the chunk
+size, not the dataset size. Normalizing such a dataset writes a new
+chunked dataset the same way.
+
+A dataset file is written once (under a partial name, then renamed) and
+never modified. Its schema metadata holds the semantic column types and a
+content hash derived from how it was produced, so identical results share
+cached exports.
+
+Requires pyarrow.
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from app.config import settings
+from app.utils.cancellation import CancellationToken
+from app.utils.columnar import require_pyarrow, write_parquet_frames
+from app.utils.concurrent_store import ConcurrentStore
+from app.utils.logger import app_logger
+
+
+class ChunkedDataset:
+    """
+    Handle to a dataset stored as Parquet row groups.
+
+    Only the file footer is read when the handle is created; rows are read
+    chunk by chunk. Supports len(), .columns and .head() like a DataFrame.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize handle
+
+        Args:
+            path: Path to the Parquet file
+        """
+        require_pyarrow()
+        import pyarrow.parquet as pq
+
+        self.path = str(path)
+        metadata = pq.read_metadata(self.path)
+        schema = metadata.schema.to_arrow_schema()
+        custom = schema.metadata or {}
+
+        self.num_rows = metadata.num_rows
+        self.columns = pd.Index(schema.names)
+        self.content_hash: Optional[str] = custom.get(b'content_hash', b'').decode('utf-8') or None
+        self.column_types: Dict[str, str] = json.loads(custom.get(b'column_types', b'{}'))
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def iter_chunks(
+        self,
+        chunk_rows: Optional[int] = None,
+        columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the dataset chunk by chunk
+
+        Every chunk except the last has exactly chunk_rows rows, and chunks
+        are indexed by row number, so chunks of two datasets with the same
+        length line up.
+
+        Args:
+            chunk_rows: Rows per chunk (default: settings.OUT_OF_CORE_CHUNK_ROWS)
+            columns: Optional subset of columns to read
+
+        Yields:
+            DataFrame per chunk
+        """
+        pa = require_pyarrow()
+        import pyarrow.parquet as pq
+
+        chunk_rows = max(1, chunk_rows or settings.OUT_OF_CORE_CHUNK_ROWS)
+        parquet_file = pq.ParquetFile(self.path)
+        schema = parquet_file.schema_arrow
+        if columns:
+            schema = pa.schema([schema.field(name) for name in columns], metadata=schema.metadata)
+
+        start = 0
+        pending = []
+        pending_rows = 0
+        try:
+            # Batches end at row group boundaries; re-slice them to chunk_rows
+            for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+                pending.append(batch)
+                pending_rows += batch.num_rows
+                while pending_rows >= chunk_rows:
+                    table = pa.Table.from_batches(pending, schema=schema)
+                    yield self._to_frame(table.slice(0, chunk_rows), start)
+                    start += chunk_rows
+                    rest = table.slice(chunk_rows)
+                    pending, pending_rows = rest.to_batches(), rest.num_rows
+            if pending_rows:
+                yield self._to_frame(pa.Table.from_batches(pending, schema=schema), start)
+        finally:
+            parquet_file.close()
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        """First n rows"""
+        for chunk in self.iter_chunks(max(1, n)):
+            return chunk.head(n)
+        return pd.DataFrame(columns=self.columns)
+
+    @staticmethod
+    def _to_frame(table, start: int) -> pd.DataFrame:
+        """Convert a slice of the dataset, indexed by row number"""
+        pa = require_pyarrow()
+
+        types_mapper = {pa.string(): pd.StringDtype('pyarrow')}.get if settings.INGEST_ARROW_STRINGS else None
+        frame = table.to_pandas(types_mapper=types_mapper)
+        frame.index = pd.RangeIndex(start, start + len(frame))
+        return frame
+
+
+class ChunkedDatasetStore:
+    """
+    Service that writes and opens chunked datasets by file ID.
+    """
+
+    def __init__(self, dataset_dir: str = None):
+        """
+        Initialize store
+
+        Args:
+            dataset_dir: Directory for dataset files (default: settings.OUT_OF_CORE_DIR)
+        """
+        self.dataset_dir = Path(dataset_dir or settings.OUT_OF_CORE_DIR)
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        # File ID -> open handle (dataset files never change once written)
+        self._datasets = ConcurrentStore()
+
+    def path(self, file_id: str) -> Optional[Path]:
+        """Path of a dataset file, or None if file_id is not a valid ID"""
+        try:
+            uuid.UUID(file_id)
+        except ValueError:
+            return None
+        return self.dataset_dir / f"{file_id}.parquet"
+
+    def get(self, file_id: str) -> Optional[ChunkedDataset]:
+        """
+        Open a chunked dataset
+
+        Args:
+            file_id: File ID
+
+        Returns:
+            Dataset handle, or None if there is no chunked dataset with this ID
+        """
+        dataset = self._datasets.get(file_id)
+        if dataset is not None:
+            return dataset
+
+        path = self.path(file_id)
+        if path is None or not path.exists():
+            return None
+        # Concurrent requests open the file (and read its footer) once
+        return self._datasets.get_or_load(file_id, lambda: ChunkedDataset(str(path)))
+
+    def write(
+        self,
+        file_id: str,
+        frames: Iterable[pd.DataFrame],
+        column_types: Dict[str, str],
+        content_hash: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> ChunkedDataset:
+        """
+        Write a chunked dataset from a sequence of frames
+
+        Args:
+            file_id: File ID of the new dataset
+            frames: DataFrames with the same columns (at least one)
+            column_types: Semantic column types to record
+            content_hash: Hash identifying the content
+            cancel_token: Optional token checked between frames
+
+        Returns:
+            Handle to the new dataset
+
+        Raises:
+            OperationCancelled: If the token was cancelled (nothing is kept)
+        """
+        path = self.path(file_id)
+        partial_path = path.with_name(f"{path.name}.partial")
+        try:
+            rows = write_parquet_frames(
+                frames,
+                str(partial_path),
+                row_group_size=settings.OUT_OF_CORE_CHUNK_ROWS,
+                cancel_token=cancel_token,
+                metadata={'column_types': json.dumps(column_types), 'content_hash': content_hash}
+            )
+            os.replace(partial_path, path)
+        except BaseException:
+            if partial_path.exists():
+                partial_path.unlink()
+            raise
+
+        app_logger.info(f"Chunked dataset written: {file_id} ({rows} rows)")
+        return self.get(file_id)
+
+    def forget(self, file_id: str) -> None:
+        """Drop the open handle of a dataset (e.g. before its file is deleted)"""
+        self._datasets.pop(file_id, None)
+
+    def delete(self, file_id: str) -> bool:
+        """
+        Delete a chunked dataset
+
+        Returns:
+            True if a dataset was deleted
+        """
+        self.forget(file_id)
+        path = self.path(file_id)
+        if path is None or not path.exists():
+            return False
+        path.unlink()
+        return True
+
+
+def iter_frames(
+    source: Union[pd.DataFrame, ChunkedDataset],
+    chunk_rows: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over an in-memory or chunked dataset in chunks of chunk_rows
+
+    Args:
+        source: DataFrame or chunked dataset
+        chunk_rows: Rows per chunk (default: settings.OUT_OF_CORE_CHUNK_ROWS)
+
+    Yields:
+        DataFrame per chunk
+    """
+    chunk_rows = max(1, chunk_rows or settings.OUT_OF_CORE_CHUNK_ROWS)
+    if isinstance(source, ChunkedDataset):
+        yield from source.iter_chunks(chunk_rows)
+        return
+    for start in range(0, len(source), chunk_rows):
+        yield source.iloc[start:start + chunk_rows]
+
+
+# Global chunked dataset store instance
+chunked_datasets = ChunkedDatasetStore()
@@ -5,8 +5,7 @@ Analyzes data quality and detects issues in columns.
 """
 
 import pandas as pd
-import numpy as np
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 from app.models.schemas import ColumnIssue
 from app.utils.validators import (
     has_excessive_whitespace,
@@ -16,6 +15,7 @@ from app.utils.validators import (
     is_valid_email
 )
 from app.utils.logger import app_logger
+from app.utils.type_inference import EMAIL, SK_NUMBER
 
 
 class DataAnalyzer:
@@ -24,33 +24,80 @@ class DataAnalyzer:
     """
     
     @staticmethod
-    def analyze_dataframe(df: pd.DataFrame) -> List[ColumnIssue]:
+    def analyze_dataframe(df: pd.DataFrame, column_types: Optional[Dict[str, str]] = None) -> List[ColumnIssue]:
         """
         Analyze all columns in a DataFrame
         
         Args:
             df: DataFrame to analyze
+            column_types: Optional semantic column types inferred at upload
         
         Returns:
             List of ColumnIssue objects
         """
         column_issues = []
+        column_types = column_types or {}
         
         for column in df.columns:
-            issue = DataAnalyzer.analyze_column(df, column)
+            issue = DataAnalyzer.analyze_column(df, column, column_types.get(str(column)))
             column_issues.append(issue)
         
         app_logger.info(f"Analyzed {len(column_issues)} columns")
         return column_issues
     
     @staticmethod
-    def analyze_column(df: pd.DataFrame, column: str) -> ColumnIssue:
+    def analyze_chunks(
+        chunks: Iterable[pd.DataFrame],
+        column_types: Optional[Dict[str, str]] = None
+    ) -> List[ColumnIssue]:
+        """
+        Analyze a dataset chunk by chunk (for chunked, out-of-core datasets)
+        
+        Counts are added up over the chunks; sample values are the first
+        distinct values found.
+        
+        Args:
+            chunks: DataFrames with the same columns, covering the dataset
+            column_types: Optional semantic column types inferred at upload
+        
+        Returns:
+            List of ColumnIssue objects
+        """
+        column_types = column_types or {}
+        count_fields = (
+            'total_rows', 'null_count', 'has_leading_trailing_spaces', 'has_excessive_whitespace',
+            'has_inconsistent_case', 'has_special_characters', 'invalid_emails', 'invalid_sk_numbers'
+        )
+        merged: Dict[Any, ColumnIssue] = {}
+        
+        for chunk in chunks:
+            for column in chunk.columns:
+                issue = DataAnalyzer.analyze_column(chunk, column, column_types.get(str(column)))
+                total = merged.get(column)
+                if total is None:
+                    merged[column] = issue
+                    continue
+                for field in count_fields:
+                    setattr(total, field, getattr(total, field) + getattr(issue, field))
+                total.sample_values = list(dict.fromkeys(total.sample_values + issue.sample_values))[:5]
+        
+        for issue in merged.values():
+            issue.null_percentage = round(
+                issue.null_count / issue.total_rows * 100, 2
+            ) if issue.total_rows > 0 else 0
+        
+        app_logger.info(f"Analyzed {len(merged)} columns (chunked)")
+        return list(merged.values())
+    
+    @staticmethod
+    def analyze_column(df: pd.DataFrame, column: str, semantic_type: Optional[str] = None) -> ColumnIssue:
         """
         Analyze a single column for issues
         
         Args:
             df: DataFrame
             column: Column name
+            semantic_type: Optional semantic type inferred at upload
         
         Returns:
             ColumnIssue object
@@ -62,48 +109,49 @@ class DataAnalyzer:
         null_count = col_data.isna().sum()
         null_percentage = (null_count / total_rows * 100) if total_rows > 0 else 0
         
-        # Analyze non-null string values
-        string_data = col_data.dropna().astype(str)
+        # Check each distinct non-null value once, weighted by how often it
+        # occurs; category and string columns are counted in their own dtype
+        distinct_values = DataAnalyzer._distinct_values(col_data)
         
         # Check for leading/trailing spaces
         leading_trailing_count = sum(
-            has_leading_trailing_spaces(str(val)) for val in string_data
+            count for val, count in distinct_values if has_leading_trailing_spaces(val)
         )
         
         # Check for excessive whitespace
         excessive_whitespace_count = sum(
-            has_excessive_whitespace(str(val)) for val in string_data
+            count for val, count in distinct_values if has_excessive_whitespace(val)
         )
         
         # Check for inconsistent case
         inconsistent_case_count = sum(
-            is_inconsistent_case(str(val)) for val in string_data
+            count for val, count in distinct_values if is_inconsistent_case(val)
         )
         
         # Check for special characters
         special_chars_count = sum(
-            has_special_characters(str(val)) for val in string_data
+            count for val, count in distinct_values if has_special_characters(val)
         )
         
         # Detect column type and perform specific validations
         invalid_emails = 0
         invalid_sk_numbers = 0
         
-        # Simple email detection (column name contains 'email' or 'mail')
-        if 'email' in column.lower() or 'mail' in column.lower():
+        # Email detection (inferred type, or column name contains 'email' or 'mail')
+        if semantic_type == EMAIL or 'email' in column.lower() or 'mail' in column.lower():
             invalid_emails = sum(
-                not is_valid_email(str(val)) for val in string_data if val
+                count for val, count in distinct_values if val and not is_valid_email(val)
             )
         
-        # Simple SK detection (column name contains 'sk' or 'nomor')
-        if any(keyword in column.lower() for keyword in ['sk', 'nomor', 'number']):
+        # SK detection (inferred type, or column name contains 'sk' or 'nomor')
+        if semantic_type == SK_NUMBER or any(keyword in column.lower() for keyword in ['sk', 'nomor', 'number']):
             from app.utils.validators import is_valid_sk_number
             invalid_sk_numbers = sum(
-                not is_valid_sk_number(str(val)) for val in string_data if val
+                count for val, count in distinct_values if val and not is_valid_sk_number(val)
             )
         
         # Get sample values (first 5 non-null unique values)
-        sample_values = string_data.unique()[:5].tolist()
+        sample_values = list(dict.fromkeys(val for val, _ in distinct_values))[:5]
         
         return ColumnIssue(
             column_name=column,
@@ -116,9 +164,25 @@ class DataAnalyzer:
             has_special_characters=special_chars_count,
             invalid_emails=invalid_emails,
             invalid_sk_numbers=invalid_sk_numbers,
+            semantic_type=semantic_type,
             sample_values=sample_values
         )
     
+    @staticmethod
+    def _distinct_values(series: pd.Series) -> List[Tuple[str, int]]:
+        """
+        Distinct non-null values of a column as text, with their counts
+        
+        Values are in order of first appearance (category order for
+        category columns).
+        """
+        try:
+            counts = series.value_counts(sort=False, dropna=True)
+        except TypeError:
+            # Unhashable cell values (lists/dicts from JSON uploads)
+            counts = series.dropna().astype(str).value_counts(sort=False)
+        return [(str(value), int(count)) for value, count in counts.items() if count > 0]
+    
     @staticmethod
     def get_preview_data(df: pd.DataFrame, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -131,8 +195,10 @@ class DataAnalyzer:
         Returns:
             List of dictionaries representing rows
         """
-        # Replace NaN with None for JSON serialization
-        preview_df = df.head(limit).replace({np.nan: None})
+        # Replace NaN (and pd.NA of string columns) with None for JSON
+        # serialization; category columns cannot take None as a value
+        preview_df = df.head(limit)
+        preview_df = preview_df.astype(object).where(preview_df.notna(), None)
         return preview_df.to_dict('records')
     
     @staticmethod
@@ -6,8 +6,9 @@ Handles database connections and operations.
 
 import pandas as pd
 from sqlalchemy import create_engine, inspect
-from typing import List
+from typing import List, Union
 from app.models.schemas import DatabaseConnectionSchema
+from app.services.chunked_datasets import ChunkedDataset
 from app.utils.logger import app_logger
 from fastapi import HTTPException
 
@@ -119,7 +120,7 @@ class DatabaseConnector:
     
     @staticmethod
     def write_table(
-        df: pd.DataFrame,
+        df: Union[pd.DataFrame, ChunkedDataset],
         connection_string: str,
         table: str,
         if_exists: str = 'replace'
@@ -127,8 +128,11 @@ class DatabaseConnector:
         """
         Write DataFrame to database table
         
+        A chunked dataset is written one chunk at a time; chunks after the
+        first are appended.
+        
         Args:
-            df: DataFrame to write
+            df: DataFrame (or chunked dataset) to write
             connection_string: Database connection string
             table: Table name
             if_exists: What to do if table exists ('fail', 'replace', 'append')
@@ -141,12 +145,14 @@ class DatabaseConnector:
         """
         try:
             engine = create_engine(connection_string)
-            rows_written = df.to_sql(
-                table,
-                engine,
-                if_exists=if_exists,
-                index=False
-            )
+            chunks = df.iter_chunks() if isinstance(df, ChunkedDataset) else [df]
+            for index, chunk in enumerate(chunks):
+                chunk.to_sql(
+                    table,
+                    engine,
+                    if_exists=if_exists if index == 0 else 'append',
+                    index=False
+                )
             app_logger.info(f"Wrote {len(df)} rows to table '{table}' (mode: {if_exists})")
             return len(df)
         except Exception as e:
@@ -0,0 +1,168 @@
+"""
+Dataset Lineage
+===============
+Where each dataset came from, what was derived from it, and when it was
+last used.
+
+Every stored dataset gets a node when it is created:
+
+- upload: parsed from a file in UPLOAD_DIR (upload_path)
+- stored: stored directly (e.g. a database table)
+- derived: computed from another dataset (parent_id), e.g. normalized;
+  a derived dataset stored as a column delta also names the dataset its
+  unchanged columns are read from (base_id)
+
+Exports made from a dataset are added to its node. The storage collector
+(app.services.storage_collector) uses the nodes to decide what can be
+deleted: datasets idle for longer than their TTL, unless another dataset
+still reads from them, and uploaded files no live dataset came from.
+
+Lineage is kept in memory, like the datasets it describes.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+
+UPLOAD = 'upload'
+STORED = 'stored'
+DERIVED = 'derived'
+
+
+class DatasetLineage:
+    """
+    Service that records the origin, derivations and last use of datasets.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+
+    def record(
+        self,
+        file_id: str,
+        kind: str,
+        parent_id: Optional[str] = None,
+        base_id: Optional[str] = None,
+        upload_path: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> None:
+        """
+        Record a new (or replaced) dataset
+
+        Args:
+            file_id: File ID of the dataset
+            kind: UPLOAD, STORED or DERIVED
+            parent_id: Dataset it was derived from
+            base_id: Dataset whose columns it reads (column deltas)
+            upload_path: Uploaded file it was parsed from
+            filename: Original filename, for display
+        """
+        now = time.time()
+        with self._lock:
+            self._nodes[file_id] = {
+                'file_id': file_id,
+                'kind': kind,
+                'parent_id': parent_id,
+                'base_id': base_id,
+                'upload_path': upload_path,
+                'filename': filename,
+                'exports': [],
+                'created_at': now,
+                'last_access': now,
+                'size': None,
+            }
+
+    def touch(self, file_id: str) -> None:
+        """Mark a dataset as used now"""
+        with self._lock:
+            node = self._nodes.get(file_id)
+            if node is not None:
+                node['last_access'] = time.time()
+
+    def add_export(self, file_id: str, file_path: str) -> None:
+        """Record a file exported from a dataset"""
+        with self._lock:
+            node = self._nodes.get(file_id)
+            if node is not None:
+                if file_path not in node['exports']:
+                    node['exports'].append(file_path)
+                node['last_access'] = time.time()
+
+    def set_size(self, file_id: str, size: int) -> None:
+        """Remember the measured size of a dataset (datasets never change once stored)"""
+        with self._lock:
+            node = self._nodes.get(file_id)
+            if node is not None:
+                node['size'] = size
+
+    def remove(self, file_id: str) -> None:
+        """Forget a deleted dataset"""
+        with self._lock:
+            self._nodes.pop(file_id, None)
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the node of a dataset
+
+        Returns:
+            Copy of the node, or None if the dataset is unknown
+        """
+        with self._lock:
+            node = self._nodes.get(file_id)
+            return self._copy(node) if node is not None else None
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        """Copies of all nodes"""
+        with self._lock:
+            return [self._copy(node) for node in self._nodes.values()]
+
+    def ancestors(self, file_id: str) -> List[Dict[str, Any]]:
+        """
+        Nodes of the datasets a dataset was derived from, nearest first
+
+        Stops at the first ancestor that no longer exists.
+        """
+        chain = []
+        with self._lock:
+            node = self._nodes.get(file_id)
+            seen = {file_id}
+            while node is not None and node['parent_id'] and node['parent_id'] not in seen:
+                seen.add(node['parent_id'])
+                node = self._nodes.get(node['parent_id'])
+                if node is not None:
+                    chain.append(self._copy(node))
+        return chain
+
+    def children(self, file_id: str) -> List[str]:
+        """File IDs of the datasets derived directly from a dataset"""
+        with self._lock:
+            return [node['file_id'] for node in self._nodes.values() if node['parent_id'] == file_id]
+
+    def reference_counts(self) -> Dict[str, int]:
+        """
+        Number of live datasets that read columns from each dataset
+
+        A dataset with a non-zero count must not be deleted.
+        """
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for node in self._nodes.values():
+                if node['base_id']:
+                    counts[node['base_id']] = counts.get(node['base_id'], 0) + 1
+        return counts
+
+    def referenced_uploads(self) -> Set[str]:
+        """Paths of uploaded files that live datasets were parsed from"""
+        with self._lock:
+            return {node['upload_path'] for node in self._nodes.values() if node['upload_path']}
+
+    @staticmethod
+    def _copy(node: Dict[str, Any]) -> Dict[str, Any]:
+        return {**node, 'exports': list(node['exports'])}
+
+
+# Global lineage instance
+dataset_lineage = DatasetLineage()
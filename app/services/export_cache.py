@@ -0,0 +1,238 @@
+"""
+Export Cache
+============
+Content-addressed cache of exported files.
+
+An export is identified by (dataset content hash, format, options). When the
+same dataset is exported again with the same settings, the existing file in
+EXPORT_DIR is returned instead of serializing the whole frame again.
+
+Entries are indexed in SQLite with their size and last access time; when the
+cached files exceed settings.EXPORT_CACHE_MAX_BYTES, the least recently used
+ones are deleted (together with their pre-compressed ".gz" variant). The
+storage collector also expires entries that were not used for
+settings.EXPORT_TTL_SECONDS.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.config import settings
+from app.utils.file_download import PRECOMPRESSED_SUFFIX
+from app.utils.logger import app_logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS export_cache (
+    cache_key TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    last_access TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_export_cache_lru
+    ON export_cache (last_access);
+"""
+
+
+class ExportCache:
+    """
+    Service that stores and looks up exported files by content key.
+    """
+
+    def __init__(self, db_path: str = None, cache_dir: str = None, max_bytes: int = None):
+        """
+        Initialize cache and create the schema if needed
+
+        Args:
+            db_path: SQLite index path (default: settings.EXPORT_CACHE_DB_PATH)
+            cache_dir: Directory holding cached files (default: settings.EXPORT_DIR)
+            max_bytes: Disk budget (default: settings.EXPORT_CACHE_MAX_BYTES)
+        """
+        self.db_path = db_path or settings.EXPORT_CACHE_DB_PATH
+        self.cache_dir = Path(cache_dir or settings.EXPORT_DIR)
+        self.max_bytes = settings.EXPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def make_key(content_hash: str, format: str, options: Dict[str, Any]) -> str:
+        """
+        Build the cache key for an export
+
+        Args:
+            content_hash: Hash of the dataset content
+            format: Export format
+            options: Options that change the output (None values are ignored)
+
+        Returns:
+            Hex digest identifying the export
+        """
+        spec = {
+            'dataset': content_hash,
+            'format': format,
+            'options': {name: value for name, value in sorted(options.items()) if value is not None},
+        }
+        return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def lookup(self, cache_key: str) -> Optional[str]:
+        """
+        Get the cached file for a key and mark it as recently used
+
+        Args:
+            cache_key: Key from make_key()
+
+        Returns:
+            Path to the cached file, or None on a miss
+        """
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT file_name FROM export_cache WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            file_path = self.cache_dir / row[0]
+            if not file_path.exists():
+                # File removed behind our back; forget the entry
+                conn.execute("DELETE FROM export_cache WHERE cache_key = ?", (cache_key,))
+                return None
+
+            conn.execute(
+                "UPDATE export_cache SET last_access = ? WHERE cache_key = ?",
+                (datetime.now().isoformat(), cache_key)
+            )
+        return str(file_path)
+
+    def store(self, cache_key: str, file_path: str) -> str:
+        """
+        Move a freshly exported file into the cache
+
+        Args:
+            cache_key: Key from make_key()
+            file_path: Exported file (renamed to its content-addressed name)
+
+        Returns:
+            Path to the cached file
+        """
+        extension = ''.join(Path(file_path).suffixes[-1:])
+        file_name = f"{cache_key}{extension}"
+        cached_path = self.cache_dir / file_name
+        os.replace(file_path, cached_path)
+        size = cached_path.stat().st_size
+
+        # A pre-compressed variant travels with its file and counts toward the budget
+        if os.path.exists(file_path + PRECOMPRESSED_SUFFIX):
+            os.replace(file_path + PRECOMPRESSED_SUFFIX, f"{cached_path}{PRECOMPRESSED_SUFFIX}")
+            size += os.path.getsize(f"{cached_path}{PRECOMPRESSED_SUFFIX}")
+
+        now = datetime.now().isoformat()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO export_cache (cache_key, file_name, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (cache_key, file_name, size, now, now)
+            )
+
+        self.evict(keep=cache_key)
+        return str(cached_path)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Delete least recently used entries until the cache fits its budget
+
+        Args:
+            keep: Key that must not be evicted (e.g. the entry just stored)
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock, closing(self._connect()) as conn, conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM export_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+
+            for cache_key, file_name, size in conn.execute(
+                "SELECT cache_key, file_name, size FROM export_cache ORDER BY last_access"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                if cache_key == keep:
+                    continue
+                self._remove_files(file_name)
+                conn.execute("DELETE FROM export_cache WHERE cache_key = ?", (cache_key,))
+                total -= size
+                removed += 1
+
+        if removed:
+            app_logger.info(f"Export cache: evicted {removed} file(s), {total} bytes in use")
+        return removed
+
+    def expire(self, max_idle_seconds: float) -> Tuple[int, int]:
+        """
+        Delete entries that were not used for max_idle_seconds
+
+        Args:
+            max_idle_seconds: Maximum time since last use
+
+        Returns:
+            Tuple of (entries removed, bytes freed)
+        """
+        cutoff = (datetime.now() - timedelta(seconds=max_idle_seconds)).isoformat()
+        removed = freed = 0
+        with self._lock, closing(self._connect()) as conn, conn:
+            for cache_key, file_name, size in conn.execute(
+                "SELECT cache_key, file_name, size FROM export_cache WHERE last_access < ?", (cutoff,)
+            ).fetchall():
+                self._remove_files(file_name)
+                conn.execute("DELETE FROM export_cache WHERE cache_key = ?", (cache_key,))
+                removed += 1
+                freed += size
+
+        if removed:
+            app_logger.info(f"Export cache: expired {removed} file(s), {freed} bytes freed")
+        return removed, freed
+
+    def file_names(self) -> Set[str]:
+        """Names of the cached files in cache_dir (including ".gz" variants)"""
+        with closing(self._connect()) as conn:
+            names = {row[0] for row in conn.execute("SELECT file_name FROM export_cache")}
+        return names | {name + PRECOMPRESSED_SUFFIX for name in names}
+
+    def _remove_files(self, file_name: str) -> None:
+        """Delete a cached file and its pre-compressed variant"""
+        for name in (file_name, file_name + PRECOMPRESSED_SUFFIX):
+            try:
+                os.remove(self.cache_dir / name)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Get number of entries, bytes used and the budget"""
+        with closing(self._connect()) as conn:
+            entries, used = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM export_cache"
+            ).fetchone()
+        return {'entries': entries, 'bytes': used, 'max_bytes': self.max_bytes}
+
+
+# Global cache instance
+export_cache = ExportCache()
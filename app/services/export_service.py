@@ -2,49 +2,101 @@
 Export Service
 ==============
 Handles data export operations to various formats.
+
+File exports are written in chunks of settings.EXPORT_CHUNK_ROWS rows. When a
+cancellation token is passed it is checked between chunks; a cancelled export
+removes its partial file and raises OperationCancelled.
+
+stream_export() encodes the same chunks (CSV, JSON, NDJSON) for a streaming
+HTTP response instead, so nothing is written to EXPORT_DIR.
+
+Every exporter also accepts a chunked (out-of-core) dataset in place of the
+DataFrame; it is then read one chunk at a time.
 """
 
 import os
+import uuid
+import zlib
 import pandas as pd
-import numpy as np
 from pathlib import Path
 from datetime import datetime
+from typing import Iterator, Optional, Tuple, Union
+from urllib.parse import urlencode
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 from app.config import settings
+from app.services.chunked_datasets import ChunkedDataset
+from app.services.dataset_lineage import dataset_lineage
+from app.services.export_cache import ExportCache, export_cache
+from app.services.upload_handler import UploadHandler
+from app.utils.cancellation import CancellationToken, OperationCancelled
+from app.utils.columnar import write_arrow, write_arrow_frames, write_parquet, write_parquet_frames
+from app.utils.file_download import PRECOMPRESSED_SUFFIX
 from app.utils.logger import app_logger
 from fastapi import HTTPException
 
 
+# Excel's hard row limit per worksheet (including the header row)
+EXCEL_MAX_ROWS = 1048576
+EXCEL_HEADER_FONT = Font(bold=True)
+
+
 class ExportService:
     """
     Service for exporting data to various formats.
     """
     
+    # File extension per export_dataframe() format
+    FILE_EXTENSIONS = {
+        'csv': '.csv',
+        'excel': '.xlsx',
+        'json': '.json',
+        'ndjson': '.ndjson',
+        'parquet': '.parquet',
+        'feather': '.feather',
+    }
+    
+    # Formats stream_export() supports: format -> (extension, media type)
+    STREAM_FORMATS = {
+        'csv': ('.csv', 'text/csv'),
+        'json': ('.json', 'application/json'),
+        'ndjson': ('.ndjson', 'application/x-ndjson'),
+    }
+    
+    # Text formats that get a pre-compressed ".gz" variant when
+    # settings.EXPORT_PRECOMPRESS_GZIP is on (binary formats barely shrink)
+    PRECOMPRESS_FORMATS = ('csv', 'json', 'ndjson')
+    
     @staticmethod
-    def export_to_csv(df: pd.DataFrame, filename: str = None) -> str:
+    def export_to_csv(
+        df: pd.DataFrame,
+        filename: str = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> str:
         """
         Export DataFrame to CSV file
         
         Args:
             df: DataFrame to export
             filename: Optional filename (will be generated if not provided)
+            cancel_token: Optional token checked between chunks
         
         Returns:
             Path to exported file
         """
-        if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"export_{timestamp}.csv"
-        
-        # Ensure .csv extension
-        if not filename.endswith('.csv'):
-            filename += '.csv'
+        filename = ExportService.get_export_filename(filename, '.csv')
         
         file_path = os.path.join(settings.EXPORT_DIR, filename)
         
         try:
-            df.to_csv(file_path, index=False, encoding='utf-8')
+            with open(file_path, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(ExportService.iter_csv(df, cancel_token))
             app_logger.info(f"Exported to CSV: {file_path}")
             return file_path
+        except OperationCancelled:
+            ExportService._discard(file_path)
+            raise
         except Exception as e:
             app_logger.error(f"Error exporting to CSV: {str(e)}")
             raise HTTPException(
@@ -53,31 +105,37 @@ class ExportService:
             )
     
     @staticmethod
-    def export_to_excel(df: pd.DataFrame, filename: str = None) -> str:
+    def export_to_excel(
+        df: pd.DataFrame,
+        filename: str = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> str:
         """
         Export DataFrame to Excel file
         
+        Uses a write-only (streaming) workbook, so memory stays constant no
+        matter how many rows are exported. Data beyond
+        settings.EXCEL_MAX_ROWS_PER_SHEET rows continues on Sheet2, Sheet3...
+        
         Args:
             df: DataFrame to export
             filename: Optional filename (will be generated if not provided)
+            cancel_token: Optional token checked between chunks
         
         Returns:
             Path to exported file
         """
-        if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"export_{timestamp}.xlsx"
-        
-        # Ensure .xlsx extension
-        if not filename.endswith('.xlsx'):
-            filename += '.xlsx'
+        filename = ExportService.get_export_filename(filename, '.xlsx')
         
         file_path = os.path.join(settings.EXPORT_DIR, filename)
         
         try:
-            df.to_excel(file_path, index=False, engine='openpyxl')
+            ExportService._write_excel(df, file_path, cancel_token)
             app_logger.info(f"Exported to Excel: {file_path}")
             return file_path
+        except OperationCancelled:
+            ExportService._discard(file_path)
+            raise
         except Exception as e:
             app_logger.error(f"Error exporting to Excel: {str(e)}")
             raise HTTPException(
@@ -86,33 +144,76 @@ class ExportService:
             )
     
     @staticmethod
-    def export_to_json(df: pd.DataFrame, filename: str = None) -> str:
+    def _write_excel(
+        df: pd.DataFrame,
+        file_path: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> None:
+        """Write DataFrame rows to a write-only workbook, chunk by chunk"""
+        rows_per_sheet = max(1, min(settings.EXCEL_MAX_ROWS_PER_SHEET, EXCEL_MAX_ROWS - 1))
+        workbook = Workbook(write_only=True)
+        sheet = None
+        sheet_rows = 0
+        
+        def new_sheet():
+            worksheet = workbook.create_sheet(title=f"Sheet{len(workbook.worksheets) + 1}")
+            header = []
+            for column in df.columns:
+                cell = WriteOnlyCell(worksheet, value=column)
+                cell.font = EXCEL_HEADER_FONT
+                header.append(cell)
+            worksheet.append(header)
+            return worksheet
+        
+        for _, chunk in ExportService._iter_chunks(df, cancel_token):
+            # Missing values become empty cells
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                if sheet is None or sheet_rows >= rows_per_sheet:
+                    sheet = new_sheet()
+                    sheet_rows = 0
+                sheet.append(row)
+                sheet_rows += 1
+        
+        if sheet is None:
+            new_sheet()
+        
+        workbook.save(file_path)
+    
+    @staticmethod
+    def export_to_json(
+        df: pd.DataFrame,
+        filename: str = None,
+        cancel_token: Optional[CancellationToken] = None,
+        compact: bool = False
+    ) -> str:
         """
-        Export DataFrame to JSON file
+        Export DataFrame to JSON file (array of records)
         
         Args:
             df: DataFrame to export
             filename: Optional filename (will be generated if not provided)
+            cancel_token: Optional token checked between chunks
+            compact: Write without indentation (smaller and faster)
         
         Returns:
             Path to exported file
         """
-        if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"export_{timestamp}.json"
-        
-        # Ensure .json extension
-        if not filename.endswith('.json'):
-            filename += '.json'
+        filename = ExportService.get_export_filename(filename, '.json')
         
         file_path = os.path.join(settings.EXPORT_DIR, filename)
         
         try:
-            # Replace NaN with None for proper JSON serialization
-            df_clean = df.replace({np.nan: None})
-            df_clean.to_json(file_path, orient='records', indent=2, force_ascii=False)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                if compact:
+                    f.writelines(ExportService.iter_json(df, cancel_token=cancel_token))
+                else:
+                    f.writelines(ExportService._iter_pretty_json(df, cancel_token))
             app_logger.info(f"Exported to JSON: {file_path}")
             return file_path
+        except OperationCancelled:
+            ExportService._discard(file_path)
+            raise
         except Exception as e:
             app_logger.error(f"Error exporting to JSON: {str(e)}")
             raise HTTPException(
@@ -121,15 +222,533 @@ class ExportService:
             )
     
     @staticmethod
-    def get_download_url(file_path: str) -> str:
+    def export_to_ndjson(
+        df: pd.DataFrame,
+        filename: str = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> str:
+        """
+        Export DataFrame to JSON Lines file (one record per line)
+        
+        Args:
+            df: DataFrame to export
+            filename: Optional filename (will be generated if not provided)
+            cancel_token: Optional token checked between chunks
+        
+        Returns:
+            Path to exported file
+        """
+        filename = ExportService.get_export_filename(filename, '.ndjson')
+        
+        file_path = os.path.join(settings.EXPORT_DIR, filename)
+        
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.writelines(ExportService.iter_json(df, lines=True, cancel_token=cancel_token))
+            app_logger.info(f"Exported to NDJSON: {file_path}")
+            return file_path
+        except OperationCancelled:
+            ExportService._discard(file_path)
+            raise
+        except Exception as e:
+            app_logger.error(f"Error exporting to NDJSON: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error exporting to NDJSON: {str(e)}"
+            )
+    
+    @staticmethod
+    def export_to_parquet(
+        df: pd.DataFrame,
+        filename: str = None,
+        cancel_token: Optional[CancellationToken] = None,
+        compression: Optional[str] = None,
+        row_group_size: Optional[int] = None
+    ) -> str:
+        """
+        Export DataFrame to Parquet file
+        
+        Args:
+            df: DataFrame to export
+            filename: Optional filename (will be generated if not provided)
+            cancel_token: Optional token checked between row groups
+            compression: Codec (default: settings.PARQUET_COMPRESSION)
+            row_group_size: Rows per row group (default: settings.PARQUET_ROW_GROUP_SIZE)
+        
+        Returns:
+            Path to exported file
+        """
+        filename = ExportService.get_export_filename(filename, '.parquet')
+        
+        file_path = os.path.join(settings.EXPORT_DIR, filename)
+        
+        try:
+            if isinstance(df, ChunkedDataset):
+                # Read whole row groups, so they match the in-memory export
+                chunk_rows = row_group_size or settings.PARQUET_ROW_GROUP_SIZE
+                frames = (chunk for _, chunk in ExportService._iter_chunks(df, chunk_rows=chunk_rows))
+                write_parquet_frames(frames, file_path, compression, row_group_size, cancel_token)
+            else:
+                write_parquet(df, file_path, compression, row_group_size, cancel_token)
+            app_logger.info(f"Exported to Parquet: {file_path}")
+            return file_path
+        except OperationCancelled:
+            ExportService._discard(file_path)
+            raise
+        except HTTPException:
+            raise
+        except Exception as e:
+            app_logger.error(f"Error exporting to Parquet: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error exporting to Parquet: {str(e)}"
+            )
+    
+    @staticmethod
+    def export_to_arrow(
+        df: pd.DataFrame,
+        filename: str = None,
+        cancel_token: Optional[CancellationToken] = None,
+        compression: Optional[str] = None
+    ) -> str:
+        """
+        Export DataFrame to Arrow IPC (Feather v2) file
+        
+        Args:
+            df: DataFrame to export
+            filename: Optional filename (will be generated if not provided)
+            cancel_token: Optional token checked between record batches
+            compression: Codec (default: settings.ARROW_COMPRESSION)
+        
+        Returns:
+            Path to exported file
+        """
+        filename = ExportService.get_export_filename(filename, '.feather')
+        
+        file_path = os.path.join(settings.EXPORT_DIR, filename)
+        
+        try:
+            if isinstance(df, ChunkedDataset):
+                frames = (chunk for _, chunk in ExportService._iter_chunks(df))
+                write_arrow_frames(frames, file_path, compression, cancel_token)
+            else:
+                write_arrow(df, file_path, compression, cancel_token)
+            app_logger.info(f"Exported to Arrow: {file_path}")
+            return file_path
+        except OperationCancelled:
+            ExportService._discard(file_path)
+            raise
+        except HTTPException:
+            raise
+        except Exception as e:
+            app_logger.error(f"Error exporting to Arrow: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error exporting to Arrow: {str(e)}"
+            )
+    
+    @staticmethod
+    def iter_csv(
+        df: pd.DataFrame,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Iterator[str]:
+        """
+        Encode DataFrame as CSV text, one chunk at a time
+        
+        Raises:
+            OperationCancelled: If the token was cancelled
+        """
+        for start, chunk in ExportService._iter_chunks(df, cancel_token):
+            yield chunk.to_csv(index=False, header=(start == 0))
+    
+    @staticmethod
+    def iter_json(
+        df: pd.DataFrame,
+        lines: bool = False,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Iterator[str]:
+        """
+        Encode DataFrame as a compact JSON array or as JSON Lines, one chunk
+        at a time
+        
+        Chunks go straight through pandas' native JSON encoder, which writes
+        NaN/None as null, so no NaN-replaced copy of the frame is made.
+        
+        Args:
+            df: DataFrame to encode
+            lines: Emit JSON Lines (one record per line) instead of an array
+            cancel_token: Optional token checked between chunks
+        
+        Raises:
+            OperationCancelled: If the token was cancelled
+        """
+        if not lines:
+            yield '['
+        
+        first = True
+        for _, chunk in ExportService._iter_chunks(df, cancel_token):
+            if chunk.empty:
+                continue
+            if lines:
+                yield chunk.to_json(orient='records', lines=True, force_ascii=False)
+            else:
+                # Splice each chunk's records into the one top-level array
+                records = chunk.to_json(orient='records', force_ascii=False)[1:-1]
+                yield records if first else ',' + records
+            first = False
+        
+        if not lines:
+            yield ']'
+    
+    @staticmethod
+    def _iter_pretty_json(
+        df: pd.DataFrame,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Iterator[str]:
+        """Encode DataFrame as an indented JSON array, one chunk at a time"""
+        yield '['
+        for start, chunk in ExportService._iter_chunks(df, cancel_token):
+            records = chunk.to_json(orient='records', indent=2, force_ascii=False)
+            # Splice the chunk's records into one top-level array
+            body = records.strip()[1:-1].strip('\n')
+            if body:
+                yield (',\n' if start else '\n') + body
+        yield '\n]' if len(df) else ']'
+    
+    @staticmethod
+    def stream_export(
+        df: Union[pd.DataFrame, ChunkedDataset],
+        format: str,
+        compress: bool = False,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Iterator[bytes]:
+        """
+        Encode DataFrame for a streaming response, chunk by chunk
+        
+        Only one chunk of settings.EXPORT_CHUNK_ROWS rows is encoded at a
+        time, so memory stays bounded and the first bytes can be sent before
+        the rest of the frame is encoded.
+        
+        Args:
+            df: DataFrame (or chunked dataset) to export
+            format: One of STREAM_FORMATS (csv, json, ndjson)
+            compress: Gzip the output
+            cancel_token: Optional token checked between chunks
+        
+        Yields:
+            UTF-8 encoded bytes (a gzip stream when compress is set)
+        
+        Raises:
+            HTTPException: If format cannot be streamed
+            OperationCancelled: If the token was cancelled
+        """
+        if format == 'csv':
+            pieces = ExportService.iter_csv(df, cancel_token)
+        elif format in ('json', 'ndjson'):
+            pieces = ExportService.iter_json(df, lines=(format == 'ndjson'), cancel_token=cancel_token)
+        else:
+            raise HTTPException(status_code=400, detail=f"Format cannot be streamed: {format}")
+        
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        
+        for piece in pieces:
+            data = piece.encode('utf-8')
+            if compressor is not None:
+                # Flush per chunk so the client receives data as it is produced
+                data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        
+        if compressor is not None:
+            yield compressor.flush()
+    
+    @staticmethod
+    def export_dataframe(
+        df: Union[pd.DataFrame, ChunkedDataset],
+        format: str,
+        filename: str = None,
+        cancel_token: Optional[CancellationToken] = None,
+        compact: bool = False,
+        compression: Optional[str] = None,
+        row_group_size: Optional[int] = None
+    ) -> str:
+        """
+        Export DataFrame to a file in the given format
+        
+        Args:
+            df: DataFrame (or chunked dataset) to export
+            format: Export format (csv, excel, json, ndjson, parquet, feather)
+            filename: Optional filename (will be generated if not provided)
+            cancel_token: Optional token checked between chunks
+            compact: Write JSON without indentation
+            compression: Parquet/Arrow compression codec
+            row_group_size: Parquet rows per row group
+        
+        Returns:
+            Path to exported file
+        
+        Raises:
+            HTTPException: If format is unsupported
+            OperationCancelled: If the token was cancelled
+        """
+        if format == 'csv':
+            return ExportService.export_to_csv(df, filename, cancel_token)
+        elif format == 'excel':
+            return ExportService.export_to_excel(df, filename, cancel_token)
+        elif format == 'json':
+            return ExportService.export_to_json(df, filename, cancel_token, compact)
+        elif format == 'ndjson':
+            return ExportService.export_to_ndjson(df, filename, cancel_token)
+        elif format == 'parquet':
+            return ExportService.export_to_parquet(df, filename, cancel_token, compression, row_group_size)
+        elif format == 'feather':
+            return ExportService.export_to_arrow(df, filename, cancel_token, compression)
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    
+    @staticmethod
+    def export_stored(
+        file_id: str,
+        format: str,
+        filename: str = None,
+        cancel_token: Optional[CancellationToken] = None,
+        compact: bool = False,
+        compression: Optional[str] = None,
+        row_group_size: Optional[int] = None
+    ) -> Tuple[str, str]:
+        """
+        Export a stored dataset, reusing a cached export when the same
+        content was already exported with the same format and options
+        
+        Args:
+            file_id: File ID of the dataset
+            format: Export format (see FILE_EXTENSIONS)
+            filename: Optional download filename
+            cancel_token: Optional token checked between chunks
+            compact: Write JSON without indentation
+            compression: Parquet/Arrow compression codec
+            row_group_size: Parquet rows per row group
+        
+        Returns:
+            Tuple of (file_path, download_filename)
+        
+        Raises:
+            HTTPException: If file_id not found or format is unsupported
+        """
+        extension = ExportService.FILE_EXTENSIONS.get(format)
+        if extension is None:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+        download_name = ExportService.get_export_filename(filename, extension)
+        
+        precompress = settings.EXPORT_PRECOMPRESS_GZIP and format in ExportService.PRECOMPRESS_FORMATS
+        
+        if not settings.EXPORT_CACHE_ENABLED:
+            df = UploadHandler.get_source(file_id)
+            file_path = ExportService.export_dataframe(
+                df, format, download_name, cancel_token, compact, compression, row_group_size
+            )
+            if precompress:
+                ExportService.precompress(file_path, cancel_token)
+            dataset_lineage.add_export(file_id, file_path)
+            return file_path, download_name
+        
+        cache_key = ExportService._cache_key(file_id, format, compact, compression, row_group_size)
+        
+        cached_path = ExportService._lookup_cached(file_id, format, cache_key)
+        if cached_path is not None:
+            return cached_path, download_name
+        
+        df = UploadHandler.get_source(file_id)
+        # Write under a unique name so concurrent identical exports never
+        # share a file; the finished file is renamed into the cache
+        partial_name = f"{cache_key}.{uuid.uuid4().hex}.partial{extension}"
+        try:
+            file_path = ExportService.export_dataframe(
+                df, format, partial_name, cancel_token, compact, compression, row_group_size
+            )
+            if precompress:
+                ExportService.precompress(file_path, cancel_token)
+        except Exception:
+            partial_path = os.path.join(settings.EXPORT_DIR, partial_name)
+            for path in (partial_path, partial_path + PRECOMPRESSED_SUFFIX):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        cached_path = export_cache.store(cache_key, file_path)
+        dataset_lineage.add_export(file_id, cached_path)
+        return cached_path, download_name
+    
+    @staticmethod
+    def cached_export(file_id: str, format: str, compact: bool = False) -> Optional[str]:
+        """
+        Get the cached export of a stored dataset, without exporting on a miss
+        
+        Args:
+            file_id: File ID of the dataset
+            format: Export format (see FILE_EXTENSIONS)
+            compact: JSON without indentation
+        
+        Returns:
+            Path to the cached file, or None if there is none (or the
+            cache is disabled)
+        
+        Raises:
+            HTTPException: If file_id not found
+        """
+        if not settings.EXPORT_CACHE_ENABLED:
+            return None
+        cache_key = ExportService._cache_key(file_id, format, compact)
+        return ExportService._lookup_cached(file_id, format, cache_key)
+    
+    @staticmethod
+    def _cache_key(
+        file_id: str,
+        format: str,
+        compact: bool = False,
+        compression: Optional[str] = None,
+        row_group_size: Optional[int] = None
+    ) -> str:
+        """Export cache key of a stored dataset in a format"""
+        # Only options that change this format's output are part of the key
+        if format == 'json':
+            options = {'compact': compact}
+        elif format == 'excel':
+            options = {'max_rows_per_sheet': settings.EXCEL_MAX_ROWS_PER_SHEET}
+        elif format == 'parquet':
+            options = {
+                'compression': (compression or settings.PARQUET_COMPRESSION).lower(),
+                'row_group_size': row_group_size or settings.PARQUET_ROW_GROUP_SIZE,
+            }
+        elif format == 'feather':
+            options = {'compression': (compression or settings.ARROW_COMPRESSION).lower()}
+        else:
+            options = {}
+        return ExportCache.make_key(UploadHandler.get_content_hash(file_id), format, options)
+    
+    @staticmethod
+    def _lookup_cached(file_id: str, format: str, cache_key: str) -> Optional[str]:
+        """Cached file for a key, recorded as an export of file_id on a hit"""
+        cached_path = export_cache.lookup(cache_key)
+        if cached_path is not None:
+            app_logger.info(f"Export cache hit: {file_id} ({format}) -> {Path(cached_path).name}")
+            dataset_lineage.add_export(file_id, cached_path)
+        return cached_path
+    
+    @staticmethod
+    def get_export_filename(filename: Optional[str], extension: str) -> str:
+        """
+        Get export filename with the given extension
+        
+        Args:
+            filename: Requested filename (a timestamped name is generated if None)
+            extension: Required extension, including the dot (e.g. ".csv")
+        
+        Returns:
+            Filename ending with extension
+        """
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"export_{timestamp}{extension}"
+        
+        # Ensure extension
+        if not filename.endswith(extension):
+            filename += extension
+        
+        return filename
+    
+    @staticmethod
+    def _iter_chunks(
+        df: Union[pd.DataFrame, ChunkedDataset],
+        cancel_token: Optional[CancellationToken] = None,
+        chunk_rows: Optional[int] = None
+    ) -> Iterator[tuple[int, pd.DataFrame]]:
+        """
+        Split DataFrame into (start_row, chunk) pairs, checking the token
+        before each chunk (an empty DataFrame yields one empty chunk)
+        
+        A chunked dataset is read from disk one chunk at a time.
+        
+        Args:
+            df: DataFrame or chunked dataset
+            cancel_token: Optional token checked before each chunk
+            chunk_rows: Rows per chunk (default: settings.EXPORT_CHUNK_ROWS)
+        
+        Raises:
+            OperationCancelled: If the token was cancelled
+        """
+        chunk_rows = max(1, chunk_rows or settings.EXPORT_CHUNK_ROWS)
+        if isinstance(df, ChunkedDataset):
+            start = 0
+            for chunk in df.iter_chunks(chunk_rows):
+                if cancel_token is not None:
+                    cancel_token.check()
+                yield start, chunk
+                start += len(chunk)
+            if start == 0:
+                yield 0, df.head(0)
+            return
+        
+        for start in range(0, max(len(df), 1), chunk_rows):
+            if cancel_token is not None:
+                cancel_token.check()
+            yield start, df.iloc[start:start + chunk_rows]
+    
+    @staticmethod
+    def precompress(file_path: str, cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        Write a gzip variant next to an exported file
+        
+        The download routes send "<file>.gz" with Content-Encoding: gzip to
+        clients that accept it, so the file is compressed once instead of
+        on every download.
+        
+        Args:
+            file_path: Exported file
+            cancel_token: Optional token checked between chunks
+        
+        Returns:
+            Path to the ".gz" file
+        
+        Raises:
+            OperationCancelled: If the token was cancelled
+        """
+        gz_path = file_path + PRECOMPRESSED_SUFFIX
+        compressor = zlib.compressobj(settings.EXPORT_PRECOMPRESS_LEVEL, zlib.DEFLATED, 31)
+        try:
+            with open(file_path, 'rb') as source, open(gz_path, 'wb') as target:
+                for data in iter(lambda: source.read(1024 * 1024), b''):
+                    if cancel_token is not None:
+                        cancel_token.check()
+                    target.write(compressor.compress(data))
+                target.write(compressor.flush())
+        except OperationCancelled:
+            ExportService._discard(gz_path)
+            raise
+        return gz_path
+    
+    @staticmethod
+    def _discard(file_path: str) -> None:
+        """Remove a partially written export"""
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        app_logger.info(f"Export cancelled, removed partial file: {file_path}")
+    
+    @staticmethod
+    def get_download_url(file_path: str, download_name: Optional[str] = None) -> str:
         """
         Get download URL for exported file
         
         Args:
             file_path: Path to file
+            download_name: Filename the browser should save as, if it
+                differs from the stored name (e.g. cached exports)
         
         Returns:
             Download URL
         """
         filename = Path(file_path).name
+        if download_name and download_name != filename:
+            return f"/api/export/download/{filename}?{urlencode({'name': download_name})}"
         return f"/api/export/download/{filename}"
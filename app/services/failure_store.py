@@ -0,0 +1,257 @@
+"""
+Failure Store
+=============
+Append-only, indexed store for rows that failed to import.
+
+Failures are written per committed batch into SQLite, keyed by job id and
+row, so they can be paged, filtered by reason, counted and exported for
+re-import without reading whole report files or scraping logs.
+"""
+
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional
+
+from app.config import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_failures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    message TEXT,
+    record TEXT,
+    created_at TEXT NOT NULL,
+    UNIQUE (job_id, row)
+);
+CREATE INDEX IF NOT EXISTS idx_import_failures_reason
+    ON import_failures (job_id, reason, row);
+"""
+
+# Rows fetched per round trip when streaming an export
+EXPORT_FETCH_SIZE = 500
+
+
+class FailureStore:
+    """
+    Service for recording and querying failed import rows.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Initialize store and create the schema if needed
+
+        Args:
+            db_path: SQLite database path (default: settings.FAILURE_DB_PATH)
+        """
+        self.db_path = db_path or settings.FAILURE_DB_PATH
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, **kwargs)
+
+    def add_many(self, job_id: str, failures: List[Dict[str, Any]]) -> None:
+        """
+        Record failed rows for a job
+
+        A row is stored once per job; writing the same row again (e.g. when
+        a resumed job replays its last uncommitted batch) replaces it.
+
+        Args:
+            job_id: Import job ID
+            failures: List of dicts with row, reason, message and record
+        """
+        if not failures:
+            return
+
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                job_id,
+                failure['row'],
+                failure['reason'],
+                failure.get('message'),
+                json.dumps(failure.get('record'), default=str),
+                now,
+            )
+            for failure in failures
+        ]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO import_failures
+                (job_id, row, reason, message, record, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+
+    def list_failures(
+        self,
+        job_id: str,
+        reason: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Get one page of failures
+
+        Args:
+            job_id: Import job ID
+            reason: Optional reason filter
+            offset: Rows to skip
+            limit: Maximum rows to return
+
+        Returns:
+            Dict with total count and the page items
+        """
+        where, params = self._where(job_id, reason)
+        with closing(self._connect()) as conn:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM import_failures WHERE {where}", params
+            ).fetchone()[0]
+            cursor = conn.execute(
+                f"""
+                SELECT row, reason, message, record FROM import_failures
+                WHERE {where} ORDER BY row LIMIT ? OFFSET ?
+                """,
+                params + [limit, offset]
+            )
+            items = [self._to_dict(row) for row in cursor]
+
+        return {
+            'job_id': job_id,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'items': items,
+        }
+
+    def summary(self, job_id: str) -> Dict[str, Any]:
+        """
+        Count failures per reason
+
+        Args:
+            job_id: Import job ID
+
+        Returns:
+            Dict with total and per-reason counts
+        """
+        with closing(self._connect()) as conn:
+            counts = dict(conn.execute(
+                """
+                SELECT reason, COUNT(*) FROM import_failures
+                WHERE job_id = ? GROUP BY reason ORDER BY COUNT(*) DESC
+                """,
+                (job_id,)
+            ).fetchall())
+
+        return {
+            'job_id': job_id,
+            'total': sum(counts.values()),
+            'by_reason': counts,
+        }
+
+    def iter_export(
+        self,
+        job_id: str,
+        reason: Optional[str] = None,
+        records_only: bool = False
+    ) -> Generator[str, None, None]:
+        """
+        Stream failures as a JSON array
+
+        Args:
+            job_id: Import job ID
+            reason: Optional reason filter
+            records_only: Emit only the original records (ready for re-import)
+
+        Yields:
+            Chunks of JSON text
+        """
+        where, params = self._where(job_id, reason)
+        # The generator may be resumed from different threadpool threads
+        conn = self._connect(check_same_thread=False)
+        try:
+            cursor = conn.execute(
+                f"""
+                SELECT row, reason, message, record FROM import_failures
+                WHERE {where} ORDER BY row
+                """,
+                params
+            )
+            yield '['
+            first = True
+            while True:
+                rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                parts = []
+                for row in rows:
+                    if records_only:
+                        parts.append(row[3] or 'null')
+                    else:
+                        parts.append(json.dumps(self._to_dict(row)))
+                yield ('' if first else ',') + ','.join(parts)
+                first = False
+            yield ']'
+        finally:
+            conn.close()
+
+    def delete_job(self, job_id: str) -> int:
+        """
+        Delete all failures of a job
+
+        Returns:
+            Number of rows deleted
+        """
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "DELETE FROM import_failures WHERE job_id = ?", (job_id,)
+            ).rowcount
+
+    def expire(self, max_age_seconds: float, keep_jobs: Optional[List[str]] = None) -> int:
+        """
+        Delete the failures of jobs whose last failure is older than max_age_seconds
+
+        Args:
+            max_age_seconds: Maximum age of a job's newest failure
+            keep_jobs: Job IDs to keep regardless of age (e.g. still running)
+
+        Returns:
+            Number of rows deleted
+        """
+        cutoff = (datetime.now() - timedelta(seconds=max_age_seconds)).isoformat()
+        keep_jobs = keep_jobs or []
+        placeholders = ','.join('?' * len(keep_jobs))
+        keep_clause = f" AND job_id NOT IN ({placeholders})" if keep_jobs else ""
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "DELETE FROM import_failures WHERE job_id IN ("
+                "SELECT job_id FROM import_failures GROUP BY job_id HAVING MAX(created_at) < ?"
+                f"){keep_clause}",
+                [cutoff, *keep_jobs]
+            ).rowcount
+
+    @staticmethod
+    def _where(job_id: str, reason: Optional[str]):
+        if reason:
+            return "job_id = ? AND reason = ?", [job_id, reason]
+        return "job_id = ?", [job_id]
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        return {
+            'row': row[0],
+            'reason': row[1],
+            'message': row[2],
+            'record': json.loads(row[3]) if row[3] else None,
+        }
@@ -0,0 +1,338 @@
+"""
+Import Job Manager
+==================
+Runs pendampingan imports as background jobs with resumable checkpoints.
+
+Each job lives in its own directory under settings.JOB_DIR:
+
+    jobs/{job_id}/source.json      uploaded file
+    jobs/{job_id}/job.json         status, stats, report url
+    jobs/{job_id}/checkpoint.json  last committed row + id caches
+
+Jobs run through the shared JobScheduler (bulk lane), which persists the
+queue and re-queues jobs that were running when the process stopped. The
+checkpoint is written after every committed batch, so a job that was
+interrupted (worker restart, crash) resumes after the last committed row
+instead of re-inserting rows that are already in the database.
+
+A cancelled job (see JobScheduler.cancel) stops after its current batch; the
+rows committed so far stay committed. Finished jobs are deleted by the
+storage collector after settings.IMPORT_JOB_TTL_SECONDS (see expire()).
+"""
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+from app.services.job_scheduler import JobScheduler
+from app.services.pendampingan_service import PendampinganService
+from app.utils.cancellation import JOB_CANCELLED, CancellationToken, OperationCancelled
+from app.utils.event_coalescer import EventCoalescer
+from app.utils.json_stream import JsonArrayReader
+from app.utils.logger import app_logger
+
+
+# Number of recent events kept per job for clients that (re)attach
+EVENT_BUFFER_SIZE = 500
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class ImportJobManager:
+    """
+    Service that runs pendampingan imports as scheduled jobs.
+    """
+
+    JOB_KIND = 'pendampingan_import'
+
+    def __init__(self, service: PendampinganService, scheduler: JobScheduler, job_dir: str = None):
+        """
+        Initialize job manager
+
+        Args:
+            service: Pendampingan service used to run the import
+            scheduler: Job scheduler that runs the imports
+            job_dir: Directory for job state (default: settings.JOB_DIR)
+        """
+        self.service = service
+        self.scheduler = scheduler
+        self.scheduler.register(
+            self.JOB_KIND,
+            lambda job_id, payload, token: self._run(job_id, token),
+            on_dequeue=self._on_dequeue
+        )
+        self.job_dir = Path(job_dir or settings.JOB_DIR)
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._events: Dict[str, deque] = {}
+        self._event_seq: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, file: UploadFile, user_id: str) -> Dict[str, Any]:
+        """
+        Save uploaded file and queue an import job
+
+        Args:
+            file: Uploaded JSON file
+            user_id: Submitting user (for fair scheduling)
+
+        Returns:
+            Job status dict
+        """
+        job_id = str(uuid.uuid4())
+        path = self._path(job_id)
+        path.mkdir(parents=True, exist_ok=True)
+
+        with open(path / 'source.json', 'wb') as f:
+            shutil.copyfileobj(file.file, f)
+
+        now = datetime.now().isoformat()
+        job = {
+            'job_id': job_id,
+            'filename': file.filename,
+            'status': 'queued',
+            'created_at': now,
+            'updated_at': now,
+            'progress': 0,
+            'stats': None,
+            'failed_report_url': None,
+            'recent_logs': [],
+            'error': None,
+        }
+        self._save_job(job)
+        self._register(job)
+        self.scheduler.submit(self.JOB_KIND, {'job_id': job_id}, user_id, lane='bulk', job_id=job_id)
+
+        app_logger.info(f"Import job queued: {job_id} ({file.filename})")
+        return dict(job)
+
+    def get_status(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get job status
+
+        Raises:
+            HTTPException: If job_id not found
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+
+        job_file = self._path(job_id) / 'job.json'
+        if not job_file.exists():
+            raise HTTPException(status_code=404, detail=f"Job ID not found: {job_id}")
+        return self._read_json(job_file)
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Cancel an import job
+
+        A queued job is dropped; a running job stops after its current batch.
+
+        Raises:
+            HTTPException: If job_id not found or the job already finished
+        """
+        self.get_status(job_id)
+        self.scheduler.cancel(job_id)
+        return self.get_status(job_id)
+
+    def get_events(self, job_id: str, after: int = 0) -> Tuple[List[Tuple[int, Dict]], bool]:
+        """
+        Get buffered events newer than a sequence number
+
+        Args:
+            job_id: Job ID
+            after: Last sequence number the client has seen
+
+        Returns:
+            Tuple of ([(seq, event), ...], job_finished)
+        """
+        status = self.get_status(job_id)
+        with self._lock:
+            events = [(seq, event) for seq, event in self._events.get(job_id, ()) if seq > after]
+        return events, status['status'] not in ACTIVE_STATUSES
+
+    def expire(self, max_age_seconds: float) -> Tuple[int, int]:
+        """
+        Delete finished jobs not updated for max_age_seconds, with their failed rows
+
+        Args:
+            max_age_seconds: Maximum time since a finished job was last updated
+
+        Returns:
+            Tuple of (jobs removed, bytes freed)
+        """
+        cutoff = (datetime.now() - timedelta(seconds=max_age_seconds)).isoformat()
+        removed = freed = 0
+        active = []
+        for path in self.job_dir.iterdir():
+            job_file = path / 'job.json'
+            try:
+                job = self._read_json(job_file)
+            except (OSError, ValueError):
+                continue
+            if job.get('status') in ACTIVE_STATUSES:
+                active.append(job['job_id'])
+                continue
+            if job.get('updated_at', '') >= cutoff:
+                continue
+
+            size = sum(child.stat().st_size for child in path.iterdir() if child.is_file())
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self._jobs.pop(job['job_id'], None)
+                self._events.pop(job['job_id'], None)
+                self._event_seq.pop(job['job_id'], None)
+            self.service.failure_store.delete_job(job['job_id'])
+            removed += 1
+            freed += size
+
+        # Failures of direct (streamed) imports have no job directory
+        self.service.failure_store.expire(max_age_seconds, keep_jobs=active)
+
+        if removed:
+            app_logger.info(f"Import jobs: removed {removed} finished job(s), {freed} bytes freed")
+        return removed, freed
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _register(self, job: Dict[str, Any]) -> None:
+        job_id = job['job_id']
+        with self._lock:
+            self._jobs[job_id] = job
+            self._events.setdefault(job_id, deque(maxlen=EVENT_BUFFER_SIZE))
+            self._event_seq.setdefault(job_id, 0)
+
+    def _on_dequeue(self, job_id: str) -> None:
+        with self._lock:
+            known = job_id in self._jobs
+        if not known:
+            self._register(self._read_json(self._path(job_id) / 'job.json'))
+        self._update(job_id, status='cancelled', error=JOB_CANCELLED)
+        self._publish(job_id, {'log': 'Import cancelled before it started', 'cancelled': JOB_CANCELLED})
+
+    def _run(self, job_id: str, cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        path = self._path(job_id)
+        with self._lock:
+            known = job_id in self._jobs
+        if not known:
+            # Job re-queued by the scheduler after a restart
+            self._register(self._read_json(path / 'job.json'))
+        self._update(job_id, status='running')
+
+        try:
+            source_file = path / 'source.json'
+            checkpoint_file = path / 'checkpoint.json'
+            checkpoint = self._read_json(checkpoint_file) if checkpoint_file.exists() else None
+
+            def save_checkpoint(state: Dict) -> None:
+                self._write_json(checkpoint_file, state)
+
+            # Per-row events are merged so the buffer and the stream carry
+            # at most one event per window
+            coalescer = EventCoalescer()
+            cancelled = None
+            with open(source_file, 'rb') as f:
+                reader = JsonArrayReader(f)
+                for event in self.service.run_import(
+                    reader,
+                    checkpoint=checkpoint,
+                    on_checkpoint=save_checkpoint,
+                    progress_fn=self.service.byte_progress(reader, source_file.stat().st_size),
+                    job_id=job_id,
+                    cancel_token=cancel_token
+                ):
+                    cancelled = event.get('cancelled', cancelled)
+                    merged = coalescer.add(event)
+                    if merged is not None:
+                        self._publish(job_id, merged, coalescer.snapshot())
+            merged = coalescer.flush()
+            if merged is not None:
+                self._publish(job_id, merged, coalescer.snapshot())
+
+            if not cancelled:
+                self._update(job_id, status='completed')
+                app_logger.info(f"Import job completed: {job_id}")
+
+        except Exception as e:
+            app_logger.error(f"Import job {job_id} failed: {str(e)}")
+            self._publish(job_id, {'log': f'Critical Error: {str(e)}'})
+            self._update(job_id, status='failed', error=str(e))
+            raise
+
+        if cancelled:
+            # Rows committed before the stop stay committed
+            self._update(job_id, status='cancelled', error=cancelled)
+            app_logger.warning(f"Import job cancelled: {job_id} ({cancelled})")
+            raise OperationCancelled(cancelled)
+
+        status = self.get_status(job_id)
+        return {'stats': status['stats'], 'failed_report_url': status['failed_report_url']}
+
+    def _publish(self, job_id: str, event: Dict, recent_logs: List[str] = None) -> None:
+        with self._lock:
+            self._event_seq[job_id] += 1
+            self._events[job_id].append((self._event_seq[job_id], event))
+
+        changes = {}
+        if 'progress' in event:
+            changes['progress'] = event['progress']
+        if 'stats' in event:
+            changes['stats'] = event['stats']
+        if event.get('failed_report_url'):
+            changes['failed_report_url'] = event['failed_report_url']
+        if recent_logs is not None and 'logs' in event:
+            changes['recent_logs'] = recent_logs
+        if changes:
+            self._update(job_id, **changes)
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(changes)
+            job['updated_at'] = datetime.now().isoformat()
+            snapshot = dict(job)
+        self._save_job(snapshot)
+
+    # ------------------------------------------------------------------
+    # Persistence helpers
+    # ------------------------------------------------------------------
+
+    def _path(self, job_id: str) -> Path:
+        # job_id comes from the URL; only accept our own uuid format
+        try:
+            uuid.UUID(job_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail=f"Job ID not found: {job_id}")
+        return self.job_dir / job_id
+
+    def _save_job(self, job: Dict[str, Any]) -> None:
+        self._write_json(self._path(job['job_id']) / 'job.json', job)
+
+    @staticmethod
+    def _read_json(path: Path) -> Any:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        # Write to a temp file and rename so a crash never leaves a torn checkpoint
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
@@ -0,0 +1,439 @@
+"""
+Job Scheduler
+=============
+Persistent job queue with priority lanes and per-user fairness.
+
+Long-running work (normalization, export, pendampingan import) is submitted
+as a job instead of running inside the request. Jobs are stored in SQLite,
+so queued and interrupted jobs survive a restart, and are dispatched by a
+single scheduler thread:
+
+- lanes are served in priority order: "interactive" before "bulk"
+- within a lane, the user with the fewest running jobs goes first (ties go
+  to the user served least recently), so one user's batch cannot starve
+  everyone else
+- at most settings.JOB_MAX_RUNNING jobs run at once, and bulk jobs may not
+  take the slots reserved for interactive work
+
+Every running job gets a CancellationToken (with the payload's optional
+time_budget_seconds). cancel() drops a queued job or cancels the token of a
+running one; handlers check the token between units of work.
+
+On start, jobs that were running are re-queued. A kind registered with
+on_recover can veto queued jobs that cannot run after a restart (e.g. ones
+whose in-memory dataset is gone); they are marked failed instead.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+from app.utils.cancellation import JOB_CANCELLED, CancellationToken, OperationCancelled
+from app.utils.logger import app_logger
+
+
+LANES = ('interactive', 'bulk')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    lane TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_queue
+    ON scheduled_jobs (status, lane, user_id, seq);
+"""
+
+JobHandler = Callable[[str, Dict[str, Any], CancellationToken], Optional[Dict[str, Any]]]
+
+
+class JobScheduler:
+    """
+    Service that queues jobs and runs them on a bounded worker pool.
+    """
+
+    def __init__(self, db_path: str = None, max_running: int = None, interactive_reserved: int = None):
+        """
+        Initialize scheduler
+
+        Args:
+            db_path: SQLite queue path (default: settings.JOB_QUEUE_DB_PATH)
+            max_running: Maximum concurrently running jobs (default: settings.JOB_MAX_RUNNING)
+            interactive_reserved: Slots bulk jobs may not use (default: settings.JOB_INTERACTIVE_RESERVED)
+        """
+        self.db_path = db_path or settings.JOB_QUEUE_DB_PATH
+        self.max_running = max(1, max_running or settings.JOB_MAX_RUNNING)
+        reserved = settings.JOB_INTERACTIVE_RESERVED if interactive_reserved is None else interactive_reserved
+        self.interactive_reserved = min(max(0, reserved), self.max_running - 1)
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._dequeue_callbacks: Dict[str, Callable[[str], None]] = {}
+        self._recover_checks: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {}
+        self._condition = threading.Condition()
+        self._running: Dict[str, str] = {}  # job_id -> user_id
+        self._tokens: Dict[str, CancellationToken] = {}
+        self._last_served: Dict[str, float] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def register(
+        self,
+        kind: str,
+        handler: JobHandler,
+        on_dequeue: Callable[[str], None] = None,
+        on_recover: Callable[[Dict[str, Any]], Optional[str]] = None
+    ) -> None:
+        """
+        Register the handler for a job kind
+
+        Args:
+            kind: Job kind (e.g. "normalize")
+            handler: Function(job_id, payload, cancel_token) returning a
+                JSON-serializable result
+            on_dequeue: Optional callback(job_id) for queued jobs that are
+                cancelled before they start
+            on_recover: Optional check(payload) run on start for jobs queued
+                before a restart; returns an error message if the job can
+                no longer run (it is then marked failed), else None
+        """
+        self._handlers[kind] = handler
+        if on_dequeue is not None:
+            self._dequeue_callbacks[kind] = on_dequeue
+        if on_recover is not None:
+            self._recover_checks[kind] = on_recover
+
+    def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        user_id: str,
+        lane: str = 'bulk',
+        job_id: str = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a job
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serializable job arguments
+            user_id: Submitting user (for fair scheduling)
+            lane: "interactive" or "bulk"
+            job_id: Optional job ID (generated if omitted)
+
+        Returns:
+            Job status dict
+        """
+        if kind not in self._handlers:
+            raise HTTPException(status_code=400, detail=f"Unsupported job kind: {kind}")
+        if lane not in LANES:
+            raise HTTPException(status_code=400, detail=f"Invalid lane: {lane}. Allowed: {', '.join(LANES)}")
+
+        job_id = job_id or str(uuid.uuid4())
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                INSERT INTO scheduled_jobs (job_id, kind, lane, user_id, status, payload, created_at)
+                VALUES (?, ?, ?, ?, 'queued', ?, ?)
+                """,
+                (job_id, kind, lane, user_id, json.dumps(payload, default=str), datetime.now().isoformat())
+            )
+
+        app_logger.info(f"Job queued: {job_id} ({kind}, lane={lane}, user={user_id})")
+        self._wake()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get job status
+
+        Raises:
+            HTTPException: If job_id not found
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM scheduled_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise HTTPException(status_code=404, detail=f"Job ID not found: {job_id}")
+            job = self._to_dict(row)
+            if job['status'] == 'queued':
+                job['queue_position'] = conn.execute(
+                    "SELECT COUNT(*) FROM scheduled_jobs WHERE status = 'queued' AND lane = ? AND seq < ?",
+                    (row['lane'], row['seq'])
+                ).fetchone()[0]
+        return job
+
+    def list_jobs(self, user_id: str = None, status: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        List most recent jobs
+
+        Args:
+            user_id: Optional user filter
+            status: Optional status filter
+            limit: Maximum number of jobs
+        """
+        clauses, params = [], []
+        if user_id:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM scheduled_jobs {where} ORDER BY seq DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Cancel a job
+
+        A queued job is marked cancelled right away; a running job is asked
+        to stop and is marked cancelled once its handler gives up.
+
+        Raises:
+            HTTPException: If job_id not found or the job already finished
+        """
+        with closing(self._connect()) as conn, conn:
+            dequeued = conn.execute(
+                "UPDATE scheduled_jobs SET status = 'cancelled', error = ?, finished_at = ? "
+                "WHERE job_id = ? AND status = 'queued'",
+                (JOB_CANCELLED, datetime.now().isoformat(), job_id)
+            ).rowcount
+
+        if dequeued:
+            job = self.get(job_id)
+            callback = self._dequeue_callbacks.get(job['kind'])
+            if callback is not None:
+                callback(job_id)
+        else:
+            with self._condition:
+                token = self._tokens.get(job_id)
+            if token is None:
+                job = self.get(job_id)
+                raise HTTPException(status_code=409, detail=f"Job already {job['status']}: {job_id}")
+            token.cancel(JOB_CANCELLED)
+
+        app_logger.info(f"Job cancel requested: {job_id}")
+        return self.get(job_id)
+
+    def start(self) -> None:
+        """Recover interrupted jobs and start dispatching"""
+        if self._thread is not None:
+            return
+
+        # Jobs that were running when the process stopped go back to the
+        # queue; handlers are expected to resume (or safely redo) their work
+        with closing(self._connect()) as conn, conn:
+            recovered = conn.execute(
+                "UPDATE scheduled_jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+        if recovered:
+            app_logger.info(f"Re-queued {recovered} interrupted job(s)")
+        self._fail_unrecoverable()
+
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=self.max_running, thread_name_prefix="job-worker")
+        self._thread = threading.Thread(target=self._dispatch_loop, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop dispatching; running jobs are re-queued on next start"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Dispatching
+    # ------------------------------------------------------------------
+
+    def _fail_unrecoverable(self) -> None:
+        """Mark queued jobs failed when their kind's on_recover check rejects them"""
+        if not self._recover_checks:
+            return
+
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT job_id, kind, payload FROM scheduled_jobs WHERE status = 'queued'"
+            ).fetchall()
+            for row in rows:
+                check = self._recover_checks.get(row['kind'])
+                error = check(json.loads(row['payload'])) if check is not None else None
+                if error is None:
+                    continue
+                conn.execute(
+                    "UPDATE scheduled_jobs SET status = 'failed', error = ?, finished_at = ? "
+                    "WHERE job_id = ? AND status = 'queued'",
+                    (error, datetime.now().isoformat(), row['job_id'])
+                )
+                app_logger.warning(f"Job {row['job_id']} ({row['kind']}) not recovered: {error}")
+
+    def _wake(self) -> None:
+        with self._condition:
+            self._condition.notify_all()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+                job = self._claim_next()
+                if job is None:
+                    self._condition.wait(timeout=1.0)
+                    continue
+                self._running[job['job_id']] = job['user_id']
+                self._last_served[job['user_id']] = time.monotonic()
+                token = CancellationToken(job['payload'].get('time_budget_seconds'))
+                self._tokens[job['job_id']] = token
+
+            self._executor.submit(self._execute, job, token)
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Pick the next job to run and mark it running (caller holds the lock)"""
+        running = len(self._running)
+        if running >= self.max_running:
+            return None
+
+        running_per_user = defaultdict(int)
+        for user_id in self._running.values():
+            running_per_user[user_id] += 1
+
+        with closing(self._connect()) as conn:
+            for lane in LANES:
+                if lane != 'interactive' and running >= self.max_running - self.interactive_reserved:
+                    break
+
+                while True:
+                    candidates = conn.execute(
+                        """
+                        SELECT user_id, MIN(seq) AS first_seq FROM scheduled_jobs
+                        WHERE status = 'queued' AND lane = ?
+                        GROUP BY user_id
+                        """,
+                        (lane,)
+                    ).fetchall()
+                    if not candidates:
+                        break
+
+                    chosen = min(
+                        candidates,
+                        key=lambda row: (
+                            running_per_user[row['user_id']],
+                            self._last_served.get(row['user_id'], 0.0),
+                            row['first_seq'],
+                        )
+                    )
+                    # cancel() may dequeue the job between the SELECT and the
+                    # UPDATE; only a job that is still queued is claimed
+                    with conn:
+                        claimed = conn.execute(
+                            "UPDATE scheduled_jobs SET status = 'running', started_at = ? "
+                            "WHERE seq = ? AND status = 'queued'",
+                            (datetime.now().isoformat(), chosen['first_seq'])
+                        ).rowcount
+                    if not claimed:
+                        continue
+                    row = conn.execute(
+                        "SELECT * FROM scheduled_jobs WHERE seq = ?", (chosen['first_seq'],)
+                    ).fetchone()
+                    return self._to_dict(row)
+
+        return None
+
+    def _execute(self, job: Dict[str, Any], token: CancellationToken) -> None:
+        job_id = job['job_id']
+        status, result, error = 'completed', None, None
+        try:
+            result = self._handlers[job['kind']](job_id, job['payload'], token)
+        except OperationCancelled as e:
+            status, error = 'cancelled', e.reason
+        except HTTPException as e:
+            status, error = 'failed', str(e.detail)
+        except Exception as e:
+            status, error = 'failed', str(e)
+
+        if status == 'failed':
+            app_logger.error(f"Job {job_id} ({job['kind']}) failed: {error}")
+        elif status == 'cancelled':
+            app_logger.warning(f"Job {job_id} ({job['kind']}) cancelled: {error}")
+        else:
+            app_logger.info(f"Job {job_id} ({job['kind']}) completed")
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                UPDATE scheduled_jobs SET status = ?, result = ?, error = ?, finished_at = ?
+                WHERE job_id = ?
+                """,
+                (status, json.dumps(result, default=str) if result is not None else None,
+                 error, datetime.now().isoformat(), job_id)
+            )
+
+        with self._condition:
+            self._running.pop(job_id, None)
+            self._tokens.pop(job_id, None)
+            self._condition.notify_all()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job.pop('seq', None)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+
+def get_user_id(request: Request) -> str:
+    """
+    Identify the submitting user for fair scheduling
+
+    Uses the X-User-Id header when the client sends one, otherwise the
+    client address.
+    """
+    user_id = request.headers.get('x-user-id')
+    if user_id:
+        return user_id.strip()[:100]
+    return request.client.host if request.client else 'anonymous'
+
+
+# Global scheduler instance
+job_scheduler = JobScheduler()
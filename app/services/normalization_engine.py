@@ -4,16 +4,22 @@ Normalization Engine Service
 Orchestrates data normalization using modular normalizers.
 """
 
+import hashlib
+import json
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+from app.config import settings
 from app.models.schemas import (
     ColumnNormalizationConfig,
     NormalizationStatistics
 )
+from app.normalizers.base import BaseNormalizer
 from app.normalizers.text_normalizer import TextNormalizer
 from app.normalizers.email_normalizer import EmailNormalizer
 from app.normalizers.sk_normalizer import SKNormalizer
+from app.services.chunked_datasets import ChunkedDataset, chunked_datasets
+from app.utils.cancellation import CancellationToken, OperationCancelled
 from app.utils.logger import normalization_logger
 
 
@@ -25,19 +31,35 @@ class NormalizationEngine:
     @staticmethod
     def normalize_dataframe(
         df: pd.DataFrame,
-        columns_config: List[ColumnNormalizationConfig]
+        columns_config: List[ColumnNormalizationConfig],
+        cancel_token: Optional[CancellationToken] = None,
+        change_masks: Optional[Dict[str, np.ndarray]] = None
     ) -> tuple[pd.DataFrame, List[NormalizationStatistics]]:
         """
         Normalize DataFrame based on column configurations
         
+        When a cancel token is given, it is checked between columns and
+        between chunks of settings.NORMALIZE_CHUNK_ROWS rows. Once it is
+        cancelled (or its time budget runs out) normalization stops: the
+        column in progress keeps its original values and only the columns
+        finished so far are normalized and reported in the statistics.
+        
+        df is not modified. The result shares the data of the columns that
+        were not normalized with df.
+        
         Args:
             df: DataFrame to normalize
             columns_config: List of column normalization configurations
+            cancel_token: Optional cancellation token / time budget
+            change_masks: Optional dict that receives, per normalized
+                column, a boolean array marking the rows that changed
         
         Returns:
             Tuple of (normalized_df, statistics)
         """
-        normalized_df = df.copy()
+        # Normalized columns are replaced, never written in place, so the
+        # other columns need no copy
+        normalized_df = df.copy(deep=False)
         statistics = []
         
         for config in columns_config:
@@ -50,35 +72,42 @@ class NormalizationEngine:
                 normalization_logger.warning(f"Column '{column_name}' not found in DataFrame")
                 continue
             
+            if cancel_token is not None and cancel_token.cancelled:
+                normalization_logger.warning(
+                    f"Normalization stopped before column '{column_name}': {cancel_token.reason}"
+                )
+                break
+            
             # Store original data for comparison
             original_series = normalized_df[column_name].copy()
             
             # Apply normalization based on column type
             try:
-                if config.column_type == 'text' and config.text_rules:
-                    normalizer = TextNormalizer(config.text_rules.model_dump())
-                    normalized_df[column_name] = normalizer.normalize_series(normalized_df[column_name])
-                
-                elif config.column_type == 'email' and config.email_rules:
-                    normalizer = EmailNormalizer(config.email_rules.model_dump())
-                    normalized_df[column_name] = normalizer.normalize_series(normalized_df[column_name])
-                
-                elif config.column_type == 'sk' and config.sk_rules:
-                    normalizer = SKNormalizer(config.sk_rules.model_dump())
-                    normalized_df[column_name] = normalizer.normalize_series(normalized_df[column_name])
+                normalizer = NormalizationEngine._get_normalizer(config)
+                if normalizer is not None:
+                    normalized_df[column_name] = NormalizationEngine._normalize_series(
+                        normalizer,
+                        normalized_df[column_name],
+                        cancel_token
+                    )
                 
                 # Calculate statistics
-                stats = NormalizationEngine._calculate_statistics(
-                    column_name,
-                    original_series,
-                    normalized_df[column_name]
-                )
+                changed = NormalizationEngine._change_mask(original_series, normalized_df[column_name])
+                stats = NormalizationEngine._statistics_from_mask(column_name, changed)
                 statistics.append(stats)
+                if change_masks is not None:
+                    change_masks[column_name] = changed
                 
                 normalization_logger.info(
                     f"Normalized column '{column_name}' - "
                     f"{stats.rows_changed} rows changed ({stats.change_percentage:.2f}%)"
                 )
+            
+            except OperationCancelled as e:
+                normalization_logger.warning(f"Normalization stopped in column '{column_name}': {e.reason}")
+                # Never leave a half-normalized column behind
+                normalized_df[column_name] = original_series
+                break
                 
             except Exception as e:
                 normalization_logger.error(f"Error normalizing column '{column_name}': {str(e)}")
@@ -87,6 +116,113 @@ class NormalizationEngine:
         
         return normalized_df, statistics
     
+    @staticmethod
+    def normalize_chunked(
+        dataset: ChunkedDataset,
+        normalized_file_id: str,
+        columns_config: List[ColumnNormalizationConfig],
+        cancel_token: Optional[CancellationToken] = None
+    ) -> tuple[ChunkedDataset, List[NormalizationStatistics]]:
+        """
+        Normalize a chunked (out-of-core) dataset into a new chunked dataset
+        
+        Each chunk is normalized with normalize_dataframe() and written out
+        before the next one is read. Unlike in-memory normalization there is
+        no partial result: a cancelled token (checked between chunks) stops
+        the run and nothing is stored.
+        
+        Args:
+            dataset: Dataset to normalize
+            normalized_file_id: File ID for the normalized dataset
+            columns_config: List of column normalization configurations
+            cancel_token: Optional cancellation token / time budget
+        
+        Returns:
+            Tuple of (normalized dataset, statistics)
+        
+        Raises:
+            OperationCancelled: If the token was cancelled
+        """
+        chunk_statistics = []
+        
+        def normalized_chunks():
+            for chunk in dataset.iter_chunks():
+                normalized_chunk, statistics = NormalizationEngine.normalize_dataframe(chunk, columns_config)
+                chunk_statistics.append(statistics)
+                yield normalized_chunk
+        
+        # Same source and same configuration give the same content
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update((dataset.content_hash or dataset.path).encode('utf-8'))
+        digest.update(json.dumps(
+            [config.model_dump() for config in columns_config], sort_keys=True, default=str
+        ).encode('utf-8'))
+        
+        normalized = chunked_datasets.write(
+            normalized_file_id,
+            normalized_chunks(),
+            dataset.column_types,
+            digest.hexdigest(),
+            cancel_token
+        )
+        return normalized, NormalizationEngine._merge_statistics(chunk_statistics)
+    
+    @staticmethod
+    def _merge_statistics(
+        chunk_statistics: Iterable[List[NormalizationStatistics]]
+    ) -> List[NormalizationStatistics]:
+        """Add up per-chunk statistics, one entry per column"""
+        totals: Dict[str, List[int]] = {}
+        for statistics in chunk_statistics:
+            for stats in statistics:
+                counts = totals.setdefault(stats.column_name, [0, 0])
+                counts[0] += stats.rows_changed
+                counts[1] += stats.rows_unchanged
+        
+        merged = []
+        for column_name, (rows_changed, rows_unchanged) in totals.items():
+            total = rows_changed + rows_unchanged
+            merged.append(NormalizationStatistics(
+                column_name=column_name,
+                rows_changed=rows_changed,
+                rows_unchanged=rows_unchanged,
+                change_percentage=round(rows_changed / total * 100, 2) if total > 0 else 0
+            ))
+        return merged
+    
+    @staticmethod
+    def _get_normalizer(config: ColumnNormalizationConfig) -> Optional[BaseNormalizer]:
+        """Get the normalizer for a column configuration (None if no rules apply)"""
+        if config.column_type == 'text' and config.text_rules:
+            return TextNormalizer(config.text_rules.model_dump())
+        elif config.column_type == 'email' and config.email_rules:
+            return EmailNormalizer(config.email_rules.model_dump())
+        elif config.column_type == 'sk' and config.sk_rules:
+            return SKNormalizer(config.sk_rules.model_dump())
+        return None
+    
+    @staticmethod
+    def _normalize_series(
+        normalizer: BaseNormalizer,
+        series: pd.Series,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> pd.Series:
+        """
+        Normalize a series, in chunks when it can be cancelled
+        
+        Raises:
+            OperationCancelled: If the token is cancelled between chunks
+        """
+        chunk_rows = max(1, settings.NORMALIZE_CHUNK_ROWS)
+        if cancel_token is None or len(series) <= chunk_rows:
+            return normalizer.normalize_series(series)
+        
+        chunks = []
+        for start in range(0, len(series), chunk_rows):
+            cancel_token.check()
+            chunks.append(normalizer.normalize_series(series.iloc[start:start + chunk_rows]))
+        return pd.concat(chunks)
+    
     @staticmethod
     def _calculate_statistics(
         column_name: str,
@@ -104,15 +240,26 @@ class NormalizationEngine:
         Returns:
             NormalizationStatistics object
         """
+        return NormalizationEngine._statistics_from_mask(
+            column_name,
+            NormalizationEngine._change_mask(original, normalized)
+        )
+    
+    @staticmethod
+    def _change_mask(original: pd.Series, normalized: pd.Series) -> np.ndarray:
+        """Boolean array marking the rows whose value changed"""
         # Compare original and normalized values
         # Handle NaN values in comparison
-        original_str = original.fillna('').astype(str)
-        normalized_str = normalized.fillna('').astype(str)
-        
-        changed_mask = original_str != normalized_str
+        original_str = NormalizationEngine._as_text(original)
+        normalized_str = NormalizationEngine._as_text(normalized)
+        return (original_str.to_numpy() != normalized_str.to_numpy()).astype(bool)
+    
+    @staticmethod
+    def _statistics_from_mask(column_name: str, changed_mask: np.ndarray) -> NormalizationStatistics:
+        """Normalization statistics of a column from its change mask"""
         rows_changed = changed_mask.sum()
-        rows_unchanged = len(original) - rows_changed
-        change_percentage = (rows_changed / len(original) * 100) if len(original) > 0 else 0
+        rows_unchanged = len(changed_mask) - rows_changed
+        change_percentage = (rows_changed / len(changed_mask) * 100) if len(changed_mask) > 0 else 0
         
         return NormalizationStatistics(
             column_name=column_name,
@@ -121,6 +268,91 @@ class NormalizationEngine:
             change_percentage=round(change_percentage, 2)
         )
     
+    @staticmethod
+    def _as_text(series: pd.Series) -> pd.Series:
+        """
+        Values as strings, missing values as ""
+        
+        fillna('') would fail on category columns ("" is not a category),
+        so missing values are replaced after converting to object.
+        """
+        if pd.api.types.is_object_dtype(series):
+            return series.fillna('').astype(str)
+        return series.astype(object).where(series.notna(), '').astype(str)
+    
+    @staticmethod
+    def compare_dataframes(
+        original_df: pd.DataFrame,
+        normalized_df: pd.DataFrame
+    ) -> List[NormalizationStatistics]:
+        """
+        Calculate normalization statistics for all shared columns
+        
+        Args:
+            original_df: Original DataFrame
+            normalized_df: Normalized DataFrame
+        
+        Returns:
+            List of NormalizationStatistics
+        """
+        statistics = []
+        for column in original_df.columns:
+            if column in normalized_df.columns:
+                stats = NormalizationEngine._calculate_statistics(
+                    column,
+                    original_df[column],
+                    normalized_df[column]
+                )
+                statistics.append(stats)
+        return statistics
+    
+    @staticmethod
+    def compare_with_masks(
+        columns: Iterable[Any],
+        change_masks: Dict[str, np.ndarray],
+        total_rows: int
+    ) -> List[NormalizationStatistics]:
+        """
+        Normalization statistics for all columns from recorded change masks
+        
+        Gives the same result as compare_dataframes() without comparing any
+        values: columns without a mask are unchanged.
+        
+        Args:
+            columns: Columns of the original dataset
+            change_masks: Column -> changed-row mask
+            total_rows: Number of rows
+        
+        Returns:
+            List of NormalizationStatistics
+        """
+        unchanged = np.zeros(total_rows, dtype=bool)
+        return [
+            NormalizationEngine._statistics_from_mask(column, change_masks.get(column, unchanged))
+            for column in columns
+        ]
+    
+    @staticmethod
+    def compare_chunks(
+        chunk_pairs: Iterable[Tuple[pd.DataFrame, pd.DataFrame]]
+    ) -> List[NormalizationStatistics]:
+        """
+        Calculate normalization statistics chunk by chunk
+        
+        Args:
+            chunk_pairs: (original chunk, normalized chunk) pairs covering
+                the same rows
+        
+        Returns:
+            List of NormalizationStatistics
+        """
+        return NormalizationEngine._merge_statistics(
+            NormalizationEngine.compare_dataframes(
+                original.reset_index(drop=True), normalized.reset_index(drop=True)
+            )
+            for original, normalized in chunk_pairs
+        )
+    
     @staticmethod
     def get_changes_details(
         original_df: pd.DataFrame,
@@ -145,8 +377,8 @@ class NormalizationEngine:
         if column_name not in original_df.columns or column_name not in normalized_df.columns:
             return changes
         
-        original = original_df[column_name].fillna('').astype(str)
-        normalized = normalized_df[column_name].fillna('').astype(str)
+        original = NormalizationEngine._as_text(original_df[column_name])
+        normalized = NormalizationEngine._as_text(normalized_df[column_name])
         
         changed_indices = original != normalized
         changed_rows = original_df.index[changed_indices].tolist()[:limit]
@@ -0,0 +1,159 @@
+"""
+Parse Snapshots
+===============
+Columnar snapshots of parsed uploads.
+
+Parsing a large workbook takes far longer than reading the same data back
+from an Arrow IPC file. After an Excel upload is parsed and prepared, its
+datasets are written to settings.SNAPSHOT_DIR, keyed by the upload's parse
+key (content hash plus read options). An identical upload after a restart,
+or after the in-memory copy was dropped, is then loaded from the snapshot
+instead of parsed again.
+
+Snapshots need pyarrow; without it they are silently skipped. Datasets
+that would not survive an Arrow round trip unchanged (mixed-type columns)
+are not snapshotted either. The storage collector deletes snapshots older
+than settings.SNAPSHOT_TTL_SECONDS.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.config import settings
+from app.utils.columnar import is_arrow_lossless, pyarrow_available, read_arrow, write_arrow
+from app.utils.logger import app_logger
+
+
+class ParseSnapshotStore:
+    """
+    Service that saves and loads parsed datasets by parse key.
+    """
+
+    def __init__(self, snapshot_dir: str = None):
+        """
+        Initialize store
+
+        Args:
+            snapshot_dir: Directory for snapshots (default: settings.SNAPSHOT_DIR)
+        """
+        self.snapshot_dir = Path(snapshot_dir or settings.SNAPSHOT_DIR)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    def load(self, parse_key: str) -> Optional[List[Tuple[str, pd.DataFrame, Dict[str, Any]]]]:
+        """
+        Load the datasets of a snapshot
+
+        Args:
+            parse_key: Key of the parsed upload
+
+        Returns:
+            List of (filename, dataframe, details), or None if there is no
+            complete snapshot
+        """
+        manifest_path = self.snapshot_dir / f"{parse_key}.json"
+        if not manifest_path.exists() or not pyarrow_available():
+            return None
+
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            return [
+                (entry['name'], read_arrow(str(self.snapshot_dir / entry['file'])), entry['details'])
+                for entry in manifest['datasets']
+            ]
+        except Exception as e:
+            app_logger.warning(f"Unreadable parse snapshot {parse_key}, ignoring it: {e}")
+            return None
+
+    def save(self, parse_key: str, datasets: List[Tuple[str, pd.DataFrame, Dict[str, Any]]]) -> bool:
+        """
+        Save the datasets of a parsed upload
+
+        The manifest is written last, so a snapshot is only visible once all
+        its files are complete.
+
+        Args:
+            parse_key: Key of the parsed upload
+            datasets: List of (filename, dataframe, details)
+
+        Returns:
+            True if the snapshot was written
+        """
+        if not pyarrow_available():
+            return False
+        if not all(is_arrow_lossless(df) for _, df, _ in datasets):
+            app_logger.debug(f"Parse snapshot {parse_key} skipped: mixed-type columns")
+            return False
+
+        entries = []
+        try:
+            for index, (name, df, details) in enumerate(datasets):
+                file_name = f"{parse_key}.{index}.arrow"
+                partial_path = self.snapshot_dir / f"{file_name}.partial"
+                write_arrow(df, str(partial_path))
+                os.replace(partial_path, self.snapshot_dir / file_name)
+                entries.append({'name': name, 'file': file_name, 'details': details})
+
+            partial_manifest = self.snapshot_dir / f"{parse_key}.json.partial"
+            with open(partial_manifest, 'w', encoding='utf-8') as f:
+                json.dump({'datasets': entries}, f)
+            os.replace(partial_manifest, self.snapshot_dir / f"{parse_key}.json")
+            return True
+        except Exception as e:
+            app_logger.warning(f"Could not write parse snapshot {parse_key}: {e}")
+            return False
+
+    def expire(self, max_age_seconds: float) -> Tuple[int, int]:
+        """
+        Delete snapshots (and leftover partial files) older than max_age_seconds
+
+        The manifest is deleted first, so a snapshot being deleted is never
+        loaded half-complete.
+
+        Args:
+            max_age_seconds: Maximum age since the snapshot was written
+
+        Returns:
+            Tuple of (files removed, bytes freed)
+        """
+        cutoff = time.time() - max_age_seconds
+        removed = freed = 0
+        expired_keys = set()
+        for manifest_path in self.snapshot_dir.glob('*.json'):
+            try:
+                stat = manifest_path.stat()
+                if stat.st_mtime < cutoff:
+                    manifest_path.unlink()
+                    expired_keys.add(manifest_path.stem)
+                    removed += 1
+                    freed += stat.st_size
+            except FileNotFoundError:
+                pass
+
+        live_keys = {path.stem for path in self.snapshot_dir.glob('*.json')}
+        for path in self.snapshot_dir.iterdir():
+            parse_key = path.name.split('.', 1)[0]
+            if not parse_key or path.suffix == '.json' or parse_key in live_keys:
+                continue
+            try:
+                stat = path.stat()
+                # Files without a manifest may belong to a snapshot being written
+                if parse_key in expired_keys or stat.st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+                    freed += stat.st_size
+            except FileNotFoundError:
+                pass
+
+        if removed:
+            app_logger.info(f"Parse snapshots: removed {removed} file(s), {freed} bytes freed")
+        return removed, freed
+
+
+# Global snapshot store instance
+parse_snapshots = ParseSnapshotStore()
@@ -1,14 +1,18 @@
 import json
-import os
 import re
-import logging
+import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Generator
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Generator
 import psycopg2
 from psycopg2.extras import execute_values
 from app.config import settings
+from app.services.failure_store import FailureStore
+from app.utils.cancellation import CancellationToken
+from app.utils.event_coalescer import coalesce_events
+from app.utils.json_stream import JsonArrayReader
+from app.utils.logger import pendampingan_logger
 
-logger = logging.getLogger(__name__)
+logger = pendampingan_logger
 
 class PendampinganService:
     def __init__(self):
@@ -34,6 +38,8 @@ class PendampinganService:
         }
         
         self.INSERT_WITH_NULL_KPS_ID = True
+        
+        self.failure_store = FailureStore()
 
     def get_connection(self):
         try:
@@ -272,207 +278,341 @@ class PendampinganService:
         finally:
             cur.close()
 
-    def process_import(self, file_content: bytes) -> Generator[str, None, None]:
+    def process_import(
+        self,
+        source: BinaryIO,
+        size: Optional[int] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[str, None, None]:
         """
         Process uploaded JSON file and yield progress updates.
         Yields JSON strings formatted for SSE: "data: {...}\n\n"
+        
+        The JSON array is parsed incrementally from the stream, so rows are
+        imported (and progress reported) while the rest of the file is still
+        being read. Per-row events are coalesced into one event per
+        settings.IMPORT_EVENT_WINDOW_MS; failed rows are listed in full in the
+        failure report.
+        
+        Args:
+            source: Binary stream with the JSON array
+            size: Stream size in bytes (for progress), if known
+            cancel_token: Optional token; the import stops after the current
+                batch once it is cancelled
         """
         try:
-            data = json.loads(file_content)
-            if not isinstance(data, list):
-                yield f"data: {json.dumps({'log': 'Error: JSON must be a list'})}\n\n"
-                return
-
-            total_records = len(data)
-            stats = {'total': total_records, 'success': 0, 'failed': 0, 'created': 0}
-            failed_details = []
-            
-            yield f"data: {json.dumps({'log': f'Starting import of {total_records} records', 'stats': stats})}\n\n"
-            
-            conn = self.get_connection()
-            conn.autocommit = False # Use transaction
+            reader = JsonArrayReader(source)
+            events = self.run_import(
+                reader,
+                progress_fn=self.byte_progress(reader, size),
+                cancel_token=cancel_token
+            )
+            for event in coalesce_events(events):
+                yield self.format_sse(event)
             
-            last_pendamping_id = None
-            last_user_id = None
-            last_tahun = None
-            
-            if len(data) > 0:
-                logger.info(f"FIRST RECORD KEYS: {list(data[0].keys())}")
-                logger.info(f"FIRST RECORD EMAIL VALUE (Raw): {data[0].get('EMAIL')}")
-                logger.info(f"Mapping expect: {self.JSON_FIELD_MAPPING['email']}")
+        except Exception as e:
+            yield self.format_sse({'log': f'Critical Error: {str(e)}'})
+
+    @staticmethod
+    def byte_progress(reader: JsonArrayReader, size: Optional[int]) -> Optional[Callable[[int], int]]:
+        """Progress function based on bytes consumed by a streaming reader"""
+        if not size:
+            return None
+        return lambda idx: min(99, round(reader.bytes_read / size * 100))
+
+    @staticmethod
+    def format_sse(event: Dict) -> str:
+        """Format an import event as an SSE data line"""
+        return f"data: {json.dumps(event)}\n\n"
 
-            for idx, record in enumerate(data, 1):
+    @staticmethod
+    def new_checkpoint(total_records: Optional[int] = None, job_id: Optional[str] = None) -> Dict:
+        """
+        Create an empty import checkpoint.
+        
+        The checkpoint holds everything needed to resume an import after the
+        last committed batch: the job id its failures are stored under, the
+        last committed row index, the id caches used for grouped rows and the
+        running stats.
+        """
+        return {
+            'job_id': job_id or str(uuid.uuid4()),
+            'last_row': 0,
+            'last_pendamping_id': None,
+            'last_user_id': None,
+            'last_tahun': None,
+            'stats': {'total': total_records or 0, 'success': 0, 'failed': 0, 'created': 0},
+        }
+
+    def run_import(
+        self,
+        records: Iterable[Dict],
+        total_records: Optional[int] = None,
+        checkpoint: Optional[Dict] = None,
+        on_checkpoint: Optional[Callable[[Dict], None]] = None,
+        progress_fn: Optional[Callable[[int], int]] = None,
+        job_id: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[Dict, None, None]:
+        """
+        Import pendampingan records and yield progress events as dicts.
+        
+        Rows are committed in batches of settings.IMPORT_BATCH_SIZE. After each
+        commit the checkpoint is updated and passed to on_checkpoint, so an
+        interrupted import can be resumed by passing that checkpoint back in:
+        rows up to checkpoint['last_row'] are skipped.
+        
+        Each row runs under its own savepoint: a row that raises is rolled
+        back alone and counted as failed. Failed rows are written to the
+        failure store together with each commit, keyed by the checkpoint's
+        job id.
+        
+        The cancel token is checked after every commit. Once it is cancelled
+        the import stops there and the final event carries 'cancelled' (the
+        reason) with the stats so far instead of progress 100.
+        
+        Args:
+            records: Iterable of JSON records (may be a streaming reader)
+            total_records: Number of records, if known in advance
+            checkpoint: Optional checkpoint to resume from
+            on_checkpoint: Optional callback invoked after every commit
+            progress_fn: Optional function mapping row index to percent done;
+                defaults to row index / total_records
+            job_id: Job ID for a new checkpoint (generated if omitted)
+            cancel_token: Optional cancellation token / time budget
+        """
+        state = checkpoint or self.new_checkpoint(total_records, job_id)
+        job_id = state['job_id']
+        stats = state['stats']
+        failures = []
+        resume_after = state['last_row']
+        batch_size = max(1, settings.IMPORT_BATCH_SIZE)
+        cancelled = None
+        
+        if resume_after:
+            yield {'log': f'Resuming import after row {resume_after}', 'stats': dict(stats)}
+        elif total_records is not None:
+            yield {'log': f'Starting import of {total_records} records', 'stats': dict(stats)}
+        else:
+            yield {'log': 'Starting import', 'stats': dict(stats)}
+        
+        conn = self.get_connection()
+        conn.autocommit = False # Use transaction
+        
+        try:
+            idx = 0
+            for idx, record in enumerate(records, 1):
+                if total_records is None:
+                    stats['total'] = idx
+                if idx <= resume_after:
+                    continue
+                
+                if idx == 1:
+                    logger.info(f"FIRST RECORD KEYS: {list(record.keys())}")
+                    logger.info(f"FIRST RECORD EMAIL VALUE (Raw): {record.get('EMAIL')}")
+                    logger.info(f"Mapping expect: {self.JSON_FIELD_MAPPING['email']}")
+                
+                # A failing row is rolled back to its savepoint, so the
+                # uncommitted rows before it in the batch are kept
+                carried = {key: state[key] for key in ('last_pendamping_id', 'last_user_id', 'last_tahun')}
+                counts = dict(stats)
+                cur = conn.cursor()
                 try:
-                    # Logic adaptation from reference
-                    # 1. Validation (Email & No SK mandatories)
-                    email_raw = self.safe_str(record.get(self.JSON_FIELD_MAPPING['email']))
-                    no_sk_raw = self.safe_str(record.get(self.JSON_FIELD_MAPPING['no_sk_kps']))
-                    
-                    if not no_sk_raw:
+                    cur.execute("SAVEPOINT import_row")
+                    try:
+                        yield from self._import_record(conn, idx, record, state, failures)
+                        cur.execute("RELEASE SAVEPOINT import_row")
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT import_row")
+                        # Forget IDs and counts of the row's rolled-back inserts
+                        state.update(carried)
+                        stats.update(counts)
                         stats['failed'] += 1
-                        failed_details.append({
+                        failures.append({
                             'row': idx,
-                            'reason': 'no_sk_missing',
-                            'message': 'No SK KPS is required',
+                            'reason': 'exception',
+                            'message': str(e),
                             'record': record
                         })
-                        yield f"data: {json.dumps({'log': f'Row {idx}: No SK KPS missing'})}\n\n"
-                        continue
-
-                    # 2. Resolve Pendamping
-                    no_value = record.get(self.JSON_FIELD_MAPPING['no'])
-                    is_no_empty = (no_value is None or self.safe_str(no_value) == '')
+                        logger.error(f"Error row {idx}: {e}")
+                finally:
+                    cur.close()
+                
+                if idx % batch_size == 0:
+                    conn.commit()
+                    self.failure_store.add_many(job_id, failures)
+                    failures.clear()
+                    state['last_row'] = idx
+                    if on_checkpoint:
+                        on_checkpoint(state)
+                    if progress_fn:
+                        progress = progress_fn(idx)
+                    else:
+                        progress = round((idx / total_records) * 100) if total_records else 0
+                    yield {'progress': progress, 'stats': dict(stats)}
                     
-                    nama_val = self.safe_str(record.get(self.JSON_FIELD_MAPPING['nama_pendamping']))
-                    nama_present = bool(nama_val)
+                    if cancel_token is not None and cancel_token.cancelled:
+                        cancelled = cancel_token.reason
+                        logger.warning(f"Import {job_id} stopped after row {idx}: {cancelled}")
+                        break
+            
+            conn.commit()
+            self.failure_store.add_many(job_id, failures)
+            state['last_row'] = max(idx, resume_after)
+            if on_checkpoint:
+                on_checkpoint(state)
+        finally:
+            conn.close()
+        
+        # Failure report is served from the failure store
+        failed_report_url = None
+        if stats['failed']:
+            failed_report_url = f"/failures/{job_id}/export"
 
-                    pendamping_id = None
-                    user_id = None
-                    
-                    # Only reuse previous ID if BOTH 'No' and 'Nama' are empty (implies grouped row detail)
-                    if (is_no_empty and not nama_present) and last_pendamping_id:
-                        pendamping_id = last_pendamping_id
-                        user_id = last_user_id
-                    else:
-                        user_id = self.resolve_user_id(conn, record)
-                        
-                        if user_id:
-                            # User exists, check master_pendamping
-                            pendamping_id = self.resolve_pendamping_id(conn, user_id)
-                            if not pendamping_id:
-                                # User exists but not in master_pendamping -> Insert into master_pendamping
-                                cur_create = conn.cursor()
-                                try:
-                                    cur_create.execute("""
-                                        INSERT INTO master_pendamping (user_id, created_at, updated_at)
-                                        VALUES (%s, NOW(), NOW())
-                                        RETURNING pendamping_id
-                                    """, (user_id,))
-                                    pendamping_id = cur_create.fetchone()[0]
-                                    stats['created'] += 1
-                                    yield f"data: {json.dumps({'log': f'Row {idx}: Created master_pendamping for existing user {user_id}'})}\n\n"
-                                finally:
-                                    cur_create.close()
-                        else:
-                            # User does not exist -> Create User AND Master Pendamping
-                            # Creation requires EMAIL. If missing here, we fail.
-                            if not email_raw:
-                                stats['failed'] += 1
-                                failed_details.append({
-                                    'row': idx,
-                                    'reason': 'email_missing_new_user',
-                                    'message': 'Email is required to create a new user',
-                                    'record': record
-                                })
-                                yield f"data: {json.dumps({'log': f'Row {idx}: Email missing for new user'})}\n\n"
-                                continue
+        if cancelled:
+            yield {
+                'stats': dict(stats),
+                'log': f'Import stopped after row {state["last_row"]} ({cancelled})',
+                'job_id': job_id,
+                'failed_report_url': failed_report_url,
+                'cancelled': cancelled,
+            }
+            return
 
-                            pendamping_id, user_id = self.create_pendamping(conn, record)
-                            if pendamping_id:
-                                stats['created'] += 1
-                                yield f"data: {json.dumps({'log': f'Row {idx}: Created new user & pendamping'})}\n\n"
+        yield {'progress': 100, 'stats': dict(stats), 'log': 'Import completed!', 'job_id': job_id, 'failed_report_url': failed_report_url}
 
-                        if pendamping_id and user_id:
-                            last_pendamping_id = pendamping_id
-                            last_user_id = user_id
-                    
-                    if not pendamping_id:
-                        stats['failed'] += 1
-                        error_msg = f"Pendamping not found and creation failed: {email_raw} / {self.safe_str(record.get(self.JSON_FIELD_MAPPING['nama_pendamping']))}"
-                        failed_details.append({
-                            'row': idx,
-                            'reason': 'pendamping_creation_failed',
-                            'message': error_msg,
-                            'record': record
-                        })
-                        yield f"data: {json.dumps({'log': f'Row {idx}: {error_msg}'})}\n\n"
-                        continue
+    def _import_record(self, conn, idx: int, record: Dict, state: Dict, failed_details: List[Dict]) -> Generator[Dict, None, None]:
+        """Import a single record, updating state and yielding log events"""
+        stats = state['stats']
+        
+        # Logic adaptation from reference
+        # 1. Validation (Email & No SK mandatories)
+        email_raw = self.safe_str(record.get(self.JSON_FIELD_MAPPING['email']))
+        no_sk_raw = self.safe_str(record.get(self.JSON_FIELD_MAPPING['no_sk_kps']))
+        
+        if not no_sk_raw:
+            stats['failed'] += 1
+            failed_details.append({
+                'row': idx,
+                'reason': 'no_sk_missing',
+                'message': 'No SK KPS is required',
+                'record': record
+            })
+            yield {'log': f'Row {idx}: No SK KPS missing'}
+            return
 
-                    # 3. Year
-                    tahun = self.safe_str(record.get(self.JSON_FIELD_MAPPING['tahun_pendampingan']))
-                    if is_no_empty and not tahun and last_tahun:
-                        tahun = last_tahun
-                    elif tahun:
-                        last_tahun = tahun
-                    
-                    if not tahun:
-                        stats['failed'] += 1
-                        failed_details.append({
-                            'row': idx,
-                            'reason': 'year_missing',
-                            'message': 'Tahun pendampingan missing',
-                            'record': record
-                        })
-                        continue
+        # 2. Resolve Pendamping
+        no_value = record.get(self.JSON_FIELD_MAPPING['no'])
+        is_no_empty = (no_value is None or self.safe_str(no_value) == '')
+        
+        nama_val = self.safe_str(record.get(self.JSON_FIELD_MAPPING['nama_pendamping']))
+        nama_present = bool(nama_val)
 
-                    # 4. Resolve KPS
-                    no_sk = record.get(self.JSON_FIELD_MAPPING['no_sk_kps'])
-                    skema = record.get(self.JSON_FIELD_MAPPING['skema_ps'])
-                    kps_id = self.resolve_kps_id(conn, no_sk, skema, record)
-                    
-                    # Optional: Fail if KPS ID not resolved? 
-                    # If No SK was present but invalid/not found, kps_id is None.
-                    # Per user request "jika nomor sk ... tidak ada", we handled the *missing string* case.
-                    # If the SK string exists but is not in DB, do we fail?
-                    # "reference/import_pendampingan.py" allowed NULL kps_id.
-                    # I will keep allowing NULL kps_id if resolve fails (but string exists), 
-                    # ONLY failing if the string itself was missing (checked above).
-                    
-                    # 4. Insert
-                    cur = conn.cursor()
-                    keterangan = self.safe_str(record.get(self.JSON_FIELD_MAPPING['keterangan']), 'Imported via Web')
-                    
-                    # Update Insert to include user_id if the table supports it (as per SQL reference)
-                    cur.execute("""
-                        INSERT INTO pendampingan 
-                        (pendamping_id, user_id, tahun_pendampingan, kps_id, keterangan, waktu_upload)
-                        VALUES (%s, %s, %s, %s, %s, NOW())
-                        RETURNING id_pendampingan
-                    """, (pendamping_id, user_id, tahun, kps_id, keterangan))
-                    
-                    stats['success'] += 1
-                    
-                    if idx % 10 == 0:
-                        progress = round((idx / total_records) * 100)
-                        yield f"data: {json.dumps({'progress': progress, 'stats': stats})}\n\n"
-                        conn.commit()
-                        
-                except Exception as e:
+        pendamping_id = None
+        user_id = None
+        
+        # Only reuse previous ID if BOTH 'No' and 'Nama' are empty (implies grouped row detail)
+        if (is_no_empty and not nama_present) and state['last_pendamping_id']:
+            pendamping_id = state['last_pendamping_id']
+            user_id = state['last_user_id']
+        else:
+            user_id = self.resolve_user_id(conn, record)
+            
+            if user_id:
+                # User exists, check master_pendamping
+                pendamping_id = self.resolve_pendamping_id(conn, user_id)
+                if not pendamping_id:
+                    # User exists but not in master_pendamping -> Insert into master_pendamping
+                    cur_create = conn.cursor()
+                    try:
+                        cur_create.execute("""
+                            INSERT INTO master_pendamping (user_id, created_at, updated_at)
+                            VALUES (%s, NOW(), NOW())
+                            RETURNING pendamping_id
+                        """, (user_id,))
+                        pendamping_id = cur_create.fetchone()[0]
+                        stats['created'] += 1
+                        yield {'log': f'Row {idx}: Created master_pendamping for existing user {user_id}'}
+                    finally:
+                        cur_create.close()
+            else:
+                # User does not exist -> Create User AND Master Pendamping
+                # Creation requires EMAIL. If missing here, we fail.
+                if not email_raw:
                     stats['failed'] += 1
                     failed_details.append({
                         'row': idx,
-                        'reason': 'exception',
-                        'message': str(e),
+                        'reason': 'email_missing_new_user',
+                        'message': 'Email is required to create a new user',
                         'record': record
                     })
-                    logger.error(f"Error row {idx}: {e}")
-                    conn.rollback()
-            
-            conn.commit()
-            conn.close()
-            
-            # Generate Report if needed
-            failed_report_url = None
-            if failed_details:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"failed_import_{timestamp}.json"
-                filepath = os.path.join(settings.EXPORT_DIR, filename)
-                
-                with open(filepath, 'w') as f:
-                    json.dump(failed_details, f, indent=2)
-                
-                failed_report_url = f"/static/exports/{filename}"
-                # Ensure static mount or route exists for this, assume /exports maps there or serve via separate route.
-                # Actually main.py mounts /static. If EXPORT_DIR is not inside static, we need a route.
-                # Let's save to a path we can serve or create a route. 
-                # For simplicity, assuming EXPORT_DIR is accessible or we create a route.
-                # Let's use a specialized route to serve these.
-                failed_report_url = f"/exports/{filename}"
+                    yield {'log': f'Row {idx}: Email missing for new user'}
+                    return
 
-            yield f"data: {json.dumps({'progress': 100, 'stats': stats, 'log': 'Import completed!', 'failed_report_url': failed_report_url})}\n\n"
-            
-        except Exception as e:
-            yield f"data: {json.dumps({'log': f'Critical Error: {str(e)}'})}\n\n"
+                pendamping_id, user_id = self.create_pendamping(conn, record)
+                if pendamping_id:
+                    stats['created'] += 1
+                    yield {'log': f'Row {idx}: Created new user & pendamping'}
+
+            if pendamping_id and user_id:
+                state['last_pendamping_id'] = pendamping_id
+                state['last_user_id'] = user_id
+        
+        if not pendamping_id:
+            stats['failed'] += 1
+            error_msg = f"Pendamping not found and creation failed: {email_raw} / {self.safe_str(record.get(self.JSON_FIELD_MAPPING['nama_pendamping']))}"
+            failed_details.append({
+                'row': idx,
+                'reason': 'pendamping_creation_failed',
+                'message': error_msg,
+                'record': record
+            })
+            yield {'log': f'Row {idx}: {error_msg}'}
+            return
+
+        # 3. Year
+        tahun = self.safe_str(record.get(self.JSON_FIELD_MAPPING['tahun_pendampingan']))
+        if is_no_empty and not tahun and state['last_tahun']:
+            tahun = state['last_tahun']
+        elif tahun:
+            state['last_tahun'] = tahun
+        
+        if not tahun:
+            stats['failed'] += 1
+            failed_details.append({
+                'row': idx,
+                'reason': 'year_missing',
+                'message': 'Tahun pendampingan missing',
+                'record': record
+            })
+            return
+
+        # 4. Resolve KPS
+        no_sk = record.get(self.JSON_FIELD_MAPPING['no_sk_kps'])
+        skema = record.get(self.JSON_FIELD_MAPPING['skema_ps'])
+        kps_id = self.resolve_kps_id(conn, no_sk, skema, record)
+        
+        # Optional: Fail if KPS ID not resolved? 
+        # If No SK was present but invalid/not found, kps_id is None.
+        # Per user request "jika nomor sk ... tidak ada", we handled the *missing string* case.
+        # If the SK string exists but is not in DB, do we fail?
+        # "reference/import_pendampingan.py" allowed NULL kps_id.
+        # I will keep allowing NULL kps_id if resolve fails (but string exists), 
+        # ONLY failing if the string itself was missing (checked above).
+        
+        # 4. Insert
+        cur = conn.cursor()
+        keterangan = self.safe_str(record.get(self.JSON_FIELD_MAPPING['keterangan']), 'Imported via Web')
+        
+        # Update Insert to include user_id if the table supports it (as per SQL reference)
+        cur.execute("""
+            INSERT INTO pendampingan 
+            (pendamping_id, user_id, tahun_pendampingan, kps_id, keterangan, waktu_upload)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+            RETURNING id_pendampingan
+        """, (pendamping_id, user_id, tahun, kps_id, keterangan))
+        
+        stats['success'] += 1
 
     def load_db_pendampingan(self, conn) -> Dict:
         cur = conn.cursor()
@@ -0,0 +1,293 @@
+"""
+Storage Collector
+=================
+Background garbage collection for datasets and the files derived from them.
+
+Uploads, normalized datasets, exports, parse snapshots and import jobs are
+never deleted by the requests that create them, so memory and the data
+directories only grow. The collector runs every
+settings.GC_INTERVAL_SECONDS (or on demand) and reclaims:
+
+- datasets: unused for settings.DATASET_TTL_SECONDS, and then the least
+  recently used ones while the in-memory total exceeds
+  settings.DATASET_MEMORY_MAX_BYTES. A dataset that a column delta still
+  reads from (see DatasetLineage.reference_counts()) is never deleted;
+  once its deltas are gone, it is collected in the same run.
+- uploads: files in UPLOAD_DIR that no live dataset was parsed from, older
+  than settings.UPLOAD_TTL_SECONDS or, oldest first, above
+  settings.UPLOAD_DIR_MAX_BYTES
+- exports: cached exports unused for settings.EXPORT_TTL_SECONDS and other
+  files in EXPORT_DIR older than that
+- snapshots: parse snapshots and out-of-core files no dataset uses, older
+  than settings.SNAPSHOT_TTL_SECONDS
+- anything registered with register() (e.g. finished import jobs)
+
+Each run returns a report of what was removed and the bytes reclaimed.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.chunked_datasets import chunked_datasets
+from app.services.dataset_lineage import dataset_lineage
+from app.services.export_cache import export_cache
+from app.services.parse_snapshots import parse_snapshots
+from app.services.upload_handler import UploadHandler
+from app.utils.logger import app_logger
+
+
+# Callable(max_age_seconds) -> (items removed, bytes freed)
+CollectFunc = Callable[[float], Tuple[int, int]]
+
+# Files modified more recently may still be written or parsed; the upload
+# quota never deletes them
+MIN_FILE_AGE_SECONDS = 300
+
+
+class StorageCollector:
+    """
+    Service that deletes unused datasets and files, periodically or on demand.
+    """
+
+    def __init__(self, interval_seconds: int = None):
+        """
+        Initialize collector
+
+        Args:
+            interval_seconds: Seconds between runs; 0 disables the background
+                thread (default: settings.GC_INTERVAL_SECONDS)
+        """
+        self.interval_seconds = (
+            interval_seconds if interval_seconds is not None else settings.GC_INTERVAL_SECONDS
+        )
+        self._collect_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._areas: Dict[str, Tuple[CollectFunc, Callable[[], float]]] = {}
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def register(self, area: str, collect: CollectFunc, ttl_seconds: Callable[[], float]) -> None:
+        """
+        Register an extra area to collect on every run
+
+        Args:
+            area: Name used in the report
+            collect: Called with the maximum age; returns (items removed, bytes freed)
+            ttl_seconds: Returns the maximum age; 0 skips the area
+        """
+        self._areas[area] = (collect, ttl_seconds)
+
+    def start(self) -> None:
+        """Start collecting in the background"""
+        if self._thread is not None or self.interval_seconds <= 0:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="storage-collector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        Run one collection over all areas
+
+        Returns:
+            Report dict with per-area counts and bytes, and bytes_reclaimed
+        """
+        with self._collect_lock:
+            started = time.time()
+            report: Dict[str, Any] = {
+                'datasets': self._collect_datasets(),
+                'uploads': self._collect_uploads(),
+                'exports': self._collect_exports(),
+                'snapshots': self._collect_snapshots(),
+            }
+            for area, (collect, ttl_seconds) in self._areas.items():
+                max_age = ttl_seconds()
+                removed, freed = collect(max_age) if max_age > 0 else (0, 0)
+                report[area] = {'removed': removed, 'bytes': freed}
+
+            report['bytes_reclaimed'] = sum(area['bytes'] for area in report.values())
+            report['duration_seconds'] = round(time.time() - started, 3)
+            self.last_report = report
+
+        if report['bytes_reclaimed']:
+            app_logger.info(f"Storage collection reclaimed {report['bytes_reclaimed']} bytes")
+        return report
+
+    def _loop(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.collect()
+            except Exception as e:
+                app_logger.error(f"Storage collection failed: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Areas
+    # ------------------------------------------------------------------
+
+    def _collect_datasets(self) -> Dict[str, Any]:
+        """Delete idle datasets, then enforce the memory quota"""
+        removed: List[str] = []
+        freed = 0
+        ttl = settings.DATASET_TTL_SECONDS
+
+        # Deleting a delta can free its base, so repeat until nothing changes
+        while ttl > 0:
+            cutoff = time.time() - ttl
+            references = dataset_lineage.reference_counts()
+            expired = [
+                node['file_id'] for node in dataset_lineage.nodes()
+                if node['last_access'] < cutoff and not references.get(node['file_id'])
+            ]
+            if not expired:
+                break
+            deleted = False
+            for file_id in expired:
+                size = UploadHandler.delete_dataset(file_id)
+                if size is None:
+                    # A delta was derived from it since the snapshot
+                    continue
+                freed += size
+                removed.append(file_id)
+                deleted = True
+            if not deleted:
+                break
+
+        quota = settings.DATASET_MEMORY_MAX_BYTES
+        if quota > 0:
+            in_memory = [
+                node for node in dataset_lineage.nodes()
+                if UploadHandler.get_chunked(node['file_id']) is None
+            ]
+            total = UploadHandler.memory_usage([node['file_id'] for node in in_memory])
+            skipped = set()
+            while total > quota:
+                references = dataset_lineage.reference_counts()
+                candidates = [
+                    node for node in in_memory
+                    if node['file_id'] not in removed
+                    and node['file_id'] not in skipped
+                    and not references.get(node['file_id'])
+                ]
+                if not candidates:
+                    break
+                oldest = min(candidates, key=lambda node: node['last_access'])
+                size = UploadHandler.delete_dataset(oldest['file_id'])
+                if size is None:
+                    skipped.add(oldest['file_id'])
+                    continue
+                removed.append(oldest['file_id'])
+                freed += size
+                total -= size
+
+        if removed:
+            app_logger.info(f"Storage collection: {len(removed)} dataset(s) dropped")
+        return {'removed': len(removed), 'bytes': freed, 'file_ids': removed}
+
+    def _collect_uploads(self) -> Dict[str, Any]:
+        """Delete uploaded files no live dataset was parsed from"""
+        referenced = {os.path.abspath(path) for path in dataset_lineage.referenced_uploads()}
+        candidates = [
+            path for path in self._files(Path(settings.UPLOAD_DIR))
+            if os.path.abspath(path) not in referenced
+        ]
+        ttl = settings.UPLOAD_TTL_SECONDS
+        cutoff = time.time() - ttl if ttl > 0 else None
+        quota = settings.UPLOAD_DIR_MAX_BYTES
+
+        removed = freed = 0
+        total = sum(stat.st_size for _, stat in self._stats(self._files(Path(settings.UPLOAD_DIR))))
+        settled = time.time() - MIN_FILE_AGE_SECONDS
+        for path, stat in sorted(self._stats(candidates), key=lambda item: item[1].st_mtime):
+            expired = cutoff is not None and stat.st_mtime < cutoff
+            over_quota = quota > 0 and total > quota and stat.st_mtime < settled
+            if not expired and not over_quota:
+                continue
+            if self._unlink(path):
+                removed += 1
+                freed += stat.st_size
+                total -= stat.st_size
+        return {'removed': removed, 'bytes': freed}
+
+    def _collect_exports(self) -> Dict[str, Any]:
+        """Expire cached exports and delete old uncached export files"""
+        ttl = settings.EXPORT_TTL_SECONDS
+        if ttl <= 0:
+            return {'removed': 0, 'bytes': 0}
+
+        removed, freed = export_cache.expire(ttl)
+        cached = export_cache.file_names()
+        cutoff = time.time() - ttl
+        for path, stat in self._stats(self._files(Path(settings.EXPORT_DIR))):
+            if path.name in cached:
+                continue
+            if stat.st_mtime < cutoff and self._unlink(path):
+                removed += 1
+                freed += stat.st_size
+        return {'removed': removed, 'bytes': freed}
+
+    def _collect_snapshots(self) -> Dict[str, Any]:
+        """Expire parse snapshots and out-of-core files no dataset uses"""
+        ttl = settings.SNAPSHOT_TTL_SECONDS
+        if ttl <= 0:
+            return {'removed': 0, 'bytes': 0}
+
+        removed, freed = parse_snapshots.expire(ttl)
+        live = {node['file_id'] for node in dataset_lineage.nodes()}
+        cutoff = time.time() - ttl
+        for path, stat in self._stats(self._files(chunked_datasets.dataset_dir)):
+            file_id = path.name.split('.', 1)[0]
+            if file_id in live or stat.st_mtime >= cutoff:
+                continue
+            chunked_datasets.forget(file_id)
+            if self._unlink(path):
+                removed += 1
+                freed += stat.st_size
+        return {'removed': removed, 'bytes': freed}
+
+    # ------------------------------------------------------------------
+    # File helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _files(directory: Path) -> List[Path]:
+        """Regular files directly in a directory (hidden files such as .gitkeep excluded)"""
+        if not directory.is_dir():
+            return []
+        return [path for path in directory.iterdir() if path.is_file() and not path.name.startswith('.')]
+
+    @staticmethod
+    def _stats(paths: List[Path]) -> List[Tuple[Path, os.stat_result]]:
+        """(path, stat) for files that still exist"""
+        stats = []
+        for path in paths:
+            try:
+                stats.append((path, path.stat()))
+            except FileNotFoundError:
+                pass
+        return stats
+
+    @staticmethod
+    def _unlink(path: Path) -> bool:
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            app_logger.warning(f"Could not delete {path}: {e}")
+            return False
+
+
+# Global storage collector instance
+storage_collector = StorageCollector()
@@ -0,0 +1,75 @@
+"""
+Cooperative Cancellation
+========================
+Cancellation tokens and time budgets for long-running operations.
+
+Long operations (normalization, export, pendampingan import) check a token
+between units of work (columns, chunks, batches). A token is cancelled
+explicitly (client disconnected, job cancelled) or implicitly when its time
+budget runs out.
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+CLIENT_DISCONNECTED = 'client_disconnected'
+JOB_CANCELLED = 'job_cancelled'
+TIME_BUDGET_EXCEEDED = 'time_budget_exceeded'
+
+
+class OperationCancelled(Exception):
+    """Raised by CancellationToken.check() once the token is cancelled"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Operation cancelled: {reason}")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Thread-safe cancellation flag with an optional deadline.
+    """
+
+    def __init__(self, time_budget: Optional[float] = None):
+        """
+        Initialize token
+
+        Args:
+            time_budget: Optional budget in seconds, counted from now
+        """
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+
+    def cancel(self, reason: str = JOB_CANCELLED) -> None:
+        """Request cancellation (the first reason wins)"""
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancelled or past the deadline"""
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(TIME_BUDGET_EXCEEDED)
+            return True
+        return False
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Why the token was cancelled (None while active)"""
+        return self._reason if self.cancelled else None
+
+    def check(self) -> None:
+        """
+        Raise if cancelled
+
+        Raises:
+            OperationCancelled: If the token was cancelled or the budget ran out
+        """
+        if self.cancelled:
+            raise OperationCancelled(self._reason)
@@ -0,0 +1,418 @@
+"""
+Columnar File Formats
+=====================
+Parquet and Arrow IPC (Feather) reading and writing via pyarrow, plus the
+multi-threaded Arrow CSV reader.
+
+pyarrow is an optional dependency: CSV/Excel/JSON keep working without it,
+and Parquet/Arrow requests fail with a clear error instead of an import
+error at startup.
+"""
+
+import itertools
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+from fastapi import HTTPException
+
+from app.config import settings
+from app.utils.cancellation import CancellationToken
+
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.feather', '.arrow')
+
+PARQUET_COMPRESSIONS = ('snappy', 'gzip', 'brotli', 'zstd', 'lz4', 'none')
+ARROW_COMPRESSIONS = ('lz4', 'zstd', 'none')
+
+
+def require_pyarrow():
+    """
+    Import pyarrow
+
+    Returns:
+        The pyarrow module
+
+    Raises:
+        HTTPException: If pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise HTTPException(
+            status_code=501,
+            detail="Parquet/Arrow support requires pyarrow (pip install pyarrow)"
+        )
+
+
+@lru_cache(maxsize=None)
+def pyarrow_available() -> bool:
+    """Check whether pyarrow can be imported"""
+    try:
+        require_pyarrow()
+        return True
+    except HTTPException:
+        return False
+
+
+class ArrowCsvUnsupported(Exception):
+    """Raised when the Arrow CSV reader cannot match pandas for a file"""
+
+
+def read_csv_arrow(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    block_size: Optional[int] = None,
+    dialect: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """
+    Read a CSV file with pyarrow's multi-threaded block parser
+
+    Types follow pd.read_csv(): empty strings are nulls, and dates/times
+    stay text (pyarrow would infer date32/time64), so both readers produce
+    the same frame for well-formed files.
+
+    Args:
+        file_path: Path to CSV file
+        columns: Optional subset of columns to read
+        block_size: Bytes per parse block (default: settings.CSV_BLOCK_SIZE);
+            blocks are parsed in parallel
+        dialect: Optional encoding, delimiter, quotechar and header_row
+            (see app.utils.csv_dialect)
+
+    Returns:
+        DataFrame (string columns as Arrow-backed strings when
+        settings.CSV_ARROW_STRINGS is on)
+
+    Raises:
+        ArrowCsvUnsupported: If the file has quirks the Arrow reader does
+            not handle (ragged rows, non-UTF-8 text, unknown columns); the
+            caller should fall back to pandas
+    """
+    pa = require_pyarrow()
+    import pyarrow.csv as pa_csv
+
+    dialect = dialect or {}
+    read_options = pa_csv.ReadOptions(
+        use_threads=True,
+        block_size=block_size or settings.CSV_BLOCK_SIZE,
+        encoding=dialect.get('encoding', 'utf8'),
+        skip_rows=dialect.get('header_row', 1) - 1
+    )
+    parse_options = pa_csv.ParseOptions(
+        delimiter=dialect.get('delimiter', ','),
+        quote_char=dialect.get('quotechar', '"')
+    )
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=columns,
+        strings_can_be_null=True,
+        timestamp_parsers=[]
+    )
+    try:
+        table = pa_csv.read_csv(
+            file_path,
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=convert_options
+        )
+    except (pa.ArrowException, UnicodeDecodeError) as e:
+        raise ArrowCsvUnsupported(str(e)) from e
+
+    for index, field in enumerate(table.schema):
+        if pa.types.is_binary(field.type):
+            # Cells that are not valid UTF-8
+            raise ArrowCsvUnsupported(f"Column '{field.name}' is not valid UTF-8")
+        if pa.types.is_date(field.type) or pa.types.is_time(field.type):
+            table = table.set_column(index, field.name, table.column(index).cast(pa.string()))
+        elif pa.types.is_null(field.type):
+            # All-empty column: pandas reads it as float NaN
+            table = table.set_column(index, field.name, table.column(index).cast(pa.float64()))
+
+    types_mapper = {pa.string(): pd.StringDtype('pyarrow')}.get if settings.CSV_ARROW_STRINGS else None
+    return table.to_pandas(types_mapper=types_mapper)
+
+
+def read_parquet(file_path: Union[str, BinaryIO], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a Parquet file
+
+    Args:
+        file_path: Path to file, or a seekable binary file object
+        columns: Optional columns to read (others are never decoded)
+
+    Returns:
+        DataFrame
+    """
+    require_pyarrow()
+    import pyarrow.parquet as pq
+
+    return pq.read_table(file_path, columns=columns).to_pandas()
+
+
+def read_arrow(file_path: Union[str, BinaryIO], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read an Arrow IPC (Feather v2) file, memory-mapped when given a path
+
+    Args:
+        file_path: Path to file, or a seekable binary file object
+        columns: Optional columns to read
+
+    Returns:
+        DataFrame
+    """
+    require_pyarrow()
+    import pyarrow.feather as feather
+
+    return feather.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+
+
+def write_parquet(
+    df: pd.DataFrame,
+    file_path: str,
+    compression: Optional[str] = None,
+    row_group_size: Optional[int] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> None:
+    """
+    Write a Parquet file one row group at a time
+
+    Args:
+        df: DataFrame to write
+        file_path: Output path
+        compression: Codec (default: settings.PARQUET_COMPRESSION)
+        row_group_size: Rows per row group (default: settings.PARQUET_ROW_GROUP_SIZE)
+        cancel_token: Optional token checked between row groups
+
+    Raises:
+        HTTPException: If the codec is not supported
+        OperationCancelled: If the token was cancelled
+    """
+    require_pyarrow()
+    import pyarrow.parquet as pq
+
+    compression = _check_codec(compression or settings.PARQUET_COMPRESSION, PARQUET_COMPRESSIONS)
+    row_group_size = max(1, row_group_size or settings.PARQUET_ROW_GROUP_SIZE)
+
+    table = _to_table(df)
+    with pq.ParquetWriter(file_path, table.schema, compression=compression) as writer:
+        for offset in range(0, max(table.num_rows, 1), row_group_size):
+            if cancel_token is not None:
+                cancel_token.check()
+            writer.write_table(table.slice(offset, row_group_size))
+
+
+def write_arrow(
+    df: pd.DataFrame,
+    file_path: str,
+    compression: Optional[str] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> None:
+    """
+    Write an Arrow IPC (Feather v2) file one record batch at a time
+
+    Args:
+        df: DataFrame to write
+        file_path: Output path
+        compression: Codec (default: settings.ARROW_COMPRESSION)
+        cancel_token: Optional token checked between batches
+
+    Raises:
+        HTTPException: If the codec is not supported
+        OperationCancelled: If the token was cancelled
+    """
+    pa = require_pyarrow()
+
+    compression = _check_codec(compression or settings.ARROW_COMPRESSION, ARROW_COMPRESSIONS)
+    batch_rows = max(1, settings.EXPORT_CHUNK_ROWS)
+
+    table = _to_table(df)
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(file_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            for offset in range(0, table.num_rows, batch_rows):
+                if cancel_token is not None:
+                    cancel_token.check()
+                writer.write_table(table.slice(offset, batch_rows))
+
+
+def write_parquet_frames(
+    frames: Iterable[pd.DataFrame],
+    file_path: str,
+    compression: Optional[str] = None,
+    row_group_size: Optional[int] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    metadata: Optional[Dict[str, str]] = None
+) -> int:
+    """
+    Write a sequence of DataFrames with the same columns as one Parquet file
+
+    Only one frame is held at a time, so datasets larger than memory can be
+    written chunk by chunk.
+
+    Args:
+        frames: DataFrames to write, in order (at least one)
+        file_path: Output path
+        compression: Codec (default: settings.PARQUET_COMPRESSION)
+        row_group_size: Max rows per row group (default: settings.PARQUET_ROW_GROUP_SIZE)
+        cancel_token: Optional token checked between frames
+        metadata: Optional key/value metadata stored in the file schema
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        HTTPException: If the codec is not supported
+        OperationCancelled: If the token was cancelled
+    """
+    require_pyarrow()
+    import pyarrow.parquet as pq
+
+    compression = _check_codec(compression or settings.PARQUET_COMPRESSION, PARQUET_COMPRESSIONS)
+    row_group_size = max(1, row_group_size or settings.PARQUET_ROW_GROUP_SIZE)
+
+    tables = _iter_tables(frames, cancel_token, metadata)
+    first = next(tables)
+    rows = 0
+    with pq.ParquetWriter(file_path, first.schema, compression=compression) as writer:
+        for table in itertools.chain([first], tables):
+            writer.write_table(table, row_group_size=row_group_size)
+            rows += table.num_rows
+    return rows
+
+
+def write_arrow_frames(
+    frames: Iterable[pd.DataFrame],
+    file_path: str,
+    compression: Optional[str] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> int:
+    """
+    Write a sequence of DataFrames with the same columns as one Arrow IPC file
+
+    Args:
+        frames: DataFrames to write, in order (at least one)
+        file_path: Output path
+        compression: Codec (default: settings.ARROW_COMPRESSION)
+        cancel_token: Optional token checked between frames
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        HTTPException: If the codec is not supported
+        OperationCancelled: If the token was cancelled
+    """
+    pa = require_pyarrow()
+
+    compression = _check_codec(compression or settings.ARROW_COMPRESSION, ARROW_COMPRESSIONS)
+    batch_rows = max(1, settings.EXPORT_CHUNK_ROWS)
+
+    tables = _iter_tables(frames, cancel_token)
+    first = next(tables)
+    rows = 0
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(file_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, first.schema, options=options) as writer:
+            for table in itertools.chain([first], tables):
+                writer.write_table(table, max_chunksize=batch_rows)
+                rows += table.num_rows
+    return rows
+
+
+def is_arrow_lossless(df: pd.DataFrame) -> bool:
+    """
+    Check whether a DataFrame survives an Arrow round trip unchanged
+
+    Object columns must hold only strings (or booleans) and nulls; mixed
+    columns would be written as strings and numeric object columns would
+    come back with a numeric dtype. Column names must be strings and the
+    index the default RangeIndex, which Arrow files do not store.
+    """
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        return False
+    if not all(isinstance(column, str) for column in df.columns) or df.columns.has_duplicates:
+        return False
+    return all(
+        pd.api.types.infer_dtype(df[column], skipna=True) in ('string', 'empty', 'boolean')
+        for column in df.columns
+        if pd.api.types.is_object_dtype(df[column])
+    )
+
+
+def _iter_tables(
+    frames: Iterable[pd.DataFrame],
+    cancel_token: Optional[CancellationToken] = None,
+    metadata: Optional[Dict[str, str]] = None
+) -> Iterator[Any]:
+    """
+    Convert frames to Arrow tables that all share the first frame's schema
+
+    Columns that are entirely missing in the first frame would get Arrow's
+    null type and reject later values, so they are typed as strings.
+
+    Raises:
+        ValueError: If there are no frames
+        OperationCancelled: If the token was cancelled
+    """
+    pa = require_pyarrow()
+
+    schema = None
+    for frame in frames:
+        if cancel_token is not None:
+            cancel_token.check()
+        if schema is not None:
+            yield _to_table(frame, schema)
+            continue
+
+        table = _to_table(frame)
+        schema = pa.schema(
+            [field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema],
+            metadata={**(table.schema.metadata or {}), **{
+                key.encode('utf-8'): value.encode('utf-8') for key, value in (metadata or {}).items()
+            }}
+        )
+        yield table.cast(schema)
+
+    if schema is None:
+        raise ValueError("No data to write")
+
+
+def _to_table(df: pd.DataFrame, schema=None):
+    """
+    Convert DataFrame to an Arrow table
+
+    Arrow columns have a single type, so object columns that mix types (e.g.
+    numbers and text from a spreadsheet) are written as strings. Column
+    names must be strings as well. A given schema is applied as is (the
+    columns must match it).
+    """
+    pa = require_pyarrow()
+
+    mixed = [
+        column for column in df.columns
+        if pd.api.types.is_object_dtype(df[column])
+        and pd.api.types.infer_dtype(df[column], skipna=True).startswith('mixed')
+    ]
+    renamed = not all(isinstance(column, str) for column in df.columns)
+    if mixed or renamed:
+        # Shallow copy: only the converted columns get new data
+        df = df.copy(deep=False)
+        for column in mixed:
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+        if renamed:
+            df.columns = [str(column) for column in df.columns]
+
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _check_codec(codec: str, allowed: tuple) -> Optional[str]:
+    """Validate a compression codec ("none" means uncompressed)"""
+    codec = codec.lower()
+    if codec not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported compression: {codec}. Allowed: {', '.join(allowed)}"
+        )
+    return None if codec == 'none' else codec
@@ -0,0 +1,157 @@
+"""
+Compressed Uploads
+==================
+Streaming decompression of gzip, bz2, zstd and zip uploads.
+
+Compressed files are decompressed on the fly while the parser reads them;
+no expanded copy is written to disk. Every decompressed stream is capped at
+settings.MAX_DECOMPRESSED_SIZE so a small archive cannot expand without
+bound (zip bomb).
+
+zstd support requires the optional zstandard package.
+"""
+
+import bz2
+import gzip
+import io
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+
+# Compression suffix -> codec
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.zst': 'zstd',
+    '.zip': 'zip',
+}
+
+# Read buffer for decompressed streams
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+
+def split_compression(filename: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a compression suffix off a filename
+
+    Only suffixes listed in settings.ALLOWED_COMPRESSIONS are recognized.
+
+    Args:
+        filename: File name, e.g. "data.csv.gz"
+
+    Returns:
+        Tuple of (inner filename, codec), e.g. ("data.csv", "gzip"), or
+        (filename, None) if the file is not compressed
+    """
+    suffix = Path(filename).suffix.lower()
+    codec = COMPRESSION_EXTENSIONS.get(suffix)
+    if codec is None or suffix.lstrip('.') not in settings.allowed_compressions_list:
+        return filename, None
+    return filename[:-len(suffix)], codec
+
+
+def open_decompressed(source: Union[str, BinaryIO], codec: Optional[str] = None) -> BinaryIO:
+    """
+    Open a size-limited, decompressing stream
+
+    Args:
+        source: Path or binary file object
+        codec: "gzip", "bz2", "zstd", or None for data that is already
+            decompressed (e.g. a zip member)
+
+    Returns:
+        Buffered binary stream of the decompressed data
+
+    Raises:
+        HTTPException: If the codec is unknown or its library is missing
+    """
+    if codec == 'gzip':
+        stream = gzip.open(source, 'rb')
+    elif codec == 'bz2':
+        stream = bz2.open(source, 'rb')
+    elif codec == 'zstd':
+        zstandard = _require_zstandard()
+        raw = open(source, 'rb') if isinstance(source, str) else source
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    elif codec is None:
+        stream = open(source, 'rb') if isinstance(source, str) else source
+    else:
+        raise HTTPException(status_code=400, detail=f"Unsupported compression: {codec}")
+
+    return io.BufferedReader(
+        _LimitedReader(stream, settings.MAX_DECOMPRESSED_SIZE),
+        buffer_size=STREAM_BUFFER_SIZE
+    )
+
+
+def zip_members(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """
+    List the data files in a zip archive
+
+    Directories, hidden files and macOS resource forks are skipped, as are
+    files whose type is not allowed for upload.
+
+    Args:
+        archive: Open zip archive
+
+    Returns:
+        Members in archive order
+    """
+    members = []
+    for info in archive.infolist():
+        path = PurePosixPath(info.filename)
+        if info.is_dir() or path.parts[0] == '__MACOSX' or path.name.startswith('.'):
+            continue
+        inner_name, codec = split_compression(path.name)
+        if codec == 'zip':
+            continue
+        if Path(inner_name).suffix.lower().lstrip('.') in settings.allowed_extensions_list:
+            members.append(info)
+    return members
+
+
+def _require_zstandard():
+    """Import zstandard or fail with 501"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise HTTPException(
+            status_code=501,
+            detail="zstd uploads require zstandard (pip install zstandard)"
+        )
+
+
+class _LimitedReader(io.RawIOBase):
+    """
+    Raw stream that fails once more than `limit` bytes have been read.
+    """
+
+    def __init__(self, stream: BinaryIO, limit: int):
+        self._stream = stream
+        self._limit = limit
+        self._read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        self._read += len(data)
+        if self._read > self._limit:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Decompressed upload exceeds {self._limit} bytes"
+            )
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stream.close()
+        super().close()
@@ -0,0 +1,188 @@
+"""
+Concurrent Store
+================
+Thread-safe key-value store with lock striping and single-flight loading.
+
+Datasets are read and written from the event loop and from worker threads
+at the same time, and the UI often fires several requests for the same
+file ID at once (analysis, preview, export). A ConcurrentStore:
+
+- splits its keys over settings.DATASET_STORE_STRIPES stripes, each with
+  its own lock, so writers to different keys rarely contend and no single
+  lock serializes the whole store; reads of a single key take no lock
+- loads each missing key once: the first caller of get_or_load() runs the
+  loader, concurrent callers for the same key wait for its result (or its
+  exception) instead of repeating the work
+
+A key that is set or removed while it is being loaded keeps the newer
+state: the loader's result is returned to its callers but not stored.
+"""
+
+import threading
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from app.config import settings
+
+
+_MISSING = object()
+
+
+class _Flight:
+    """One in-progress load that concurrent callers wait for"""
+
+    __slots__ = ('done', 'value', 'error', 'stale')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.stale = False
+
+
+class ConcurrentStore:
+    """
+    Dict-like store safe for concurrent use, with single-flight loading.
+    """
+
+    def __init__(self, stripes: int = None):
+        """
+        Initialize store
+
+        Args:
+            stripes: Number of independently locked stripes
+                (default: settings.DATASET_STORE_STRIPES)
+        """
+        count = max(1, stripes or settings.DATASET_STORE_STRIPES)
+        self._locks = [threading.Lock() for _ in range(count)]
+        self._data: List[dict] = [{} for _ in range(count)]
+        self._flights: List[dict] = [{} for _ in range(count)]
+
+    def _stripe(self, key: Hashable) -> int:
+        return hash(key) % len(self._locks)
+
+    # ------------------------------------------------------------------
+    # Dict interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Value of a key, or default"""
+        # A single dict lookup is atomic; writers hold the stripe lock
+        return self._data[self._stripe(key)].get(key, default)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data[self._stripe(key)]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        index = self._stripe(key)
+        with self._locks[index]:
+            self._data[index][key] = value
+            self._invalidate(index, key)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value, or default"""
+        index = self._stripe(key)
+        with self._locks[index]:
+            self._invalidate(index, key)
+            return self._data[index].pop(key, default)
+
+    def __len__(self) -> int:
+        return sum(len(data) for data in self._data)
+
+    def keys(self) -> List[Hashable]:
+        """Snapshot of the keys"""
+        return [key for key, _ in self.items()]
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of the (key, value) pairs, one stripe at a time"""
+        items = []
+        for lock, data in zip(self._locks, self._data):
+            with lock:
+                items.extend(data.items())
+        return items
+
+    # ------------------------------------------------------------------
+    # Single-flight loading
+    # ------------------------------------------------------------------
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Get a key's value, loading and storing it once if it is missing
+
+        Args:
+            key: Key
+            loader: Called without arguments to produce the value; runs
+                without any lock held
+
+        Returns:
+            Stored or loaded value
+
+        Raises:
+            Exception: Whatever the loader raised (in every waiting caller)
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value, _ = self._fly(key, loader, store=True)
+        return value
+
+    def single_flight(self, key: Hashable, loader: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run a loader once for concurrent callers of the same key, without storing its result
+
+        Args:
+            key: Key
+            loader: Called without arguments; runs without any lock held
+
+        Returns:
+            Tuple of (result, True if this caller ran the loader)
+
+        Raises:
+            Exception: Whatever the loader raised (in every waiting caller)
+        """
+        return self._fly(key, loader, store=False)
+
+    def _fly(self, key: Hashable, loader: Callable[[], Any], store: bool) -> Tuple[Any, bool]:
+        index = self._stripe(key)
+        lock = self._locks[index]
+        with lock:
+            if store:
+                value = self._data[index].get(key, _MISSING)
+                if value is not _MISSING:
+                    return value, False
+            flight = self._flights[index].get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[index][key] = flight
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, False
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with lock:
+                if self._flights[index].get(key) is flight:
+                    del self._flights[index][key]
+                if store and flight.error is None and not flight.stale:
+                    self._data[index][key] = flight.value
+            flight.done.set()
+        return flight.value, True
+
+    def _invalidate(self, index: int, key: Hashable) -> None:
+        """Keep an in-progress load of key from overwriting a newer change (stripe lock held)"""
+        flight = self._flights[index].pop(key, None)
+        if flight is not None:
+            flight.stale = True
@@ -0,0 +1,194 @@
+"""
+CSV Dialect Detection
+=====================
+Infers encoding, delimiter, quote character and header row of a CSV file
+from samples of its bytes.
+
+Government exports are often cp1252/latin-1 with ";" delimiters and a few
+title lines above the table. pd.read_csv() with its defaults either fails
+partway through such a file (UnicodeDecodeError) or reads each line as a
+single column. Detection reads only small samples (the first
+settings.CSV_SNIFF_BYTES, plus samples from the middle and end when the
+file is on disk), so the parser is configured once instead of retrying
+full parses.
+"""
+
+import codecs
+import csv
+import io
+import os
+from collections import Counter
+from typing import Any, BinaryIO, Dict, List, Tuple, Union
+
+from app.config import settings
+
+
+CANDIDATE_DELIMITERS = (',', ';', '\t', '|')
+
+# Max lines of the sample used to score delimiters
+SNIFF_LINES = 200
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Bytes cp1252 leaves undefined; text containing them is decoded as latin-1
+_CP1252_UNDEFINED = frozenset(b'\x81\x8d\x8f\x90\x9d')
+
+
+def detect_csv_dialect(source: Union[str, BinaryIO]) -> Dict[str, Any]:
+    """
+    Detect how a CSV file is encoded and laid out
+
+    Args:
+        source: Path to file, or a buffered binary stream (sampled with
+            peek(), so nothing is consumed)
+
+    Returns:
+        Dict with encoding, delimiter, quotechar and header_row (1-based
+        line number of the header)
+    """
+    head, samples = _read_samples(source)
+
+    encoding = _detect_encoding(head, samples)
+    text = _decode_sample(head, encoding)
+
+    # Ignore the last line; the sample probably cut it off
+    lines = text.splitlines()
+    if len(lines) > 1 and not text.endswith(('\n', '\r')):
+        lines = lines[:-1]
+    lines = lines[:SNIFF_LINES]
+
+    quotechar = _detect_quotechar(text)
+    delimiter, field_count = _detect_delimiter(lines, quotechar)
+    header_row = _detect_header_row(lines, delimiter, quotechar, field_count)
+
+    return {
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'quotechar': quotechar,
+        'header_row': header_row + 1,
+    }
+
+
+def _read_samples(source: Union[str, BinaryIO]) -> Tuple[bytes, List[bytes]]:
+    """Read the head of the file, plus middle and tail samples for files on disk"""
+    size = settings.CSV_SNIFF_BYTES
+    if not isinstance(source, str):
+        return source.peek(size)[:size], []
+
+    with open(source, 'rb') as file:
+        head = file.read(size)
+        file_size = os.fstat(file.fileno()).st_size
+        samples = []
+        for offset in (file_size // 2, file_size - size):
+            if offset > size:
+                file.seek(offset)
+                samples.append(file.read(size))
+    return head, samples
+
+
+def _detect_encoding(head: bytes, samples: List[bytes]) -> str:
+    """
+    UTF-8 if every sample decodes as UTF-8, otherwise cp1252 (or latin-1
+    for bytes cp1252 does not define)
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    for index, sample in enumerate([head] + samples):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        # Samples from the middle may start inside a multi-byte character
+        if index > 0:
+            sample = sample[_skip_continuation_bytes(sample):]
+        try:
+            decoder.decode(sample, final=False)
+        except UnicodeDecodeError:
+            break
+    else:
+        return 'utf-8'
+
+    data = b''.join([head] + samples)
+    if any(byte in _CP1252_UNDEFINED for byte in data):
+        return 'latin-1'
+    return 'cp1252'
+
+
+def _skip_continuation_bytes(sample: bytes) -> int:
+    """Number of leading UTF-8 continuation bytes (at most 3)"""
+    count = 0
+    while count < min(3, len(sample)) and sample[count] & 0xC0 == 0x80:
+        count += 1
+    return count
+
+
+def _decode_sample(head: bytes, encoding: str) -> str:
+    """Decode a sample that may end in the middle of a character"""
+    return codecs.getincrementaldecoder(encoding)(errors='replace').decode(head, final=False)
+
+
+def _detect_quotechar(text: str) -> str:
+    """Double quote unless fields are visibly wrapped in single quotes"""
+    single = sum(text.count(f"{d}'") for d in CANDIDATE_DELIMITERS)
+    double = sum(text.count(f'{d}"') for d in CANDIDATE_DELIMITERS)
+    return "'" if single > double else '"'
+
+
+def _detect_delimiter(lines: List[str], quotechar: str) -> Tuple[str, int]:
+    """
+    Pick the delimiter that splits the most lines into the same number of
+    fields (more than one)
+
+    Returns:
+        Tuple of (delimiter, fields per line)
+    """
+    best = (',', 1)
+    best_score = (0.0, 0)
+    for delimiter in CANDIDATE_DELIMITERS:
+        counts = [count for count in _field_counts(lines, delimiter, quotechar) if count]
+        if not counts:
+            continue
+        field_count, frequency = Counter(counts).most_common(1)[0]
+        if field_count < 2:
+            continue
+        score = (frequency / len(counts), field_count)
+        if score > best_score:
+            best, best_score = (delimiter, field_count), score
+    return best
+
+
+def _detect_header_row(lines: List[str], delimiter: str, quotechar: str, field_count: int) -> int:
+    """
+    0-based index of the header: the first line that fills at least half of
+    the table's fields. Title lines above the table ("Laporan 2024;;;;")
+    hold one or two values.
+    """
+    minimum = max(2, (field_count + 1) // 2)
+    counts = _field_counts(lines, delimiter, quotechar, skip_trailing_empty=True)
+    for index, count in enumerate(counts):
+        if count >= minimum:
+            return index
+    return 0
+
+
+def _field_counts(
+    lines: List[str],
+    delimiter: str,
+    quotechar: str,
+    skip_trailing_empty: bool = False
+) -> List[int]:
+    """Fields per line (0 for blank lines)"""
+    counts = []
+    reader = csv.reader(io.StringIO('\n'.join(lines)), delimiter=delimiter, quotechar=quotechar)
+    try:
+        for row in reader:
+            if skip_trailing_empty:
+                while row and not row[-1].strip():
+                    row.pop()
+            counts.append(len(row))
+    except csv.Error:
+        pass
+    return counts
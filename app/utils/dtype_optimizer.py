@@ -0,0 +1,95 @@
+"""
+Dtype Optimizer
+===============
+Memory-efficient dtypes for uploaded datasets.
+
+Text columns arrive as NumPy object columns holding one Python str per cell
+(~50 bytes of overhead each), so a dataset in memory is often ten times
+the size of its file. At ingestion, text columns can be converted to:
+
+- category, when few distinct values repeat (status, province, village);
+  each value is stored once plus one small integer code per row;
+- string[pyarrow], otherwise; values are packed into one Arrow buffer.
+
+Both are opt-in (settings.INGEST_CATEGORY_MAX_RATIO and
+settings.INGEST_ARROW_STRINGS). Only columns holding nothing but strings
+and nulls are converted; mixed columns stay object. Arrow strings need
+pyarrow and are skipped without it.
+"""
+
+from typing import Optional
+
+import pandas as pd
+
+from app.config import settings
+from app.utils.columnar import pyarrow_available
+from app.utils.logger import app_logger
+
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    arrow_strings: Optional[bool] = None,
+    category_max_ratio: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Convert text columns to category or Arrow-backed strings
+
+    Args:
+        df: DataFrame to convert (modified in place)
+        arrow_strings: Convert text columns to string[pyarrow]
+            (default: settings.INGEST_ARROW_STRINGS)
+        category_max_ratio: Convert text columns whose distinct values are
+            at most this share of their non-null values to category; 0
+            disables (default: settings.INGEST_CATEGORY_MAX_RATIO)
+
+    Returns:
+        Converted DataFrame
+    """
+    if arrow_strings is None:
+        arrow_strings = settings.INGEST_ARROW_STRINGS
+    if category_max_ratio is None:
+        category_max_ratio = settings.INGEST_CATEGORY_MAX_RATIO
+    if arrow_strings and not pyarrow_available():
+        app_logger.debug("Arrow strings skipped: pyarrow is not installed")
+        arrow_strings = False
+    if not arrow_strings and category_max_ratio <= 0:
+        return df
+
+    for column in df.columns:
+        series = df[column]
+        if not _is_text_column(series):
+            continue
+
+        if category_max_ratio > 0:
+            categorical = _to_category(series, category_max_ratio)
+            if categorical is not None:
+                df[column] = categorical
+                continue
+        if arrow_strings and pd.api.types.is_object_dtype(series):
+            df[column] = series.astype(pd.StringDtype('pyarrow'))
+    return df
+
+
+def _is_text_column(series: pd.Series) -> bool:
+    """True for object or string columns holding only strings and nulls"""
+    if isinstance(series.dtype, pd.StringDtype):
+        return True
+    return (
+        pd.api.types.is_object_dtype(series)
+        and pd.api.types.infer_dtype(series, skipna=True) == 'string'
+    )
+
+
+def _to_category(series: pd.Series, max_ratio: float) -> Optional[pd.Series]:
+    """The column as category, or None if it has too many distinct values"""
+    # One hashing pass both counts the values and builds the codes
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    present = int((codes >= 0).sum())
+    if present == 0 or len(uniques) > present * max_ratio:
+        return None
+    categories = pd.Index(uniques, dtype=object)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categories),
+        index=series.index,
+        name=series.name
+    )
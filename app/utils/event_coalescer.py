@@ -0,0 +1,127 @@
+"""
+Event Coalescer
+===============
+Merges bursts of progress events into one event per time window.
+
+Long-running imports produce an event for many individual rows. Sending each
+one over SSE floods the stream and the browser, so events are aggregated:
+counters (progress, stats) keep their latest value and log lines are
+collected, then one merged event is emitted per window.
+"""
+
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Generator, List, Optional
+
+from app.config import settings
+
+
+# Keys whose presence marks an event that must be delivered right away
+FINAL_KEYS = ('failed_report_url',)
+
+
+class EventCoalescer:
+    """
+    Aggregates progress events and emits at most one event per window.
+    """
+
+    def __init__(
+        self,
+        window_ms: int = None,
+        max_recent: int = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize coalescer
+
+        Args:
+            window_ms: Minimum time between emitted events (default: settings.IMPORT_EVENT_WINDOW_MS)
+            max_recent: Size of the ring of recent log lines (default: settings.IMPORT_EVENT_RECENT_LOGS)
+            clock: Monotonic clock in seconds (injectable for tests)
+        """
+        self.window = (window_ms if window_ms is not None else settings.IMPORT_EVENT_WINDOW_MS) / 1000
+        self.max_recent = max_recent or settings.IMPORT_EVENT_RECENT_LOGS
+        self._clock = clock
+        self._last_emit = float('-inf')
+        self._pending: Dict[str, Any] = {}
+        self._pending_logs: Deque[str] = deque(maxlen=self.max_recent)
+        self._dropped = 0
+        self.recent_logs: Deque[str] = deque(maxlen=self.max_recent)
+
+    def add(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Merge an event into the pending window
+
+        Args:
+            event: Raw progress event
+
+        Returns:
+            Merged event if the window elapsed (or the event is final), else None
+        """
+        for key, value in event.items():
+            if key == 'log':
+                if len(self._pending_logs) == self._pending_logs.maxlen:
+                    self._dropped += 1
+                self._pending_logs.append(value)
+                self.recent_logs.append(value)
+            else:
+                self._pending[key] = value
+
+        if any(key in event for key in FINAL_KEYS):
+            return self.flush()
+        if self._clock() - self._last_emit >= self.window:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """
+        Emit whatever is pending
+
+        Returns:
+            Merged event, or None if nothing is pending
+        """
+        if not self._pending and not self._pending_logs:
+            return None
+
+        merged = dict(self._pending)
+        if self._pending_logs:
+            merged['logs'] = list(self._pending_logs)
+        if self._dropped:
+            merged['logs_dropped'] = self._dropped
+
+        self._pending = {}
+        self._pending_logs.clear()
+        self._dropped = 0
+        self._last_emit = self._clock()
+        return merged
+
+    def snapshot(self) -> List[str]:
+        """Get the most recent log lines (oldest first)"""
+        return list(self.recent_logs)
+
+
+def coalesce_events(
+    events: Iterable[Dict[str, Any]],
+    window_ms: int = None,
+    max_recent: int = None
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    Coalesce an event stream
+
+    Args:
+        events: Raw progress events
+        window_ms: Minimum time between emitted events
+        max_recent: Maximum log lines carried per emitted event
+
+    Yields:
+        Merged events
+    """
+    coalescer = EventCoalescer(window_ms=window_ms, max_recent=max_recent)
+    for event in events:
+        merged = coalescer.add(event)
+        if merged is not None:
+            yield merged
+
+    merged = coalescer.flush()
+    if merged is not None:
+        yield merged
@@ -0,0 +1,358 @@
+"""
+Excel Reader
+============
+Streaming Excel ingestion with sheet selection and header detection.
+
+pd.read_excel() builds every cell of the sheet as an openpyxl Cell object,
+converts it, keeps the whole sheet as a list of rows and then parses that
+again. For large workbooks this takes minutes and several times the file
+size in memory. This reader instead:
+
+- uses python-calamine (Rust) when it is installed, otherwise iterates
+  openpyxl read-only rows as plain values, keeping only the requested
+  columns, column by column;
+- detects the header row when titles or notes sit above the table;
+- reads several sheets in parallel, one dataset per sheet.
+
+.xls files (at most 65,536 rows) are still read through pandas/xlrd.
+"""
+
+import io
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+from fastapi import HTTPException
+
+from app.config import settings
+
+
+EXCEL_EXTENSIONS = ('.xls', '.xlsx')
+
+ALL_SHEETS = '*'
+
+
+def read_excel_sheets(
+    source: Union[str, BinaryIO],
+    filename: str,
+    sheets: Optional[List[str]] = None,
+    header_row: Optional[int] = None,
+    columns: Optional[List[str]] = None
+) -> List[Tuple[str, pd.DataFrame]]:
+    """
+    Read one or more sheets of a workbook
+
+    Args:
+        source: Path to workbook, or a binary file object
+        filename: Original filename (.xls or .xlsx)
+        sheets: Sheet names or 0-based indexes, or ["*"] for all sheets
+            (default: first sheet)
+        header_row: 1-based row number of the header (default: detected)
+        columns: Optional subset of columns to load
+
+    Returns:
+        List of (sheet_name, dataframe), in the requested order
+
+    Raises:
+        HTTPException: If a requested sheet does not exist
+        ValueError: If a requested column does not exist
+    """
+    # Each sheet is read by its own reader, so a stream is shared as bytes
+    if not isinstance(source, str):
+        source = source.read()
+
+    legacy = Path(filename).suffix.lower() == '.xls'
+    sheet_names = _resolve_sheets(list_sheets(source, legacy), sheets)
+    header = header_row - 1 if header_row else None
+
+    def read(sheet_name: str) -> Tuple[str, pd.DataFrame]:
+        if legacy:
+            return sheet_name, _read_xls_sheet(source, sheet_name, header, columns)
+        return sheet_name, _read_xlsx_sheet(source, sheet_name, header, columns)
+
+    if len(sheet_names) == 1:
+        return [read(sheet_names[0])]
+
+    workers = max(1, min(settings.EXCEL_SHEET_WORKERS, len(sheet_names)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="excel") as pool:
+        return list(pool.map(read, sheet_names))
+
+
+def list_sheets(source: Union[str, bytes], legacy: bool = False) -> List[str]:
+    """
+    Get the sheet names of a workbook
+
+    Args:
+        source: Path to workbook or its bytes
+        legacy: True for .xls workbooks
+
+    Returns:
+        Sheet names in workbook order
+    """
+    if legacy:
+        with pd.ExcelFile(_as_file(source), engine='xlrd') as workbook:
+            return list(workbook.sheet_names)
+
+    calamine = _try_calamine()
+    if calamine is not None:
+        return list(_open_calamine(calamine, source).sheet_names)
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(_as_file(source), read_only=True, data_only=True, keep_links=False)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def detect_header_row(rows: Sequence[Sequence[Any]]) -> int:
+    """
+    Find the header row among the first rows of a sheet
+
+    Rows above the table (titles such as "Data Pendamping 2024", notes,
+    blank rows) fill clearly fewer cells than the table's widest rows. The
+    header is the first row filling more than half of that width; like
+    pd.read_excel(), any row can be the header, whatever its values.
+
+    Args:
+        rows: First rows of the sheet (empty cells as None)
+
+    Returns:
+        0-based index of the header row (0 if no row qualifies)
+    """
+    counts = [sum(1 for value in row if not _is_empty(value)) for row in rows]
+    width = max(counts, default=0)
+    for index, count in enumerate(counts):
+        if count * 2 > width:
+            return index
+    return 0
+
+
+def _read_xlsx_sheet(
+    source: Union[str, bytes],
+    sheet_name: str,
+    header_row: Optional[int],
+    columns: Optional[List[str]]
+) -> pd.DataFrame:
+    """Read one .xlsx sheet row by row into a DataFrame"""
+    calamine = _try_calamine()
+    if calamine is not None:
+        rows = _iter_calamine_rows(calamine, source, sheet_name)
+        return _match_pandas_types(_rows_to_dataframe(rows, sheet_name, header_row, columns))
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(_as_file(source), read_only=True, data_only=True, keep_links=False)
+    try:
+        worksheet = workbook[sheet_name]
+        # Dimension metadata written by some tools is wrong; read to the real end
+        worksheet.reset_dimensions()
+        rows = worksheet.iter_rows(values_only=True)
+        return _rows_to_dataframe(rows, sheet_name, header_row, columns)
+    finally:
+        workbook.close()
+
+
+def _read_xls_sheet(
+    source: Union[str, bytes],
+    sheet_name: str,
+    header_row: Optional[int],
+    columns: Optional[List[str]]
+) -> pd.DataFrame:
+    """Read one legacy .xls sheet through pandas/xlrd"""
+    if header_row is None:
+        head = pd.read_excel(
+            _as_file(source), sheet_name=sheet_name, header=None,
+            nrows=settings.EXCEL_HEADER_SCAN_ROWS, engine='xlrd'
+        )
+        rows = head.astype(object).where(head.notna(), None).values.tolist()
+        header_row = detect_header_row(rows)
+    return pd.read_excel(
+        _as_file(source), sheet_name=sheet_name, header=header_row, usecols=columns, engine='xlrd'
+    )
+
+
+def _rows_to_dataframe(
+    rows: Iterator[Sequence[Any]],
+    sheet_name: str,
+    header_row: Optional[int],
+    columns: Optional[List[str]]
+) -> pd.DataFrame:
+    """
+    Build a DataFrame from an iterator of row values
+
+    Only the requested columns are kept, and values are collected per
+    column, so memory is the size of the result rather than of the sheet.
+    """
+    rows = iter(rows)
+
+    # Buffer the rows needed to find the header
+    scan_rows = header_row + 1 if header_row is not None else settings.EXCEL_HEADER_SCAN_ROWS
+    head = []
+    for row in rows:
+        head.append(row)
+        if len(head) >= scan_rows:
+            break
+    if header_row is None:
+        header_row = detect_header_row(head)
+    if header_row >= len(head):
+        return pd.DataFrame()
+
+    names = _column_names(head[header_row])
+    labels = [str(name) for name in names]
+    if columns:
+        missing = [column for column in columns if str(column) not in labels]
+        if missing:
+            raise ValueError(f"Columns not found in sheet '{sheet_name}': {', '.join(map(str, missing))}")
+        positions = [labels.index(str(column)) for column in columns]
+    else:
+        positions = list(range(len(names)))
+
+    values: List[List[Any]] = [[] for _ in positions]
+    last_filled = 0
+    row_count = 0
+    for row in itertools.chain(head[header_row + 1:], rows):
+        width = len(row)
+        if not columns and width > len(positions):
+            # Data beyond the last header cell gets a generated name, like pandas
+            extra = max(
+                (position + 1 for position in range(len(positions), width) if not _is_blank(row[position])),
+                default=0
+            )
+            for position in range(len(positions), extra):
+                positions.append(position)
+                values.append([None] * row_count)
+        filled = False
+        for column_values, position in zip(values, positions):
+            value = row[position] if position < width else None
+            if _is_blank(value):
+                value = None
+            else:
+                filled = True
+            column_values.append(value)
+        row_count += 1
+        if filled:
+            last_filled = row_count
+
+    if not columns:
+        names = _column_names(head[header_row], len(positions))
+
+    # Formatted but empty rows at the end of a sheet are not data
+    data = {names[position]: column_values[:last_filled] for position, column_values in zip(positions, values)}
+    return pd.DataFrame(data, columns=[names[position] for position in positions])
+
+
+def _match_pandas_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert calamine values to the types pd.read_excel() produces
+
+    Excel stores every number as a float and calamine returns dates as
+    datetime.date; pandas turns whole numbers into int and dates into
+    datetime64, and the rest of the app expects that.
+    """
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_float_dtype(series):
+            if not series.isna().any() and (series % 1 == 0).all() and (series.abs() < 2 ** 63).all():
+                df[column] = series.astype('int64')
+        elif pd.api.types.is_object_dtype(series):
+            if pd.api.types.infer_dtype(series, skipna=True) in ('date', 'datetime'):
+                df[column] = pd.to_datetime(series)
+    return df
+
+
+def _column_names(header: Sequence[Any], width: int = 0) -> List[Any]:
+    """
+    Header values as unique column names, named like pandas does
+
+    Blank header cells become "Unnamed: <index>"; numeric labels stay
+    numbers. Trailing blank cells are dropped unless width asks for them.
+    """
+    cells = list(header)
+    while cells and _is_empty(cells[-1]):
+        cells.pop()
+    cells.extend([None] * (width - len(cells)))
+
+    names = []
+    seen: Dict[str, int] = {}
+    for index, value in enumerate(cells):
+        if _is_empty(value):
+            name = f"Unnamed: {index}"
+        elif isinstance(value, str):
+            name = value.strip()
+        elif isinstance(value, float) and value.is_integer():
+            # Excel stores every number as a float; pandas reads whole ones as int
+            name = int(value)
+        else:
+            name = value
+        key = str(name)
+        if key in seen:
+            seen[key] += 1
+            name = f"{key}.{seen[key]}"
+        else:
+            seen[key] = 0
+        names.append(name)
+    return names
+
+
+def _resolve_sheets(available: List[str], requested: Optional[List[str]]) -> List[str]:
+    """Map requested sheet names/indexes to sheet names"""
+    if not available:
+        raise HTTPException(status_code=400, detail="Workbook has no sheets")
+    if not requested:
+        return available[:1]
+    if ALL_SHEETS in requested:
+        return available
+
+    resolved = []
+    for sheet in requested:
+        if sheet in available:
+            name = sheet
+        elif sheet.isdigit() and int(sheet) < len(available):
+            name = available[int(sheet)]
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Sheet not found: {sheet}. Available: {', '.join(available)}"
+            )
+        if name not in resolved:
+            resolved.append(name)
+    return resolved
+
+
+def _try_calamine():
+    """Import python-calamine if it is installed"""
+    try:
+        import python_calamine
+        return python_calamine
+    except ImportError:
+        return None
+
+
+def _open_calamine(calamine, source: Union[str, bytes]):
+    if isinstance(source, str):
+        return calamine.CalamineWorkbook.from_path(source)
+    return calamine.CalamineWorkbook.from_filelike(io.BytesIO(source))
+
+
+def _iter_calamine_rows(calamine, source: Union[str, bytes], sheet_name: str) -> Iterator[List[Any]]:
+    """Rows of a sheet via python-calamine (empty cells come back as "")"""
+    workbook = _open_calamine(calamine, source)
+    return iter(workbook.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False))
+
+
+def _as_file(source: Union[str, bytes]) -> Union[str, BinaryIO]:
+    """A fresh reader per use, so threads never share a file position"""
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _is_blank(value: Any) -> bool:
+    """Missing cell value (whitespace-only text is kept as data)"""
+    return value is None or value == ''
@@ -0,0 +1,161 @@
+"""
+Blocking Work Executor
+======================
+Runs CPU-bound / blocking operations off the asyncio event loop.
+
+Routes are `async def`, but pandas, openpyxl and SQLAlchemy calls are
+synchronous. Calling them directly stalls the event loop, so a single large
+normalization blocks /health and every other request. run_blocking()
+dispatches such calls to a bounded thread pool, with a per-operation
+concurrency limit so one kind of heavy work cannot take all workers.
+
+A thread pool (not a process pool) is used on purpose: datasets live in the
+in-process store and pandas releases the GIL for most heavy operations, so
+pickling whole DataFrames to worker processes would cost more than it saves.
+
+Work in the pool cannot be interrupted from outside, so long operations take
+a CancellationToken and check it between chunks. run_cancellable() and
+iterate_in_worker() cancel that token when the HTTP client disconnects.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, TypeVar
+
+from fastapi import Request
+
+from app.config import settings
+from app.utils.cancellation import CLIENT_DISCONNECTED, CancellationToken
+
+
+T = TypeVar('T')
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.WORKER_THREADS,
+    thread_name_prefix="blocking-worker"
+)
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _get_semaphore(operation: str) -> asyncio.Semaphore:
+    """Get (or lazily create) the concurrency limiter for an operation"""
+    semaphore = _semaphores.get(operation)
+    if semaphore is None:
+        limit = settings.operation_limits.get(operation, settings.WORKER_THREADS)
+        semaphore = _semaphores.setdefault(operation, asyncio.Semaphore(max(1, limit)))
+    return semaphore
+
+
+async def run_blocking(operation: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function in the worker pool
+
+    Args:
+        operation: Operation name used for the concurrency limit
+            (e.g. "normalize", "analyze", "export", "upload", "database", "import")
+        func: Blocking function to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Result of func
+    """
+    async with _get_semaphore(operation):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_cancellable(
+    operation: str,
+    request: Request,
+    cancel_token: CancellationToken,
+    func: Callable[..., T],
+    *args: Any,
+    **kwargs: Any
+) -> T:
+    """
+    Run a blocking function in the worker pool, cancelling the token when
+    the client disconnects
+
+    func must accept the token (pass it in args/kwargs) and check it
+    between units of work.
+
+    Args:
+        operation: Operation name used for the concurrency limit
+        request: Incoming request to watch for disconnects
+        cancel_token: Token cancelled on disconnect
+        func: Blocking function to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Result of func
+    """
+    async def watch_disconnect() -> None:
+        while not cancel_token.cancelled:
+            if await request.is_disconnected():
+                cancel_token.cancel(CLIENT_DISCONNECTED)
+                return
+            await asyncio.sleep(settings.DISCONNECT_POLL_INTERVAL)
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        return await run_blocking(operation, func, *args, **kwargs)
+    finally:
+        watcher.cancel()
+
+
+async def iterate_in_worker(
+    operation: str,
+    iterator: Iterator[T],
+    cancel_token: CancellationToken
+) -> AsyncIterator[T]:
+    """
+    Advance a blocking iterator in the worker pool and yield its items
+
+    Used for streaming responses. Each item is produced by its own
+    run_blocking() call, so the operation's concurrency slot and a pool
+    thread are held only while an item is being produced, never while a
+    slow client is reading; the iterator runs at most one item ahead.
+
+    When the client disconnects, the response stops consuming this
+    generator and the token is cancelled; the iterator is then closed in
+    the pool, running its cleanup.
+
+    Args:
+        operation: Operation name used for the concurrency limit
+        iterator: Blocking iterator (e.g. a generator of SSE chunks)
+        cancel_token: Token cancelled when the consumer goes away
+
+    Yields:
+        Items of iterator
+    """
+    loop = asyncio.get_running_loop()
+    done = object()
+    pending: Optional[asyncio.Future] = None
+    finished = False
+    try:
+        while True:
+            pending = asyncio.ensure_future(run_blocking(operation, next, iterator, done))
+            # Shielded: a disconnect must not abandon an item mid-production
+            item = await asyncio.shield(pending)
+            pending = None
+            if item is done:
+                finished = True
+                break
+            yield item
+    finally:
+        if not finished:
+            cancel_token.cancel(CLIENT_DISCONNECTED)
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            if pending is not None:
+                # A generator cannot be closed while it is running
+                await asyncio.wait([pending])
+            await loop.run_in_executor(_executor, close)
+
+
+def shutdown_executor() -> None:
+    """Stop the worker pool (pending calls are cancelled)"""
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,219 @@
+"""
+File Downloads
+==============
+Conditional and ranged responses for exported files.
+
+Exports can be several GB, so downloads support:
+
+- Strong ETags derived from the file version (inode, size, mtime) and
+  If-None-Match, so an unchanged file is answered with 304.
+- Single byte ranges (Range / If-Range), so interrupted downloads resume
+  where they stopped instead of restarting from zero.
+- Pre-compressed variants: when "<file>.gz" exists next to the file and the
+  client accepts gzip, it is sent with Content-Encoding: gzip.
+"""
+
+import os
+import stat
+from email.utils import formatdate
+from typing import Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+
+# Bytes read per chunk when sending a range
+RANGE_CHUNK_SIZE = 64 * 1024
+
+PRECOMPRESSED_SUFFIX = '.gz'
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header lies entirely outside the file"""
+
+
+def file_download_response(
+    request: Request,
+    file_path: str,
+    download_name: Optional[str] = None,
+    media_type: str = 'application/octet-stream'
+) -> Response:
+    """
+    Build the response for a file download
+
+    Args:
+        request: Incoming request (conditional, range and encoding headers)
+        file_path: Path to the file
+        download_name: Filename for Content-Disposition (default: file name)
+        media_type: Content type of the (uncompressed) file
+
+    Returns:
+        200 with the whole file, 206 with a byte range, 304 when the
+        client's copy is current, or 416 for an unsatisfiable range
+
+    Raises:
+        HTTPException: If the file does not exist
+    """
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail=f"File not found: {os.path.basename(file_path)}")
+
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': content_disposition(download_name or os.path.basename(file_path)),
+    }
+
+    # Prefer the pre-compressed variant if it is at least as new as the file
+    encoding = None
+    gz_path = file_path + PRECOMPRESSED_SUFFIX
+    try:
+        gz_stat = os.stat(gz_path)
+    except FileNotFoundError:
+        gz_stat = None
+    if gz_stat is not None and gz_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+        headers['Vary'] = 'Accept-Encoding'
+        if accepts_gzip(request.headers.get('accept-encoding', '')):
+            file_path, stat_result, encoding = gz_path, gz_stat, 'gzip'
+            headers['Content-Encoding'] = 'gzip'
+
+    etag = make_etag(stat_result, encoding)
+    headers['ETag'] = etag
+    headers['Last-Modified'] = formatdate(stat_result.st_mtime, usegmt=True)
+
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = stat_result.st_size
+    range_header = request.headers.get('range')
+    if_range = request.headers.get('if-range')
+    # If-Range with a different validator means "the file changed, send it all"
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            headers['Content-Range'] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+            headers['Content-Length'] = str(end - start + 1)
+            if request.method == 'HEAD':
+                return Response(status_code=206, headers=headers, media_type=media_type)
+            return StreamingResponse(
+                iter_file_range(file_path, start, end),
+                status_code=206,
+                headers=headers,
+                media_type=media_type
+            )
+
+    return FileResponse(file_path, headers=headers, media_type=media_type, stat_result=stat_result)
+
+
+def make_etag(stat_result: os.stat_result, encoding: Optional[str] = None) -> str:
+    """
+    Build a strong ETag from the file version
+
+    Exported files are never rewritten in place (they are written under a
+    new name and renamed), so inode, size and mtime identify the content.
+    Each content encoding is a different representation and gets its own tag.
+    """
+    etag = f"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+    if encoding:
+        etag = f"{etag}-{encoding}"
+    return f'"{etag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(','))
+    return any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Check whether an Accept-Encoding header allows gzip"""
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        if name.strip().lower() not in ('gzip', '*'):
+            continue
+        quality = params.strip().lower()
+        if quality.startswith('q='):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range
+
+    Args:
+        range_header: Range header value, e.g. "bytes=100-", "bytes=0-99"
+            or "bytes=-500"
+        size: File size in bytes
+
+    Returns:
+        Inclusive (start, end), or None when the header should be ignored
+        (malformed, not bytes, or multiple ranges) and the whole file sent
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the file
+    """
+    unit, _, spec = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            suffix_length = int(last)
+            if suffix_length == 0:
+                raise RangeNotSatisfiable(range_header)
+            start = max(size - suffix_length, 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    if start < 0 or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def iter_file_range(file_path: str, start: int, end: int) -> Iterator[bytes]:
+    """Read bytes start..end (inclusive) of a file in chunks"""
+    remaining = end - start + 1
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        while remaining > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def content_disposition(filename: str) -> str:
+    """Build an attachment Content-Disposition header (RFC 5987 for non-ASCII names)"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
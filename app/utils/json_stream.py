@@ -0,0 +1,149 @@
+"""
+Streaming JSON Reader
+=====================
+Incremental parser for large top-level JSON arrays.
+
+Uploaded pendampingan exports are a single JSON array that can be hundreds
+of MB. Instead of json.loads() on the whole body, JsonArrayReader pulls the
+file in chunks and yields one element at a time, so memory stays bounded by
+the chunk size plus the largest single record
+(settings.JSON_STREAM_MAX_RECORD_BYTES).
+"""
+
+import codecs
+import json
+from typing import Any, BinaryIO, Generator
+
+from app.config import settings
+
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+class JsonArrayReader:
+    """
+    Iterates over the elements of a top-level JSON array in a binary stream.
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        chunk_size: int = None,
+        encoding: str = 'utf-8-sig',
+        max_record_bytes: int = None
+    ):
+        """
+        Initialize reader
+
+        Args:
+            stream: Binary file-like object positioned at the start of the JSON
+            chunk_size: Bytes to read per chunk (default: settings.JSON_STREAM_CHUNK_SIZE)
+            encoding: Text encoding of the stream (utf-8-sig also accepts plain UTF-8)
+            max_record_bytes: Largest single element, 0 for no limit
+                (default: settings.JSON_STREAM_MAX_RECORD_BYTES)
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size or settings.JSON_STREAM_CHUNK_SIZE
+        self.max_record_bytes = (
+            max_record_bytes if max_record_bytes is not None else settings.JSON_STREAM_MAX_RECORD_BYTES
+        )
+        self.bytes_read = 0
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder(encoding)()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self) -> Generator[Any, None, None]:
+        self._skip_whitespace()
+        if self._peek() != '[':
+            raise ValueError('JSON must be a list')
+        self._pos += 1
+
+        self._skip_whitespace()
+        if self._peek() == ']':
+            return
+
+        while True:
+            yield self._read_value()
+
+            self._skip_whitespace()
+            char = self._peek()
+            if char == ',':
+                self._pos += 1
+                continue
+            if char == ']':
+                return
+            raise ValueError(self._error("Expected ',' or ']'"))
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _fill(self) -> bool:
+        """Read one more chunk into the buffer; False at end of stream"""
+        if self._eof:
+            return False
+
+        chunk = self.stream.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self._eof = True
+            self._buffer += self._text_decoder.decode(b'', final=True)
+            return False
+
+        # Drop consumed text so the buffer does not grow with the file
+        self._buffer = self._buffer[self._pos:] + self._text_decoder.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while self._pos >= len(self._buffer):
+            if not self._fill():
+                raise ValueError(self._error('Unexpected end of JSON'))
+        return self._buffer[self._pos]
+
+    def _skip_whitespace(self) -> None:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def _read_value(self) -> Any:
+        self._skip_whitespace()
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Probably a record split across chunks; read more and retry,
+                # but never buffer the rest of the file for a malformed value
+                self._check_record_size()
+                if self._fill():
+                    continue
+                raise
+
+            # A number is only complete once a delimiter follows it; "1.5e"
+            # may still continue as "1.5e10" in the next chunk
+            if isinstance(value, (int, float)) and not self._eof:
+                rest = self._buffer[end:end + 1]
+                if not rest or rest not in _DELIMITERS:
+                    self._check_record_size()
+                    if self._fill():
+                        continue
+
+            self._pos = end
+            return value
+
+    def _check_record_size(self) -> None:
+        """Raise if the value being read already exceeds max_record_bytes"""
+        # Buffered text is measured in characters, which is bytes for ASCII
+        if self.max_record_bytes and len(self._buffer) - self._pos > self.max_record_bytes:
+            raise ValueError(self._error(
+                f'JSON record larger than {self.max_record_bytes} bytes (malformed or unterminated value?)'
+            ))
+
+    def _error(self, message: str) -> str:
+        return f"{message} near byte {self.bytes_read}"
@@ -2,49 +2,117 @@
 Logging Configuration
 =====================
 Centralized logging setup for the application.
+
+By default records are handed to a QueueHandler and written by a background
+QueueListener thread, so console/file I/O never runs on the request thread.
+Repetitive DEBUG/INFO messages (e.g. one per row) are rate-limited per call
+site; warnings and errors are always written.
 """
 
+import atexit
 import logging
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime
+from typing import Dict, List, Tuple
 from app.config import settings
 
 
+LOG_FORMAT = '[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)d] %(message)s'
+JSON_LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s %(funcName)s %(lineno)d %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Listeners started by setup_logger, stopped (and flushed) at exit
+_listeners: List[QueueListener] = []
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limits how often a single call site may log.
+
+    Each call site (file + line) may emit `burst` records per `interval`
+    seconds; further records in that window are dropped and counted, and the
+    next record that passes notes how many similar messages were suppressed.
+    Only DEBUG and INFO records are limited; WARNING and above report real
+    problems and are never dropped.
+    """
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._lock = threading.Lock()
+        # call site -> [window_start, count_in_window, suppressed]
+        self._sites: Dict[Tuple[str, int], List] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+            elif site[1] < self.burst:
+                site[1] += 1
+                suppressed = 0
+            else:
+                site[2] += 1
+                return False
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+def _build_formatter() -> logging.Formatter:
+    """Get text formatter, or JSON formatter when LOG_JSON_FORMAT is enabled"""
+    if settings.LOG_JSON_FORMAT:
+        try:
+            from pythonjsonlogger import jsonlogger
+            return jsonlogger.JsonFormatter(JSON_LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+        except ImportError:
+            sys.stderr.write("python-json-logger is not installed, using text log format\n")
+    return logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
+
 def setup_logger(name: str, log_file: str = None) -> logging.Logger:
     """
     Setup logger with file and console handlers
-    
+
     Args:
         name: Logger name
         log_file: Optional log file name (default: app.log)
-    
+
     Returns:
         Configured logger instance
     """
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, settings.LOG_LEVEL))
-    
+
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
-    
+
     # Format
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)d] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
+    formatter = _build_formatter()
+
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+
     # File handler
     if log_file is None:
         log_file = f"app_{datetime.now().strftime('%Y-%m-%d')}.log"
-    
+
     log_path = Path(settings.LOG_DIR) / log_file
     file_handler = RotatingFileHandler(
         log_path,
@@ -52,11 +120,34 @@ def setup_logger(name: str, log_file: str = None) -> logging.Logger:
         backupCount=settings.LOG_FILE_BACKUP_COUNT
     )
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
+
+    if settings.LOG_QUEUE_ENABLED:
+        # Callers only enqueue; a background thread does the actual I/O
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        handlers = [queue_handler]
+    else:
+        handlers = [console_handler, file_handler]
+
+    for handler in handlers:
+        if settings.LOG_RATE_LIMIT_BURST > 0:
+            handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_BURST, settings.LOG_RATE_LIMIT_INTERVAL))
+        logger.addHandler(handler)
+
     return logger
 
 
+@atexit.register
+def _stop_listeners() -> None:
+    """Flush queued records and stop listener threads"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
 # Global loggers
 app_logger = setup_logger("app")
 normalization_logger = setup_logger("normalization", f"normalization_{datetime.now().strftime('%Y-%m-%d')}.log")
+pendampingan_logger = setup_logger("pendampingan", f"pendampingan_{datetime.now().strftime('%Y-%m-%d')}.log")
@@ -0,0 +1,181 @@
+"""
+Type Inference
+==============
+Semantic column types inferred at ingestion.
+
+Spreadsheets and CSV exports store identifiers (NIK, NIP, phone numbers,
+codes, years) as numbers, so they arrive as floats ("3201010101900001.0")
+or as text with a ".0" artifact. Instead of guessing from column names
+(a substring match on "ID" also hits "PROVINSI"), each column is classified
+from a sample of its values:
+
+- nik: 16-digit population ID
+- nip: 18-digit civil servant ID
+- phone: Indonesian mobile number (08..., 62..., +62...)
+- year: whole numbers between 1900 and 2099
+- integer_code: other whole numbers
+- sk_number: decree numbers such as "123/KPTS/2020"
+- email
+- numeric, datetime, boolean, text (anything else), empty
+
+Identifier columns are then converted with bulk operations, and the types
+are kept with the dataset so later stages (analysis, normalization) can use
+them.
+"""
+
+from typing import Dict, Optional
+
+import pandas as pd
+
+from app.config import settings
+
+
+NIK = 'nik'
+NIP = 'nip'
+PHONE = 'phone'
+YEAR = 'year'
+INTEGER_CODE = 'integer_code'
+SK_NUMBER = 'sk_number'
+EMAIL = 'email'
+NUMERIC = 'numeric'
+DATETIME = 'datetime'
+BOOLEAN = 'boolean'
+TEXT = 'text'
+EMPTY = 'empty'
+
+# Types whose values are identifiers written as numbers
+IDENTIFIER_TYPES = (NIK, NIP, PHONE, YEAR, INTEGER_CODE, SK_NUMBER)
+
+_PHONE_PATTERN = r'(?:\+?62|0)?8\d{7,11}'
+_PHONE_SEPARATORS = r'[\s\-().]'
+_YEAR_PATTERN = r'(?:19|20)\d{2}'
+_SK_PATTERN = r'[A-Za-z0-9.\-_ ]*\d[A-Za-z0-9.\-_ ]*(?:/[A-Za-z0-9.\-_ ]+)+'
+_EMAIL_PATTERN = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+
+# Largest magnitude a float can have and still convert to Int64
+_INT64_LIMIT = 2 ** 63
+
+
+def infer_column_types(
+    df: pd.DataFrame,
+    sample_rows: Optional[int] = None,
+    min_match: Optional[float] = None
+) -> Dict[str, str]:
+    """
+    Infer the semantic type of every column
+
+    Args:
+        df: DataFrame to classify
+        sample_rows: Non-null values sampled per column
+            (default: settings.TYPE_INFERENCE_SAMPLE_ROWS)
+        min_match: Share of sampled values that must match a type
+            (default: settings.TYPE_INFERENCE_MIN_MATCH)
+
+    Returns:
+        Dict of column name -> semantic type
+    """
+    sample_rows = sample_rows or settings.TYPE_INFERENCE_SAMPLE_ROWS
+    min_match = min_match if min_match is not None else settings.TYPE_INFERENCE_MIN_MATCH
+    return {
+        str(column): infer_semantic_type(df[column], sample_rows, min_match)
+        for column in df.columns
+    }
+
+
+def infer_semantic_type(series: pd.Series, sample_rows: int, min_match: float) -> str:
+    """
+    Classify one column from a sample of its non-null values
+
+    Args:
+        series: Column values
+        sample_rows: Max number of values to sample
+        min_match: Share of sampled values that must match a type
+
+    Returns:
+        Semantic type
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return BOOLEAN
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return DATETIME
+
+    # Sample before dropping nulls, so large columns are never scanned whole;
+    # fall back to the whole column when the sample is all null
+    values = series
+    if len(values) > sample_rows:
+        values = values.sample(sample_rows, random_state=0).dropna()
+        if values.empty:
+            values = series.dropna().head(sample_rows)
+    else:
+        values = values.dropna()
+    if values.empty:
+        return EMPTY
+
+    if pd.api.types.is_float_dtype(values):
+        if not _is_integral(values):
+            return NUMERIC
+        text = values.astype('int64').astype(str)
+    elif pd.api.types.is_integer_dtype(values):
+        text = values.astype(str)
+    elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+        if pd.api.types.infer_dtype(values, skipna=True) in ('datetime', 'datetime64', 'date'):
+            return DATETIME
+        text = values.astype(str).str.strip().str.removesuffix('.0')
+    else:
+        return TEXT
+
+    def matches(pattern: str, candidates: pd.Series = text) -> bool:
+        return candidates.str.fullmatch(pattern).mean() >= min_match
+
+    if matches(r'\d{16}'):
+        return NIK
+    if matches(r'\d{18}'):
+        return NIP
+    if matches(_PHONE_PATTERN, text.str.replace(_PHONE_SEPARATORS, '', regex=True)):
+        return PHONE
+    if matches(_YEAR_PATTERN):
+        return YEAR
+    if matches(r'\d+'):
+        return INTEGER_CODE
+    if matches(_SK_PATTERN):
+        return SK_NUMBER
+    if matches(_EMAIL_PATTERN):
+        return EMAIL
+    if pd.api.types.is_numeric_dtype(values):
+        return NUMERIC
+    return TEXT
+
+
+def clean_identifier_columns(df: pd.DataFrame, column_types: Dict[str, str]) -> pd.DataFrame:
+    """
+    Remove ".0" artifacts from integer values and identifier columns
+
+    Float columns holding only whole numbers become strings ("12.0" ->
+    "12"); text columns of an identifier type lose a trailing ".0". Missing
+    values stay None.
+
+    Args:
+        df: DataFrame to clean (modified in place)
+        column_types: Types from infer_column_types()
+
+    Returns:
+        Cleaned DataFrame
+    """
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_float_dtype(series):
+            present = series.notna()
+            if present.any() and _is_integral(series[present]):
+                df[column] = series.astype('Int64').astype(str).where(present, None)
+        elif column_types.get(str(column)) in IDENTIFIER_TYPES:
+            if isinstance(series.dtype, pd.StringDtype):
+                df[column] = series.str.removesuffix('.0')
+            elif pd.api.types.is_object_dtype(series):
+                present = series.notna()
+                df[column] = series.astype(str).str.removesuffix('.0').where(present, None)
+    return df
+
+
+def _is_integral(values: pd.Series) -> bool:
+    """True if every (non-null) float is a whole number that fits in int64"""
+    return bool(((values % 1 == 0) & (values.abs() < _INT64_LIMIT)).all())